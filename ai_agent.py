@@ -3,15 +3,124 @@ AI Agent module for the maze game
 """
 
 import random
+from collections import deque
 import numpy as np
-from constants import CELL_TYPES
+from constants import GRID_SIZE, CELL_TYPES, DIRECTIONS
+from qtable import ArrayQTable, MappedQTable, save_q_table, action_id
+from replay import replay_update
+from features import make_encoder
+
+# Ways QLearner can propagate rewards back to earlier moves
+UPDATE_MODES = ("one_step", "n_step", "lambda")
+
+# (dx, dy, Manhattan distance) of the cells within distance 2 of a cell
+_NEAR_OFFSETS = tuple((dx, dy, abs(dx) + abs(dy)) for dx in range(-2, 3)
+                      for dy in range(-2, 3) if abs(dx) + abs(dy) <= 2)
+
+# Rows with up to this many legal actions are searched in plain Python,
+# which beats NumPy's per-call overhead at that size
+_SMALL_ARGMAX = 16
+
+class QLearner:
+    """
+    The learned part of the AI: its Q-table and learning parameters.
+    
+    A learner outlives any one game, so it can be handed to a new AIAgent
+    on every maze and keep accumulating what it has learned.
+    """
+    def __init__(self, learning_rate=0.1, discount_factor=0.9, exploration_rate=0.2,
+                 q_table=None, replay=None, replay_batch=32, update_mode="one_step",
+                 n_steps=3, trace_decay=0.8, trace_threshold=0.01, state_encoder=None,
+                 heuristic_init=True):
+        """
+        Initialize the learner.
+        
+        Args:
+            learning_rate (float): Step size of Q updates
+            discount_factor (float): Weight of future rewards
+            exploration_rate (float): Chance of taking a random action
+            q_table (dict, optional): Existing state-action values to start from
+            replay (ReplayBuffer, optional): Buffer to store transitions in and
+                replay minibatches from after every move; needs an ArrayQTable
+            replay_batch (int): Transitions replayed per move
+            update_mode (str): One of UPDATE_MODES: one-step Q-learning,
+                n-step returns, or Watkins's Q(lambda) with eligibility traces
+            n_steps (int): Rewards summed per update in "n_step" mode
+            trace_decay (float): Lambda of "lambda" mode
+            trace_threshold (float): Traces below this are dropped
+            state_encoder (str, optional): Spec of the features.STATE_ENCODERS
+                encoder describing states; defaults to that of an ArrayQTable,
+                else "absolute"
+            heuristic_init (bool): Start unseen state-action pairs at the
+                hand-written heuristic value rather than at zero
+        """
+        if replay is not None and not isinstance(q_table, ArrayQTable):
+            raise ValueError("Experience replay needs an ArrayQTable")
+        if update_mode not in UPDATE_MODES:
+            raise ValueError(f"Unknown update mode {update_mode!r}")
+        if replay is not None and update_mode != "one_step":
+            raise ValueError("Experience replay only supports one-step updates")
+        if isinstance(q_table, ArrayQTable):
+            self.encoder = q_table.encoder
+            if state_encoder is not None and make_encoder(state_encoder).spec != self.encoder.spec:
+                raise ValueError(f"The Q-table uses the {self.encoder.spec!r} state encoder")
+        else:
+            self.encoder = make_encoder(state_encoder or "absolute")
+        self.q_table = q_table if q_table is not None else {}  # State-action value function
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+        self.exploration_rate = exploration_rate
+        self.visit_counts = None  # Optional dict of updates per state-action pair
+        self.games = 0  # Number of AIAgents that have played with this learner
+        self.replay = replay
+        self.replay_batch = replay_batch
+        self.update_mode = update_mode
+        self.n_steps = n_steps
+        self.trace_decay = trace_decay
+        self.trace_threshold = trace_threshold
+        self.heuristic_init = heuristic_init
+    
+    def end_episode(self):
+        """Record that the last stored transition ended a game"""
+        if self.replay is not None:
+            self.replay.mark_done()
+    
+    @classmethod
+    def load(cls, path, **parameters):
+        """
+        Start a learner from a policy saved with save().
+        
+        The file is memory-mapped rather than read, so this returns in
+        about the time it takes to read its header.
+        
+        Args:
+            path (str): Policy file
+            **parameters: Learning parameters for the QLearner
+            
+        Returns:
+            QLearner: Learner whose Q-table is backed by the file
+        """
+        return cls(q_table=MappedQTable(path), **parameters)
+    
+    def save(self, path, size=GRID_SIZE):
+        """
+        Save the Q-table in the memory-mappable policy format.
+        
+        Args:
+            path (str): File to write
+            size (int): The size of the maze the learner was trained on
+        """
+        save_q_table(self.q_table, path, size, self.encoder)
 
 class AIAgent:
     """
     Represents the AI agent character in the maze game.
     Uses a simple reinforcement learning approach for decision-making.
+    
+    Position, score and tokens belong to the current game; what the agent
+    has learned lives in its QLearner.
     """
-    def __init__(self, x, y, maze):
+    def __init__(self, x, y, maze, learner=None):
         """
         Initialize the AI agent at position (x, y).
         
@@ -19,20 +128,32 @@ class AIAgent:
             x (int): Initial X coordinate
             y (int): Initial Y coordinate
             maze (Maze): Reference to the maze object
+            learner (QLearner, optional): Learner to play with; a fresh one if not given
         """
         self.x = x
         self.y = y
         self.maze = maze
         self.gems_collected = 0
         self.score = 0
-        self.tokens = 3  # Start with 3 tokens
+        self._tokens = 3  # Start with 3 tokens
+        keys = maze.zobrist
+        maze.state_hash ^= (keys.ai_position[x * maze.size + y]
+                            ^ keys.tokens(keys.ai_tokens, self._tokens))
         self.visited_positions = [(x, y)]  # Track visited positions for teleportation
         
-        # Simple Q-learning parameters
-        self.q_table = {}  # State-action value function
-        self.learning_rate = 0.1
-        self.discount_factor = 0.9
-        self.exploration_rate = 0.2
+        # Legal actions cached by _legal_actions
+        self._actions = None
+        self._actions_key = None
+        self._action_ids = None
+        self._action_mask = None
+        
+        # Per-game learning state of the n-step and Q(lambda) modes
+        self._pending = deque()  # ((state, action), reward) not yet updated
+        self._traces = {}  # Eligibility of each recent state-action pair
+        
+        # Q-learning state shared across games
+        self.learner = learner if learner is not None else QLearner()
+        self.learner.games += 1
         
     def make_move(self):
         """
@@ -45,9 +166,12 @@ class AIAgent:
         state = self._get_state()
         
         # Choose action (move or use token)
-        if random.random() < self.exploration_rate:
+        if random.random() < self.learner.exploration_rate:
             # Exploration: random action
             action = self._choose_random_action()
+            
+            # Watkins's Q(lambda) only credits earlier moves for greedy ones
+            self._traces.clear()
         else:
             # Exploitation: choose best action from Q-table
             action = self._choose_best_action(state)
@@ -55,16 +179,17 @@ class AIAgent:
         # Execute the action
         reward = self._execute_action(action)
         
-        # Update Q-table
-        new_state = self._get_state()
-        self._update_q_value(state, action, reward, new_state)
-        
         # Mark as visited in the maze
         self.maze.visited_ai[self.x, self.y] = True
         
-        # Add to visited positions if not already there
+        # Add to visited positions if not already there. Doing this before
+        # the Q update lets it and the next turn share one action list.
         if (self.x, self.y) not in self.visited_positions:
             self.visited_positions.append((self.x, self.y))
+        
+        # Update Q-table
+        new_state = self._get_state()
+        self._update_q_value(state, action, reward, new_state)
             
         return True
     
@@ -73,82 +198,66 @@ class AIAgent:
         Get the current state representation for the AI agent.
         
         Returns:
-            tuple: Simplified state representation
+            tuple: State made by the learner's state encoder
         """
-        # Get information about the surrounding cells
-        surroundings = []
-        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            new_x, new_y = self.x + dx, self.y + dy
-            if 0 <= new_x < self.maze.size and 0 <= new_y < self.maze.size:
-                surroundings.append(self.maze.grid[new_x, new_y])
-            else:
-                surroundings.append(-1)  # Out of bounds
-                
-        # Nearest gem direction
-        nearest_gem_dir = self._find_nearest_gem()
-        
-        # Convert state to a hashable representation
-        return (self.x, self.y, tuple(surroundings), nearest_gem_dir, self.tokens)
+        return self.learner.encoder.encode(self)
     
-    def _find_nearest_gem(self):
+    def _choose_random_action(self):
         """
-        Find the direction to the nearest gem.
+        Choose a random valid action.
         
         Returns:
-            tuple: (dx, dy) direction to nearest gem, or (0, 0) if none found
+            tuple: Action representation
         """
-        if not self.maze.gem_locations:
-            return (0, 0)
+        possible_actions = self._legal_actions()
+        
+        # If no valid actions, stay in place
+        if not possible_actions:
+            return ("stay", 0, 0)
             
-        # Find the closest gem
-        min_distance = float('inf')
-        best_direction = (0, 0)
-        
-        for gem_x, gem_y in self.maze.gem_locations:
-            distance = abs(gem_x - self.x) + abs(gem_y - self.y)  # Manhattan distance
-            if distance < min_distance:
-                min_distance = distance
-                
-                # Simplify direction to nearest gem
-                dx = 0
-                dy = 0
-                
-                if gem_x > self.x:
-                    dx = 1
-                elif gem_x < self.x:
-                    dx = -1
-                    
-                if gem_y > self.y:
-                    dy = 1
-                elif gem_y < self.y:
-                    dy = -1
-                
-                best_direction = (dx, dy)
-                
-        return best_direction
+        return random.choice(possible_actions)
     
-    def _choose_random_action(self):
+    def _legal_actions(self):
         """
-        Choose a random valid action.
+        Get the legal actions from the current position, enumerating them at most once.
+        
+        The list is cached until the position, token count, maze cells or
+        visited positions change. Callers must not modify it.
         
         Returns:
-            tuple: Action representation
+            list: Action representations
+        """
+        key = (self.x, self.y, self.tokens, self.maze.version, len(self.visited_positions))
+        if key != self._actions_key:
+            self._actions = self._enumerate_actions()
+            self._actions_key = key
+            self._action_ids = None
+            self._action_mask = None
+        return self._actions
+    
+    def invalidate_actions(self):
+        """Forget the cached legal actions, e.g. after the game state was rolled back"""
+        self._actions_key = None
+    
+    def _enumerate_actions(self):
+        """
+        List every legal action from the current position.
+        
+        Returns:
+            list: Action representations
         """
         possible_actions = []
         
         # Add movement actions
-        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            new_x, new_y = self.x + dx, self.y + dy
-            if self.maze.is_valid_move(new_x, new_y):
-                possible_actions.append(("move", dx, dy))
+        for dx, dy in self.maze.get_valid_moves(self.x, self.y):
+            possible_actions.append(("move", dx, dy))
         
         # Add token actions if tokens available
         if self.tokens > 0:
             # Place wall
-            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                wall_x, wall_y = self.x + dx, self.y + dy
-                if (0 <= wall_x < self.maze.size and 0 <= wall_y < self.maze.size and 
-                    self.maze.grid[wall_x, wall_y] == CELL_TYPES["EMPTY"]):
+            surroundings = self.maze.get_surroundings(self.x, self.y)
+            for (dx, dy), cell in zip(DIRECTIONS, surroundings):
+                if cell == CELL_TYPES["EMPTY"]:
                     possible_actions.append(("wall", dx, dy))
             
             # Remove trap if on trap
@@ -161,11 +270,28 @@ class AIAgent:
                     if (vx, vy) != (self.x, self.y):  # Don't teleport to current position
                         possible_actions.append(("teleport", vx, vy))
         
-        # If no valid actions, stay in place
-        if not possible_actions:
-            return ("stay", 0, 0)
-            
-        return random.choice(possible_actions)
+        return possible_actions
+    
+    @property
+    def legal_action_mask(self):
+        """
+        Legal actions as a bit mask over GameEngine action ids
+        
+        Returns:
+            int: Bit i is set if action id i is legal
+        """
+        action_ids = self._legal_action_ids()
+        if self._action_mask is None:
+            self._action_mask = sum(1 << action for action in action_ids.tolist())
+        return self._action_mask
+    
+    def _legal_action_ids(self):
+        """Get the cached legal actions as an array of GameEngine action ids"""
+        actions = self._legal_actions()
+        if self._action_ids is None:
+            self._action_ids = np.array([action_id(action, self.maze.size) for action in actions],
+                                        dtype=np.int64)
+        return self._action_ids
     
     def _choose_best_action(self, state):
         """
@@ -178,48 +304,27 @@ class AIAgent:
             tuple: Best action representation
         """
         # Get all possible actions
-        possible_actions = []
-        
-        # Add movement actions
-        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            new_x, new_y = self.x + dx, self.y + dy
-            if self.maze.is_valid_move(new_x, new_y):
-                possible_actions.append(("move", dx, dy))
-        
-        # Add token actions if tokens available
-        if self.tokens > 0:
-            # Place wall
-            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                wall_x, wall_y = self.x + dx, self.y + dy
-                if (0 <= wall_x < self.maze.size and 0 <= wall_y < self.maze.size and 
-                    self.maze.grid[wall_x, wall_y] == CELL_TYPES["EMPTY"]):
-                    possible_actions.append(("wall", dx, dy))
-            
-            # Remove trap if on trap
-            if self.maze.check_trap(self.x, self.y):
-                possible_actions.append(("remove_trap", 0, 0))
-            
-            # Teleport to a previously visited position
-            if len(self.visited_positions) > 1:  # More than just the current position
-                for vx, vy in self.visited_positions:
-                    if (vx, vy) != (self.x, self.y):  # Don't teleport to current position
-                        possible_actions.append(("teleport", vx, vy))
+        possible_actions = self._legal_actions()
         
         # If no valid actions, stay in place
         if not possible_actions:
             return ("stay", 0, 0)
         
+        q_table = self.learner.q_table
+        if isinstance(q_table, ArrayQTable):
+            return self._choose_best_array_action(q_table, state, possible_actions)
+        
         # Choose the action with the highest Q-value
         best_action = None
         best_value = float('-inf')
         
         for action in possible_actions:
-            if (state, action) in self.q_table:
-                q_value = self.q_table[(state, action)]
+            if (state, action) in q_table:
+                q_value = q_table[(state, action)]
             else:
                 # Initialize with a heuristic value
                 q_value = self._get_heuristic_value(state, action)
-                self.q_table[(state, action)] = q_value
+                q_table[(state, action)] = q_value
                 
             if q_value > best_value:
                 best_value = q_value
@@ -227,6 +332,46 @@ class AIAgent:
                 
         return best_action
     
+    def _choose_best_array_action(self, q_table, state, possible_actions):
+        """
+        Choose the best action with an argmax over the state's row of Q-values.
+        
+        Args:
+            q_table (ArrayQTable): Q-table to read
+            state: Current state representation
+            possible_actions (list): Legal actions
+            
+        Returns:
+            tuple: Best action representation
+        """
+        row = q_table.row(state)
+        values = q_table.values[row]
+        legal = self._legal_action_ids()
+        if len(possible_actions) <= _SMALL_ARGMAX:
+            legal_values = values[legal].tolist()
+            best = 0
+            for i, q_value in enumerate(legal_values):
+                if q_value != q_value:
+                    # Initialize an unseen legal action with a heuristic value
+                    q_value = self._get_heuristic_value(state, possible_actions[i])
+                    values[legal[i]] = legal_values[i] = q_value
+                    q_table.entries += 1
+                if q_value > legal_values[best]:
+                    best = i
+            return possible_actions[best]
+        
+        legal_values = values[legal]
+        
+        # Initialize unseen legal actions with a heuristic value
+        unseen = np.isnan(legal_values)
+        if unseen.any():
+            for i in np.flatnonzero(unseen).tolist():
+                legal_values[i] = self._get_heuristic_value(state, possible_actions[i])
+            values[legal] = legal_values
+            q_table.entries += int(np.count_nonzero(unseen))
+        
+        return possible_actions[int(np.argmax(legal_values))]
+    
     def _get_heuristic_value(self, state, action):
         """
         Get a heuristic value for an unexplored state-action pair.
@@ -238,8 +383,12 @@ class AIAgent:
         Returns:
             float: Heuristic value
         """
+        if not self.learner.heuristic_init:
+            # Zero initialization, keeping only the tie-breaking noise
+            return random.uniform(0, 0.1)
+        
         # Extract components from state
-        _, _, _, nearest_gem_dir, _ = state
+        nearest_gem_dir = self.learner.encoder.gem_direction(state)
         
         # Extract components from action
         action_type, dx, dy = action
@@ -276,9 +425,12 @@ class AIAgent:
         elif action_type == "teleport":
             # Teleport to positions near gems
             teleport_x, teleport_y = dx, dy  # For teleport, dx dy are actual coordinates
-            for gem_x, gem_y in self.maze.gem_locations:
-                distance = abs(gem_x - teleport_x) + abs(gem_y - teleport_y)
-                if distance <= 2:  # Close to a gem
+            # Look up the cells within distance 2 in the gem index instead
+            # of scanning every gem
+            gems, size = self.maze.gem_locations, self.maze.size
+            for ox, oy, distance in _NEAR_OFFSETS:
+                gem_x, gem_y = teleport_x + ox, teleport_y + oy
+                if 0 <= gem_x < size and 0 <= gem_y < size and (gem_x, gem_y) in gems:
                     value += 8 - distance
         
         # Add some randomness to break ties and encourage exploration
@@ -304,7 +456,7 @@ class AIAgent:
             new_x, new_y = self.x + dx, self.y + dy
             
             # Execute the move
-            self.x, self.y = new_x, new_y
+            self._set_position(new_x, new_y)
             
             # Check for gem collection
             if self.maze.collect_gem(self.x, self.y):
@@ -362,21 +514,143 @@ class AIAgent:
             reward: Reward received
             new_state: New state after action
         """
+        learner = self.learner
+        q_table = learner.q_table
+        if learner.update_mode != "one_step":
+            self._update_multi_step(q_table, state, action, reward, new_state)
+            return
+        if isinstance(q_table, ArrayQTable):
+            self._update_array_q_value(q_table, state, action, reward, new_state)
+            return
+        
         # If state-action pair not in Q-table, initialize it
-        if (state, action) not in self.q_table:
-            self.q_table[(state, action)] = 0
+        if (state, action) not in q_table:
+            q_table[(state, action)] = 0
+        
+        # Read it before looking ahead, which may evict it from a bounded table
+        current_q = q_table[(state, action)]
             
         # Get the best Q-value for the new state
         best_next_action = self._choose_best_action(new_state)
-        if (new_state, best_next_action) not in self.q_table:
-            self.q_table[(new_state, best_next_action)] = self._get_heuristic_value(new_state, best_next_action)
+        if (new_state, best_next_action) not in q_table:
+            q_table[(new_state, best_next_action)] = self._get_heuristic_value(new_state, best_next_action)
             
-        best_next_q = self.q_table[(new_state, best_next_action)]
+        best_next_q = q_table[(new_state, best_next_action)]
         
         # Update Q-value using the Q-learning update rule
-        current_q = self.q_table[(state, action)]
-        new_q = current_q + self.learning_rate * (reward + self.discount_factor * best_next_q - current_q)
-        self.q_table[(state, action)] = new_q
+        new_q = current_q + learner.learning_rate * (reward + learner.discount_factor * best_next_q - current_q)
+        q_table[(state, action)] = new_q
+        
+        if learner.visit_counts is not None:
+            learner.visit_counts[(state, action)] = learner.visit_counts.get((state, action), 0) + 1
+    
+    def _update_array_q_value(self, q_table, state, action, reward, new_state):
+        """
+        Update one entry of an ArrayQTable with the Q-learning rule.
+        
+        Args:
+            q_table (ArrayQTable): Q-table to update
+            state: Previous state
+            action: Action taken
+            reward: Reward received
+            new_state: New state after action
+        """
+        learner = self.learner
+        row, column = q_table.row(state), q_table.encode_action(action)
+        if np.isnan(q_table.values[row, column]):
+            q_table.values[row, column] = 0
+            q_table.entries += 1
+        
+        # Choosing the best next action fills in its value if unseen
+        best_next_action = self._choose_best_action(new_state)
+        values = q_table.values
+        best_next_q = values[q_table.row(new_state), q_table.encode_action(best_next_action)]
+        
+        current_q = values[row, column]
+        values[row, column] = current_q + learner.learning_rate * (
+            reward + learner.discount_factor * best_next_q - current_q)
+        
+        replay = learner.replay
+        if replay is not None:
+            replay.add(q_table.encode_state(state), column, reward, q_table.encode_state(new_state))
+            if len(replay) >= learner.replay_batch:
+                batch = replay.sample(learner.replay_batch)
+                errors = replay_update(q_table, batch, learner.learning_rate,
+                                       learner.discount_factor)
+                replay.update_priorities(batch[0], errors)
+        
+        if learner.visit_counts is not None:
+            learner.visit_counts[(state, action)] = learner.visit_counts.get((state, action), 0) + 1
+    
+    def _update_multi_step(self, q_table, state, action, reward, new_state):
+        """
+        Update Q-values in the learner's n-step or Q(lambda) mode.
+        
+        Args:
+            q_table: Q-table to update
+            state: Previous state
+            action: Action taken
+            reward: Reward received
+            new_state: New state after action
+        """
+        learner = self.learner
+        key = (state, action)
+        
+        # Bootstrap from the best next action, valued by the heuristic if unseen
+        best_next_action = self._choose_best_action(new_state)
+        if (new_state, best_next_action) not in q_table:
+            q_table[(new_state, best_next_action)] = self._get_heuristic_value(new_state, best_next_action)
+        best_next_q = q_table[(new_state, best_next_action)]
+        
+        if learner.update_mode == "n_step":
+            self._pending.append((key, reward))
+            if len(self._pending) == learner.n_steps:
+                self._apply_n_step(best_next_q)
+        else:
+            delta = reward + learner.discount_factor * best_next_q - q_table.get(key, 0.0)
+            step = learner.learning_rate * delta
+            decay = learner.discount_factor * learner.trace_decay
+            traces = self._traces
+            traces[key] = 1.0  # Replacing traces
+            for traced, eligibility in list(traces.items()):
+                q_table[traced] = q_table.get(traced, 0.0) + step * eligibility
+                eligibility *= decay
+                if eligibility < learner.trace_threshold:
+                    del traces[traced]
+                else:
+                    traces[traced] = eligibility
+        
+        if learner.visit_counts is not None:
+            learner.visit_counts[key] = learner.visit_counts.get(key, 0) + 1
+    
+    def _apply_n_step(self, bootstrap):
+        """
+        Update the oldest pending pair towards its n-step return.
+        
+        Args:
+            bootstrap (float): Value of the state after the last pending
+                reward, 0 at the end of a game
+        """
+        learner = self.learner
+        q_table = learner.q_table
+        target = bootstrap
+        for _, reward in reversed(self._pending):
+            target = reward + learner.discount_factor * target
+        key, _ = self._pending.popleft()
+        current_q = q_table.get(key, 0.0)
+        q_table[key] = current_q + learner.learning_rate * (target - current_q)
+    
+    def end_game(self):
+        """
+        Finish learning from a game that has just ended.
+        
+        Pending n-step updates are applied without bootstrapping, since
+        nothing follows the last move, and eligibility traces are reset.
+        """
+        while self._pending:
+            self._apply_n_step(0.0)
+        self._traces.clear()
+        self.learner.end_episode()
     
     def place_wall(self, dx, dy):
         """
@@ -389,14 +663,8 @@ class AIAgent:
         Returns:
             bool: True if wall was placed successfully, False otherwise
         """
-        target_x, target_y = self.x + dx, self.y + dy
-        
-        # Check if position is within bounds
-        if target_x < 0 or target_x >= self.maze.size or target_y < 0 or target_y >= self.maze.size:
-            return False
-            
-        # Check if position is empty
-        return self.maze.place_wall(target_x, target_y)
+        # The maze rejects cells outside the grid, so no bounds check is needed
+        return self.maze.place_wall(self.x + dx, self.y + dy)
     
     def remove_trap(self):
         """
@@ -423,9 +691,43 @@ class AIAgent:
             return False
             
         # Execute teleportation
-        self.x, self.y = x, y
+        self._set_position(x, y)
         return True
     
+    def _set_position(self, x, y):
+        """
+        Move to (x, y) and update the maze's state hash
+        
+        Args:
+            x (int): New X coordinate
+            y (int): New Y coordinate
+        """
+        keys = self.maze.zobrist.ai_position
+        size = self.maze.size
+        self.maze.state_hash ^= keys[self.x * size + self.y] ^ keys[x * size + y]
+        self.x, self.y = x, y
+    
+    @property
+    def q_table(self):
+        """The learner's state-action values"""
+        return self.learner.q_table
+    
+    @q_table.setter
+    def q_table(self, value):
+        self.learner.q_table = value
+    
+    @property
+    def tokens(self):
+        """Number of tokens left"""
+        return self._tokens
+    
+    @tokens.setter
+    def tokens(self, value):
+        keys = self.maze.zobrist
+        self.maze.state_hash ^= (keys.tokens(keys.ai_tokens, self._tokens)
+                                 ^ keys.tokens(keys.ai_tokens, value))
+        self._tokens = value
+    
     def get_position(self):
         """
         Get the AI's current position
@@ -0,0 +1,893 @@
+"""
+Benchmark module for measuring the performance of the maze game engine
+"""
+
+import os
+import sys
+import time
+import io
+import copy
+import contextlib
+import pickle
+import tempfile
+import cProfile
+import pstats
+import random
+import tracemalloc
+import numpy as np
+from maze import (Maze, GemIndex, generate_batch, label_regions, place_layout,
+                  sample_layout)
+from bitboard import BitboardMaze
+from player import Player
+from ai_agent import AIAgent
+from token_system import TokenSystem
+from journal import GameJournal
+from engine import GameEngine, TELEPORT
+from vector_env import VectorEnvironment
+from training import TrainingEnvironment, RandomPlayer
+from planner import MCTSPlanner, IterativeDeepeningPlanner, PlanningAgent
+from qtable import ArrayQTable, MappedQTable, save_q_table, EVICTION_POLICIES
+from ai_agent import QLearner, UPDATE_MODES
+from pathing import ShortestPathTable
+from zobrist import keys_for
+from constants import CELL_TYPES, ROUNDS
+
+def _time_call(func, min_time=0.2):
+    """
+    Call a function repeatedly until at least min_time seconds have passed.
+
+    Args:
+        func (callable): Function to call with no arguments
+        min_time (float): Minimum total measurement time in seconds
+
+    Returns:
+        float: Calls per second
+    """
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+def _legacy_generate(size, wall_count, gem_count, trap_count):
+    """Reference copy of the original rejection-sampling maze generator"""
+    grid = np.zeros((size, size), dtype=int)
+    visited_player = np.zeros((size, size), dtype=bool)
+    visited_ai = np.zeros((size, size), dtype=bool)
+    visited_player[0, 0] = visited_ai[size - 1, size - 1] = True
+    gem_locations = []
+    corners = ((0, 0), (size - 1, size - 1))
+
+    placed = 0
+    while placed < wall_count:
+        x, y = random.randint(0, size - 1), random.randint(0, size - 1)
+        if (x, y) not in corners:
+            grid[x, y] = CELL_TYPES["WALL"]
+            placed += 1
+
+    for cell_type, count in (("GEM", gem_count), ("TRAP", trap_count)):
+        placed = 0
+        while placed < count:
+            x, y = random.randint(0, size - 1), random.randint(0, size - 1)
+            if grid[x, y] == CELL_TYPES["EMPTY"] and (x, y) not in corners:
+                grid[x, y] = CELL_TYPES[cell_type]
+                if cell_type == "GEM":
+                    gem_locations.append((x, y))
+                placed += 1
+    return grid, gem_locations
+
+def _sampled_generate(size, wall_count, gem_count, trap_count):
+    """The work of _legacy_generate, with the placements drawn by sample_layout"""
+    grid = np.zeros((size, size), dtype=np.uint8)
+    visited_player = np.zeros((size, size), dtype=bool)
+    visited_ai = np.zeros((size, size), dtype=bool)
+    visited_player[0, 0] = visited_ai[size - 1, size - 1] = True
+
+    walls, gems, traps = sample_layout(size, wall_count, gem_count, trap_count)
+    place_layout(grid, walls, gems, traps)
+    return grid, [divmod(cell, size) for cell in gems.tolist()]
+
+def bench_generation(sizes=(10, 100, 1000), densities=(0.05, 0.2, 0.4)):
+    """
+    Compare mazes/sec of the vectorized generator against the legacy loop.
+
+    The speedup compares equal work: the grids, placements and gem list
+    built by the legacy loop against the same built from sample_layout.
+    Full Maze construction, which also sets up the derived state, is
+    listed alongside. Each density is split between walls, gems and traps
+    in the same 4:3:2 ratio as the default constants.
+
+    Args:
+        sizes (tuple): Grid sizes to measure
+        densities (tuple): Fraction of non-corner cells that are occupied
+    """
+    print("Maze generation (mazes/sec)")
+    print(f"{'size':>6} {'density':>8} {'legacy':>12} {'sampled':>12} {'speedup':>8} "
+          f"{'Maze()':>12}")
+    for size in sizes:
+        for density in densities:
+            occupied = int((size * size - 2) * density)
+            wall_count = occupied * 4 // 9
+            gem_count = occupied * 3 // 9
+            trap_count = occupied - wall_count - gem_count
+
+            # The legacy loop is far too slow on large dense grids, so give
+            # it a single timed call there
+            min_time = 0.2 if size * size * density < 50000 else 0.0
+            legacy = _time_call(
+                lambda: _legacy_generate(size, wall_count, gem_count, trap_count),
+                min_time)
+            sampled = _time_call(
+                lambda: _sampled_generate(size, wall_count, gem_count, trap_count))
+            full = _time_call(lambda: Maze(size, wall_count, gem_count, trap_count))
+            print(f"{size:>6} {density:>8.2f} {legacy:>12.1f} {sampled:>12.1f} "
+                  f"{sampled / legacy:>7.1f}x {full:>12.1f}")
+
+def bench_batch(sizes=(10, 100), counts=(1, 64, 1024)):
+    """
+    Compare mazes/sec of the batch factory against one Maze at a time.
+
+    Args:
+        sizes (tuple): Grid sizes to measure
+        counts (tuple): Number of mazes generated per call
+    """
+    print("Batched maze generation (mazes/sec)")
+    print(f"{'size':>6} {'n':>6} {'single':>12} {'batch':>12} {'speedup':>8}")
+    for size in sizes:
+        for n in counts:
+            single = _time_call(lambda: [Maze(size) for _ in range(n)]) * n
+            batch = _time_call(lambda: generate_batch(n, size)) * n
+            print(f"{size:>6} {n:>6} {single:>12.1f} {batch:>12.1f} "
+                  f"{batch / single:>7.1f}x")
+
+def bench_connected(sizes=(10, 100, 1000), densities=(0.2, 0.3, 0.4), runs=5):
+    """
+    Report the cost of guaranteed-reachable generation.
+
+    Args:
+        sizes (tuple): Grid sizes to measure
+        densities (tuple): Fraction of non-corner cells that are walls
+        runs (int): Mazes generated per configuration
+    """
+    print("Connected maze generation")
+    print(f"{'size':>6} {'walls':>6} {'passes':>7} {'removed':>8} {'ms':>10} {'plain ms':>10}")
+    for size in sizes:
+        gem_count = max(1, (size * size) // 20)
+        for density in densities:
+            wall_count = int((size * size - 2) * density)
+            stats = [Maze(size, wall_count, gem_count, 0, connected=True).generation_stats
+                     for _ in range(runs)]
+            plain = [Maze(size, wall_count, gem_count, 0).generation_stats
+                     for _ in range(runs)]
+            passes = sum(s["repair_passes"] for s in stats) / runs
+            removed = sum(s["walls_removed"] for s in stats) / runs
+            seconds = sum(s["seconds"] for s in stats) / runs
+            plain_seconds = sum(s["seconds"] for s in plain) / runs
+            print(f"{size:>6} {density:>6.2f} {passes:>7.1f} {removed:>8.1f} "
+                  f"{seconds * 1000:>10.2f} {plain_seconds * 1000:>10.2f}")
+
+def _allocated_bytes(func):
+    """Return the bytes still held by the result of func()"""
+    tracemalloc.start()
+    try:
+        result = func()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current
+
+def bench_memory(sizes=(10, 512)):
+    """
+    Report per-maze memory for the legacy, default and compact layouts.
+
+    Args:
+        sizes (tuple): Grid sizes to measure
+    """
+    class LegacyMaze:
+        # The original layout: an int64 grid and two bool visited layers
+        def __init__(self, size):
+            self.size = size
+            self.grid = np.zeros((size, size), dtype=int)
+            self.visited_player = np.zeros((size, size), dtype=bool)
+            self.visited_ai = np.zeros((size, size), dtype=bool)
+            self.gem_locations = []
+
+    print("Per-maze memory (bytes, excluding the gem list and shared key tables)")
+    print(f"{'size':>6} {'legacy':>12} {'uint8':>12} {'compact':>12} {'ratio':>8}")
+    for size in sizes:
+        # The Zobrist keys are built once per size and shared by every maze
+        keys_for(size)
+        before = _allocated_bytes(lambda: LegacyMaze(size))
+        default = _allocated_bytes(lambda: Maze(size, 0, 0, 0))
+        compact = _allocated_bytes(lambda: Maze(size, 0, 0, 0, compact=True))
+        print(f"{size:>6} {before:>12} {default:>12} {compact:>12} "
+              f"{before / compact:>7.1f}x")
+
+def _random_walk(maze, steps):
+    """Walk a Player through the maze choosing uniformly among valid moves"""
+    player = Player(0, 0, maze)
+    for _ in range(steps):
+        moves = maze.get_valid_moves(player.x, player.y)
+        if moves:
+            dx, dy = random.choice(moves)
+            player.move(dx, dy)
+
+def bench_bitboard(steps=1000):
+    """
+    Compare moves/sec and reachability queries/sec of Maze and BitboardMaze.
+
+    Args:
+        steps (int): Moves per random walk
+    """
+    print("Maze engines (10x10)")
+    print(f"{'engine':>10} {'moves/sec':>12} {'reach/sec':>12}")
+    maze = Maze(10)
+    board = BitboardMaze.from_maze(maze)
+    engines = (
+        ("ndarray", maze, lambda: label_regions(maze.grid != CELL_TYPES["WALL"])),
+        ("bitboard", board, lambda: board.reachable(0, 0)),
+    )
+    for name, engine, reach in engines:
+        moves = _time_call(lambda: _random_walk(engine, steps)) * steps
+        print(f"{name:>10} {moves:>12.0f} {_time_call(reach):>12.0f}")
+
+def _legacy_valid_moves(maze, x, y):
+    """Reference copy of the original bounds-checked get_valid_moves"""
+    valid_moves = []
+    for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+        new_x, new_y = x + dx, y + dy
+        if 0 <= new_x < maze.size and 0 <= new_y < maze.size:
+            if maze.grid[new_x, new_y] != CELL_TYPES["WALL"]:
+                valid_moves.append((dx, dy))
+    return valid_moves
+
+def bench_valid_moves(size=10):
+    """
+    Compare get_valid_moves over every cell: bounds-checked loop vs mask lookup.
+
+    Args:
+        size (int): Grid size to measure
+    """
+    maze = Maze(size)
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    legacy = _time_call(lambda: [_legacy_valid_moves(maze, x, y) for x, y in cells])
+    masked = _time_call(lambda: [maze.get_valid_moves(x, y) for x, y in cells])
+    print("get_valid_moves (calls/sec)")
+    print(f"{'legacy':>12} {'masked':>12} {'speedup':>8}")
+    print(f"{legacy * len(cells):>12.0f} {masked * len(cells):>12.0f} "
+          f"{masked / legacy:>7.1f}x")
+
+def bench_gem_index(counts=(15, 1000, 20000), gem_density=0.15):
+    """
+    Compare collecting every gem from a list against the GemIndex.
+
+    Args:
+        counts (tuple): Number of gems to place and collect
+        gem_density (float): Fraction of cells holding a gem
+    """
+    print("Collect all gems (gems/sec)")
+    print(f"{'gems':>8} {'size':>6} {'list':>12} {'index':>12} {'speedup':>8}")
+    for count in counts:
+        size = max(10, int((count / gem_density) ** 0.5))
+        cells = random.sample(range(size * size), count)
+        positions = [divmod(cell, size) for cell in cells]
+        order = random.sample(positions, count)
+
+        def collect_list():
+            gems = list(positions)
+            for pos in order:
+                if pos in gems:
+                    gems.remove(pos)
+
+        def collect_index():
+            gems = GemIndex(size, positions)
+            for pos in order:
+                if pos in gems:
+                    gems.remove(pos)
+
+        slow = _time_call(collect_list) * count
+        fast = _time_call(collect_index) * count
+        print(f"{count:>8} {size:>6} {slow:>12.0f} {fast:>12.0f} {fast / slow:>7.1f}x")
+
+def bench_gem_field(sizes=(100, 300), updates=200):
+    """
+    Compare incremental distance field updates against full rebuilds.
+
+    Each update collects a random gem or places a random wall.
+
+    Args:
+        sizes (tuple): Grid sizes to measure
+        updates (int): Updates applied per measurement
+    """
+    print("Gem distance field (updates/sec)")
+    print(f"{'size':>6} {'rebuild':>12} {'incremental':>12} {'speedup':>8}")
+    for size in sizes:
+        cells = size * size
+
+        def run(rebuild):
+            maze = Maze(size, cells // 5, cells // 20, cells // 20)
+            field = maze.gem_field
+            for _ in range(updates):
+                if random.random() < 0.5 and maze.gem_locations:
+                    maze.collect_gem(*random.choice(maze.gem_locations))
+                else:
+                    maze.place_wall(random.randrange(size), random.randrange(size))
+                if rebuild:
+                    field.rebuild()
+
+        # Subtract the cost of building the maze and the initial field
+        setup = 1 / _time_call(lambda: Maze(size, cells // 5, cells // 20, cells // 20).gem_field)
+        full = updates / max(1 / _time_call(lambda: run(True)) - setup, 1e-9)
+        incremental = updates / max(1 / _time_call(lambda: run(False)) - setup, 1e-9)
+        print(f"{size:>6} {full:>12.1f} {incremental:>12.1f} {incremental / full:>7.1f}x")
+
+def bench_path_table(sizes=(10, 20, 40), walls=20):
+    """
+    Report the build cost of the all-pairs table and the cost of wall updates.
+
+    Args:
+        sizes (tuple): Grid sizes to measure
+        walls (int): Walls placed per maze when timing updates
+    """
+    print("All-pairs shortest-path table")
+    print(f"{'size':>6} {'build ms':>10} {'update ms':>10} {'rows':>8} {'of':>6}")
+    for size in sizes:
+        maze = Maze(size, size * size // 5, size, size)
+        build = 1000 / _time_call(lambda: ShortestPathTable(maze.grid))
+
+        # Place walls through _set_cell so the maze's own table is updated
+        table = maze.path_table
+        seconds = 0.0
+        rows = 0
+        placed = 0
+        while placed < walls:
+            x, y = random.randrange(size), random.randrange(size)
+            if maze.grid[x, y] == CELL_TYPES["EMPTY"]:
+                maze._set_cell(x, y, CELL_TYPES["WALL"])
+                seconds += table.update_seconds
+                rows += table.rows_updated
+                placed += 1
+        print(f"{size:>6} {build:>10.2f} {seconds * 1000 / walls:>10.3f} "
+              f"{rows / walls:>8.1f} {size * size:>6}")
+
+def _frame_garbage(draw, frames):
+    """Return the mean peak transient bytes allocated by one call of draw()"""
+    draw()
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(frames):
+            base, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            draw()
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - base
+    finally:
+        tracemalloc.stop()
+    return total / frames
+
+def bench_render(sizes=(10, 512), frames=200):
+    """
+    Report per-frame transient allocations of reading the grid for rendering.
+
+    The UI row draws real frames of UI._draw_maze on a headless display;
+    the other rows time get_state() alone. Legacy numbers come from
+    swapping get_state for the copying snapshot().
+
+    Args:
+        sizes (tuple): Grid sizes for the get_state() measurement
+        frames (int): Frames averaged per measurement
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from ui import UI
+    from ai_agent import AIAgent
+    from token_system import TokenSystem
+    from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+
+    print("Per-frame transient allocation (bytes)")
+    print(f"{'case':>16} {'copy':>10} {'view':>10} {'copy fps':>10} {'view fps':>10}")
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    maze = Maze(10)
+    ui = UI(screen, maze, Player(0, 0, maze), AIAgent(9, 9, maze), TokenSystem(3, maze))
+    results = []
+    for get_state in (maze.snapshot, maze.get_state):
+        maze.get_state = get_state
+        results.append((_frame_garbage(ui._draw_maze, frames), _time_call(ui._draw_maze)))
+    del maze.get_state
+    pygame.quit()
+    print(f"{'UI 10x10':>16} {results[0][0]:>10.0f} {results[1][0]:>10.0f} "
+          f"{results[0][1]:>10.0f} {results[1][1]:>10.0f}")
+
+    for size in sizes:
+        maze = Maze(size, 0, 0, 0)
+        copy_bytes = _frame_garbage(maze.snapshot, frames)
+        view_bytes = _frame_garbage(maze.get_state, frames)
+        print(f"{f'get_state {size}':>16} {copy_bytes:>10.0f} {view_bytes:>10.0f} "
+              f"{_time_call(maze.snapshot):>10.0f} {_time_call(maze.get_state):>10.0f}")
+
+def bench_undo(sizes=(10, 100, 500), depth=8):
+    """
+    Time branching a game for a short rollout and returning to the branch point.
+
+    Compares deep-copying the maze, player and AI for each branch with
+    a GameJournal checkpoint and restore.
+
+    Args:
+        sizes (tuple): Grid sizes
+        depth (int): Player moves per rollout
+    """
+    print(f"Branch and {depth}-move rollout (branches/sec)")
+    print(f"{'size':>6} {'deepcopy':>10} {'journal':>10}")
+    for size in sizes:
+        maze = Maze(size)
+        game = (maze, Player(0, 0, maze), AIAgent(size - 1, size - 1, maze),
+                TokenSystem(3, maze))
+        journal = GameJournal(*game)
+        moves = [random.choice(((0, 1), (1, 0), (0, -1), (-1, 0))) for _ in range(depth)]
+
+        def with_copy():
+            _, player, _, _ = copy.deepcopy(game)
+            for dx, dy in moves:
+                player.move(dx, dy)
+
+        def with_journal():
+            checkpoint = journal.checkpoint()
+            for dx, dy in moves:
+                game[1].move(dx, dy)
+            journal.restore(checkpoint)
+
+        print(f"{size:>6} {_time_call(with_copy):>10.0f} {_time_call(with_journal):>10.0f}")
+
+def bench_engine(steps=1_000_000):
+    """
+    Time the functional step() engine on random move actions.
+
+    Args:
+        steps (int): Steps per run
+    """
+    engine = GameEngine()
+    start_state = engine.new_game()
+    actions = [random.randrange(4) for _ in range(steps)]
+    step = engine.step
+
+    def run():
+        state = start_state
+        for action in actions:
+            state, _, done = step(state, action)
+            if done:
+                state = start_state
+
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    print(f"GameEngine.step: {steps / elapsed:,.0f} steps/sec")
+
+def bench_vector_env(counts=(1, 64, 1024, 16384), min_time=1.0):
+    """
+    Report episodes/sec of VectorEnvironment under a random policy.
+
+    Args:
+        counts (tuple): Numbers of games stepped in lockstep
+        min_time (float): Minimum seconds to run each count
+    """
+    rng = np.random.default_rng(0)
+    print("VectorEnvironment, random actions")
+    print(f"{'games':>8} {'episodes/sec':>14} {'steps/sec':>14}")
+    for n in counts:
+        env = VectorEnvironment(n, rng=rng)
+        steps = 0
+        started = time.perf_counter()
+        while True:
+            _, done = env.step(rng.integers(0, TELEPORT, n))
+            steps += n
+            if done and time.perf_counter() - started >= min_time:
+                break
+        elapsed = time.perf_counter() - started
+        episodes = env.episodes + n
+        print(f"{n:>8} {episodes / elapsed:>14,.0f} {steps / elapsed:>14,.0f}")
+
+def bench_parallel_training(episodes_per_worker=40, sync_interval=20):
+    """
+    Report training episodes/sec against worker count.
+
+    Each worker count plays the same number of episodes per worker, so
+    perfect scaling keeps the wall time flat.
+
+    Args:
+        episodes_per_worker (int): Episodes each worker plays
+        sync_interval (int): Episodes per worker between Q-table merges
+    """
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, *(2 ** i for i in range(1, cpus.bit_length())), cpus})
+    print(f"Parallel training ({cpus} CPUs)")
+    print(f"{'workers':>8} {'episodes/sec':>14} {'speedup':>8}")
+    baseline = None
+    for workers in counts:
+        episodes = episodes_per_worker * workers
+        env = TrainingEnvironment(episodes, workers, sync_interval, seed=0)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            env.train()
+        rate = episodes / (time.perf_counter() - started)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>14.1f} {rate / baseline:>7.2f}x")
+
+def bench_q_table(episodes=500):
+    """
+    Compare the dict Q-table with ArrayQTable.
+
+    Trains each backend for the same episodes, then times best-action
+    choices over states seen in training.
+
+    Args:
+        episodes (int): Training episodes per backend
+    """
+    print(f"Q-table backends after {episodes} training episodes")
+    print(f"{'backend':>8} {'entries':>9} {'bytes':>12} {'B/entry':>8} "
+          f"{'episodes/s':>11} {'choices/s':>10}")
+    for name, make_table in (("dict", dict), ("array", ArrayQTable)):
+        random.seed(0)
+        env = TrainingEnvironment(episodes)
+        tracemalloc.start()
+        env.learner = QLearner(q_table=make_table())
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = env.train()
+        elapsed = time.perf_counter() - started
+        env.maze = env.player = env.token_system = None
+        agent.maze = None
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Replay decisions on a fresh game with the trained learner
+        maze = Maze(10)
+        agent = AIAgent(9, 9, maze, env.learner)
+        states = []
+        for _ in range(200):
+            states.append((agent.x, agent.y, agent._get_state()))
+            agent.make_move()
+
+        def choose():
+            for x, y, state in states:
+                agent.x, agent.y = x, y
+                agent._choose_best_action(state)
+
+        choices = _time_call(choose) * len(states)
+        entries = len(env.learner.q_table)
+        print(f"{name:>8} {entries:>9} {retained:>12,} {retained / entries:>8.0f} "
+              f"{episodes / elapsed:>11.0f} {choices:>10.0f}")
+
+def bench_bounded_q_table(episodes=500, capacity=5000):
+    """
+    Compare the eviction policies of BoundedQTable with an unbounded dict.
+
+    Args:
+        episodes (int): Training episodes per policy
+        capacity (int): Entry limit of the bounded tables
+    """
+    print(f"Q-table bounded to {capacity} entries, {episodes} episodes")
+    print(f"{'policy':>10} {'entries':>8} {'hit rate':>9} {'evictions':>10} "
+          f"{'bytes':>11} {'win rate':>9} {'episodes/s':>11}")
+    for policy in (None, *EVICTION_POLICIES):
+        random.seed(0)
+        env = TrainingEnvironment(episodes, q_capacity=policy and capacity, eviction=policy or "lru")
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            env.train()
+        elapsed = time.perf_counter() - started
+        table = env.learner.q_table
+        win_rate = env.results["Win"] / episodes
+        if policy is None:
+            print(f"{'unbounded':>10} {len(table):>8} {'-':>9} {'-':>10} {'-':>11} "
+                  f"{win_rate:>9.1%} {episodes / elapsed:>11.0f}")
+            continue
+        stats = table.stats()
+        print(f"{policy:>10} {stats['entries']:>8} {stats['hit_rate']:>9.1%} "
+              f"{stats['evictions']:>10} {stats['bytes']:>11,} {win_rate:>9.1%} "
+              f"{episodes / elapsed:>11.0f}")
+
+def bench_warm_start(episodes=(100, 1000)):
+    """
+    Time starting a game from a saved policy: pickle against the mapped file.
+
+    Args:
+        episodes (tuple): Training episodes behind each saved policy
+    """
+    print("Warm start from a saved policy")
+    print(f"{'episodes':>9} {'entries':>8} {'format':>7} {'file KB':>8} {'open ms':>8} "
+          f"{'1st move ms':>12}")
+    for count in episodes:
+        random.seed(0)
+        env = TrainingEnvironment(count)
+        with contextlib.redirect_stdout(io.StringIO()):
+            env.train()
+        q_table = env.learner.q_table
+        with tempfile.TemporaryDirectory() as directory:
+            pickled = os.path.join(directory, "policy.pickle")
+            mapped = os.path.join(directory, "policy.qtb")
+            with open(pickled, "wb") as file:
+                pickle.dump(q_table, file)
+            save_q_table(q_table, mapped)
+
+            def open_pickle():
+                with open(pickled, "rb") as file:
+                    return pickle.load(file)
+
+            for name, path, load in (("pickle", pickled, open_pickle),
+                                     ("mmap", mapped, lambda: MappedQTable(mapped))):
+                started = time.perf_counter()
+                table = load()
+                opened = time.perf_counter() - started
+                agent = AIAgent(9, 9, Maze(10), QLearner(q_table=table))
+                started = time.perf_counter()
+                agent.make_move()
+                moved = time.perf_counter() - started
+                size_kb = os.path.getsize(path) / 1024
+                print(f"{count:>9} {len(q_table):>8} {name:>7} {size_kb:>8.0f} "
+                      f"{opened * 1e3:>8.2f} {moved * 1e3:>12.2f}")
+                del agent, table
+
+def _profile_ai_games(games, cached):
+    """Profile AIAgent.make_move over games against a random walker"""
+    profiler = cProfile.Profile()
+    learner = QLearner()
+    random.seed(0)
+    for _ in range(games):
+        maze = Maze(10)
+        player = Player(0, 0, maze)
+        agent = AIAgent(9, 9, maze, learner)
+        if not cached:
+            agent._legal_actions = agent._enumerate_actions
+        for _ in range(20):
+            player.move(*random.choice(((0, 1), (1, 0), (0, -1), (-1, 0))))
+            profiler.runcall(agent.make_move)
+    stats = pstats.Stats(profiler).stats
+    total = sum(timing[2] for timing in stats.values())
+    enumerations = next(timing for (_, _, name), timing in stats.items()
+                        if name == "_enumerate_actions")
+    return total, enumerations[1], enumerations[3]
+
+def bench_action_cache(games=200):
+    """
+    Profile how much of AIAgent.make_move goes to enumerating actions.
+
+    Args:
+        games (int): Games of 20 AI moves to profile
+    """
+    moves = games * 20
+    print(f"AIAgent.make_move over {moves} moves (profiled)")
+    print(f"{'actions':>9} {'us/move':>8} {'enumerations':>13} {'enumerate share':>16}")
+    for label, cached in (("rebuilt", False), ("cached", True)):
+        total, calls, enumerate_time = _profile_ai_games(games, cached)
+        print(f"{label:>9} {total / moves * 1e6:>8.1f} {calls:>13} "
+              f"{enumerate_time / total:>16.1%}")
+
+def _evaluate(learner, games=200):
+    """Win rate of a learner against RandomPlayer with exploration switched off"""
+    exploration, learner.exploration_rate = learner.exploration_rate, 0.0
+    env = TrainingEnvironment(games)
+    random.seed(1)
+    wins = sum(env._play_episode(maze, learner) == "Win" for maze in generate_batch(games, 10))
+    learner.exploration_rate = exploration
+    return wins / games
+
+def bench_replay(budgets=(25, 100, 400), memory=1 << 20):
+    """
+    Compare win rates after short training runs with and without experience replay.
+
+    Args:
+        budgets (tuple): Training episodes before each evaluation
+        memory (int): Replay buffer budget in bytes
+    """
+    modes = (("none", None, False), ("uniform", memory, False), ("prioritized", memory, True))
+    print(f"Win rate vs RandomPlayer after training (replay buffer {memory / 2 ** 20:.0f} MB)")
+    print(f"{'replay':>12} " + " ".join(f"{f'{budget} eps':>9}" for budget in budgets)
+          + f" {'episodes/s':>11}")
+    for name, replay_memory, prioritized in modes:
+        rates = []
+        elapsed = 0.0
+        for budget in budgets:
+            random.seed(0)
+            env = TrainingEnvironment(budget, q_table="array", replay_memory=replay_memory,
+                                      prioritized=prioritized)
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                env.train()
+            elapsed += time.perf_counter() - started
+            rates.append(_evaluate(env.learner))
+        print(f"{name:>12} " + " ".join(f"{rate:>9.1%}" for rate in rates)
+              + f" {sum(budgets) / elapsed:>11.0f}")
+
+def bench_convergence(target=0.3, chunk=100, max_episodes=4000, games=200):
+    """
+    Count training episodes until each Q-learning update mode reaches a win rate.
+
+    Q-values start at zero rather than at the heuristic, which on its own
+    already wins about 90% of games and would hide how fast each mode
+    propagates rewards back to earlier moves.
+
+    Args:
+        target (float): Win rate vs RandomPlayer that counts as converged
+        chunk (int): Episodes trained between evaluations
+        max_episodes (int): Episodes trained per mode
+        games (int): Evaluation games per check
+    """
+    print(f"Episodes to reach a {target:.0%} win rate vs RandomPlayer from zero-initialized "
+          f"Q-values (checked every {chunk} episodes)")
+    print(f"{'mode':>10} {'episodes':>9} {f'rate@{max_episodes}':>10} {'episodes/s':>11}")
+    for mode in UPDATE_MODES:
+        random.seed(0)
+        env = TrainingEnvironment(chunk, update_mode=mode)
+        env.learner.heuristic_init = False
+        reached = None
+        elapsed = 0.0
+        for trained in range(chunk, max_episodes + 1, chunk):
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                env.train()
+            elapsed += time.perf_counter() - started
+            rate = _evaluate(env.learner, games)
+            if reached is None and rate >= target:
+                reached = trained
+        reached = f"{reached}" if reached is not None else f">{max_episodes}"
+        print(f"{mode:>10} {reached:>9} {rate:>10.1%} {max_episodes / elapsed:>11.0f}")
+
+def bench_state_encoders(episodes=300, encoders=("absolute", "relative", "relative:2:8")):
+    """
+    Compare Q-table growth and play strength of the state encoders.
+
+    Args:
+        episodes (int): Training episodes per encoder
+        encoders (tuple): Encoder specs to compare
+    """
+    print(f"State encoders after {episodes} training episodes")
+    print(f"{'encoder':>14} {'states':>8} {'entries':>8} {'file bytes':>11} "
+          f"{'win rate':>9} {'episodes/s':>11}")
+    for spec in encoders:
+        random.seed(0)
+        env = TrainingEnvironment(episodes, state_encoder=spec)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            env.train()
+        elapsed = time.perf_counter() - started
+        q_table = env.learner.q_table
+        states = len({state for state, _ in q_table.keys()})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "policy.qtb")
+            env.learner.save(path)
+            file_bytes = os.path.getsize(path)
+        print(f"{spec:>14} {states:>8} {len(q_table):>8} {file_bytes:>11,} "
+              f"{_evaluate(env.learner):>9.1%} {episodes / elapsed:>11.0f}")
+
+def _play_planner_game(maze, planner, record):
+    """
+    Play a PlanningAgent against RandomPlayer
+
+    Args:
+        maze (Maze): Maze to play on
+        planner: Planner of the agent
+        record (callable): Called with the planner after each AI move
+
+    Returns:
+        int: The AI's gem lead at the end
+    """
+    player = RandomPlayer(0, 0, maze)
+    agent = PlanningAgent(maze.size - 1, maze.size - 1, maze, player, TokenSystem(3, maze), planner)
+    for round_number in range(1, ROUNDS + 1):
+        player.make_random_move()
+        agent.make_move()
+        maze.set_round(round_number + 1)
+        record(planner)
+    return agent.get_gems_collected() - player.get_gems_collected()
+
+def bench_planner(games=50, budgets=(0.001, 0.005, 0.02), training_episodes=300):
+    """
+    Compare MCTS planning at several per-move budgets with a trained Q agent.
+
+    Both play the same mazes against RandomPlayer.
+
+    Args:
+        games (int): Games per agent
+        budgets (tuple): Per-move search budgets in seconds
+        training_episodes (int): Training episodes for the Q agent
+    """
+    random.seed(0)
+    env = TrainingEnvironment(training_episodes)
+    with contextlib.redirect_stdout(io.StringIO()):
+        env.train()
+    print(f"MCTS planner vs RandomPlayer over {games} games")
+    print(f"{'agent':>14} {'ms/move':>8} {'iters/s':>9} {'nodes/s':>10} {'win rate':>9}")
+    print(f"{f'Q ({training_episodes} eps)':>14} {'':>8} {'':>9} {'':>10} "
+          f"{_evaluate(env.learner, games):>9.1%}")
+    for budget in budgets:
+        planner = MCTSPlanner(GameEngine(10), budget, rng=random.Random(0))
+        random.seed(1)
+        wins = 0
+        totals = [0, 0, 0.0]
+
+        def record(planner):
+            totals[0] += planner.iterations
+            totals[1] += planner.nodes
+            totals[2] += planner.elapsed
+
+        for maze in generate_batch(games, 10):
+            planner.table.clear()
+            wins += _play_planner_game(maze, planner, record) > 0
+        iterations, nodes, elapsed = totals
+        print(f"{f'MCTS {budget * 1000:g} ms':>14} {elapsed / (games * ROUNDS) * 1000:>8.2f} "
+              f"{iterations / elapsed:>9,.0f} {nodes / elapsed:>10,.0f} {wins / games:>9.1%}")
+
+def bench_iterative_deepening(games=30, budget=0.005):
+    """
+    Report per-move search stats of IterativeDeepeningPlanner with and without its cache.
+
+    Keeping the principal-variation cache between turns lets each search
+    start from what the last one learned; clearing it before every move
+    shows the search from scratch.
+
+    Args:
+        games (int): Games against RandomPlayer per setting
+        budget (float): Per-move search budget in seconds
+    """
+    print(f"Iterative deepening, {budget * 1000:g} ms per move, {games} games vs RandomPlayer")
+    print(f"{'cache':>8} {'depth':>6} {'max depth':>10} {'nodes/move':>11} {'nodes/s':>9} "
+          f"{'p99 ms':>7} {'max ms':>7} {'win rate':>9}")
+    for keep in (False, True):
+        planner = IterativeDeepeningPlanner(GameEngine(10), budget)
+        moves = []
+
+        def record(planner):
+            moves.append((planner.depth, planner.nodes, planner.elapsed))
+            if not keep:
+                planner.cache.clear()
+
+        random.seed(1)
+        wins = 0
+        for maze in generate_batch(games, 10):
+            planner.cache.clear()
+            wins += _play_planner_game(maze, planner, record) > 0
+        depths, nodes, elapsed = (np.array(column) for column in zip(*moves))
+        print(f"{'kept' if keep else 'cleared':>8} {depths.mean():>6.2f} {depths.max():>10} "
+              f"{nodes.mean():>11.0f} {nodes.sum() / elapsed.sum():>9,.0f} "
+              f"{np.percentile(elapsed, 99) * 1000:>7.2f} {elapsed.max() * 1000:>7.2f} "
+              f"{wins / games:>9.1%}")
+
+BENCHMARKS = {
+    "generation": bench_generation,
+    "batch": bench_batch,
+    "connected": bench_connected,
+    "memory": bench_memory,
+    "bitboard": bench_bitboard,
+    "valid_moves": bench_valid_moves,
+    "gem_index": bench_gem_index,
+    "gem_field": bench_gem_field,
+    "path_table": bench_path_table,
+    "render": bench_render,
+    "undo": bench_undo,
+    "engine": bench_engine,
+    "vector_env": bench_vector_env,
+    "parallel_training": bench_parallel_training,
+    "q_table": bench_q_table,
+    "bounded_q_table": bench_bounded_q_table,
+    "warm_start": bench_warm_start,
+    "action_cache": bench_action_cache,
+    "replay": bench_replay,
+    "convergence": bench_convergence,
+    "state_encoders": bench_state_encoders,
+    "planner": bench_planner,
+    "iterative_deepening": bench_iterative_deepening,
+}
+
+if __name__ == "__main__":
+    # Run the named benchmarks, or all of them if none are given
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+        print()
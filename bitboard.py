@@ -0,0 +1,399 @@
+"""
+Bitboard module for an integer-backed maze engine
+"""
+
+from functools import lru_cache
+from constants import (GRID_SIZE, CELL_TYPES, GEM_COUNT, TRAP_COUNT, WALL_COUNT, DIRECTIONS,
+                       OUT_OF_BOUNDS)
+from maze import MOVES_BY_MASK, sample_layout
+from zobrist import keys_for
+from pathing import GemDistanceField
+
+@lru_cache(maxsize=None)
+def _move_table(size):
+    """
+    Get the valid moves of every cell for each pattern of walls around it.
+
+    Entry x * size + y is (around, moves): around has the bits of the
+    cell's in-bounds neighbours, and moves maps walls & around to the
+    MOVES_BY_MASK tuple of the open ones.
+
+    Args:
+        size (int): The size of the maze
+
+    Returns:
+        list: (around, moves) for every cell
+    """
+    table = []
+    for x in range(size):
+        for y in range(size):
+            bits = [1 << ((x + dx) * size + y + dy)
+                    if 0 <= x + dx < size and 0 <= y + dy < size else 0
+                    for dx, dy in DIRECTIONS]
+            moves = {}
+            for mask in range(16):
+                # Directions off the grid are never open
+                if all(bit or not mask >> k & 1 for k, bit in enumerate(bits)):
+                    blocked = sum(bit for k, bit in enumerate(bits) if not mask >> k & 1)
+                    moves[blocked] = MOVES_BY_MASK[mask]
+            table.append((sum(bits), moves))
+    return table
+
+class BitboardPlane:
+    """
+    A boolean layer stored as one Python int, bit x * size + y per cell.
+
+    Supports [x, y] reads and writes so it can stand in for the visited
+    layers of a Maze.
+    """
+    __slots__ = ("size", "bits")
+
+    def __init__(self, size, bits=0):
+        """
+        Initialize the plane.
+
+        Args:
+            size (int): The size of the plane
+            bits (int): Initial bit pattern
+        """
+        self.size = size
+        self.bits = bits
+
+    def __getitem__(self, pos):
+        return bool(self.bits >> (pos[0] * self.size + pos[1]) & 1)
+
+    def __setitem__(self, pos, value):
+        bit = 1 << (pos[0] * self.size + pos[1])
+        if value:
+            self.bits |= bit
+        else:
+            self.bits &= ~bit
+
+class BitboardGrid:
+    """
+    Read-only [x, y] view of a BitboardMaze as cell types.
+    """
+    __slots__ = ("maze",)
+
+    def __init__(self, maze):
+        self.maze = maze
+
+    def __getitem__(self, pos):
+        return self.maze.cell_type(pos[0], pos[1])
+
+class BitboardMaze:
+    """
+    Maze engine that stores walls, gems and traps as bitboards.
+
+    Exposes the same interface as Maze, so Player and AIAgent run on it
+    unchanged, while move generation and reachability become shift and
+    mask operations on Python ints.
+    """
+    def __init__(self, size=GRID_SIZE, wall_count=WALL_COUNT, gem_count=GEM_COUNT,
+                 trap_count=TRAP_COUNT, rng=None):
+        """
+        Initialize a random maze of the given size.
+
+        Args:
+            size (int): The size of the maze
+            wall_count (int): Number of walls to place
+            gem_count (int): Number of gems to place
+            trap_count (int): Number of traps to place
+            rng (numpy.random.Generator, optional): Random generator for layout
+        """
+        walls, gems, traps = sample_layout(size, wall_count, gem_count, trap_count, rng)
+        self._setup(size,
+                    sum(1 << cell for cell in walls.tolist()),
+                    sum(1 << cell for cell in gems.tolist()),
+                    sum(1 << cell for cell in traps.tolist()))
+
+    @classmethod
+    def from_maze(cls, maze):
+        """
+        Build a bitboard copy of an existing Maze.
+
+        Args:
+            maze (Maze): Maze to copy
+
+        Returns:
+            BitboardMaze: Maze with the same cells and visited layers
+        """
+        board = cls.__new__(cls)
+        flat = maze.grid.reshape(-1).tolist()
+        layers = [sum(1 << i for i, cell in enumerate(flat) if cell == CELL_TYPES[name])
+                  for name in ("WALL", "GEM", "TRAP")]
+        board._setup(maze.size, *layers)
+        board.visited_player.bits = _pack(maze.visited_player, maze.size)
+        board.visited_ai.bits = _pack(maze.visited_ai, maze.size)
+        return board
+
+    def _setup(self, size, walls, gems, traps):
+        """Initialize the bitboards and the per-cell lookup tables"""
+        self.size = size
+        self.full = (1 << (size * size)) - 1
+        self.walls = walls
+        self.gems = gems
+        self.traps = traps
+        self.grid = BitboardGrid(self)
+        self._gem_field = None
+        self.version = 0
+        self.zobrist = keys_for(size)
+        self.round = 1
+        self.state_hash = self.zobrist.rounds[self.round]
+        for bits, name in ((walls, "WALL"), (gems, "GEM"), (traps, "TRAP")):
+            cells = []
+            while bits:
+                low = bits & -bits
+                cells.append(low.bit_length() - 1)
+                bits ^= low
+            self.state_hash ^= self.zobrist.hash_cells(CELL_TYPES[name], cells)
+        self.visited_player = BitboardPlane(size, 1)
+        self.visited_ai = BitboardPlane(size, 1 << (size * size - 1))
+
+        # Masks that stop horizontal shifts wrapping between rows
+        first_column = sum(1 << (x * size) for x in range(size))
+        self.not_first = self.full & ~first_column
+        self.not_last = self.full & ~(first_column << (size - 1))
+
+        # Valid moves of every cell by the walls around it, shared per size
+        self._moves = _move_table(size)
+
+    @property
+    def gem_locations(self):
+        """
+        Get the positions of the remaining gems
+
+        Returns:
+            list: List of (x, y) coordinates
+        """
+        locations = []
+        gems = self.gems
+        while gems:
+            low = gems & -gems
+            locations.append(divmod(low.bit_length() - 1, self.size))
+            gems ^= low
+        return locations
+
+    @property
+    def gem_field(self):
+        """
+        Get the BFS distance field to the nearest gem, building it on first use
+
+        Returns:
+            GemDistanceField: Field kept in sync with every later cell change
+        """
+        if self._gem_field is None:
+            self._gem_field = GemDistanceField(self)
+        return self._gem_field
+
+    def set_round(self, round_number):
+        """
+        Record the current round in the state hash
+
+        Args:
+            round_number (int): The round being played
+        """
+        rounds = self.zobrist.rounds
+        self.state_hash ^= rounds[self.round] ^ rounds[round_number]
+        self.round = round_number
+
+    def _cell_changed(self, x, y, previous, cell_type):
+        """Update the version, state hash and distance field after a cell changed type"""
+        self.version += 1
+        cell = x * self.size + y
+        keys = self.zobrist
+        self.state_hash ^= keys.cell_key(previous, cell) ^ keys.cell_key(cell_type, cell)
+        if self._gem_field is not None:
+            self._gem_field.cell_changed(x, y, previous, cell_type)
+
+    def cell_type(self, x, y):
+        """
+        Get the cell type at position (x, y)
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            int: One of the CELL_TYPES values
+        """
+        bit = 1 << (x * self.size + y)
+        if self.walls & bit:
+            return CELL_TYPES["WALL"]
+        if self.gems & bit:
+            return CELL_TYPES["GEM"]
+        if self.traps & bit:
+            return CELL_TYPES["TRAP"]
+        return CELL_TYPES["EMPTY"]
+
+    def is_valid_move(self, x, y):
+        """
+        Check if a move to position (x, y) is valid
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            bool: True if move is valid, False otherwise
+        """
+        if x < 0 or x >= self.size or y < 0 or y >= self.size:
+            return False
+        return not self.walls >> (x * self.size + y) & 1
+
+    def collect_gem(self, x, y):
+        """
+        Collect a gem at position (x, y) if present
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            bool: True if gem was collected, False otherwise
+        """
+        bit = 1 << (x * self.size + y)
+        if self.gems & bit:
+            self.gems ^= bit
+            self._cell_changed(x, y, CELL_TYPES["GEM"], CELL_TYPES["EMPTY"])
+            return True
+        return False
+
+    def check_trap(self, x, y):
+        """
+        Check if position (x, y) contains a trap
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            bool: True if trap is present, False otherwise
+        """
+        return bool(self.traps >> (x * self.size + y) & 1)
+
+    def remove_trap(self, x, y):
+        """
+        Remove a trap at position (x, y) if present
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            bool: True if trap was removed, False otherwise
+        """
+        bit = 1 << (x * self.size + y)
+        if self.traps & bit:
+            self.traps ^= bit
+            self._cell_changed(x, y, CELL_TYPES["TRAP"], CELL_TYPES["EMPTY"])
+            return True
+        return False
+
+    def place_wall(self, x, y):
+        """
+        Place a wall at position (x, y) if empty
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            bool: True if wall was placed, False otherwise
+        """
+        if x < 0 or x >= self.size or y < 0 or y >= self.size:
+            return False
+        bit = 1 << (x * self.size + y)
+        if (self.walls | self.gems | self.traps) & bit:
+            return False
+        self.walls |= bit
+        self._cell_changed(x, y, CELL_TYPES["EMPTY"], CELL_TYPES["WALL"])
+        return True
+
+    def get_state(self):
+        """
+        Get the current state of the maze
+
+        Returns:
+            tuple: (walls, gems, traps) bitboards
+        """
+        return (self.walls, self.gems, self.traps)
+
+    def snapshot(self):
+        """
+        Get a copy of the current state of the maze
+
+        Bitboards are immutable ints, so this is the same as get_state().
+
+        Returns:
+            tuple: (walls, gems, traps) bitboards
+        """
+        return self.get_state()
+
+    def get_valid_moves(self, x, y):
+        """
+        Get all valid moves from position (x, y)
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            tuple: Valid (dx, dy) pairs
+        """
+        around, moves = self._moves[x * self.size + y]
+        return moves[self.walls & around]
+
+    def get_surroundings(self, x, y):
+        """
+        Get the cell types of the four neighbours of position (x, y)
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            tuple: Cell types in DIRECTIONS order; cells off the grid read
+                as OUT_OF_BOUNDS
+        """
+        return tuple(self.cell_type(x + dx, y + dy)
+                     if 0 <= x + dx < self.size and 0 <= y + dy < self.size
+                     else OUT_OF_BOUNDS
+                     for dx, dy in DIRECTIONS)
+
+    def expand(self, cells):
+        """
+        Grow a set of cells by one step in every open direction
+
+        Args:
+            cells (int): Bitboard of cells
+
+        Returns:
+            int: Bitboard of cells and their open neighbours
+        """
+        grown = (cells | ((cells << 1) & self.not_first) | ((cells >> 1) & self.not_last)
+                 | (cells << self.size) | (cells >> self.size))
+        return grown & self.full & ~self.walls
+
+    def reachable(self, x, y):
+        """
+        Get every cell reachable from position (x, y)
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            int: Bitboard of reachable cells
+        """
+        region = 1 << (x * self.size + y)
+        while True:
+            grown = self.expand(region)
+            if grown == region:
+                return region
+            region = grown
+
+def _pack(plane, size):
+    """Pack an [x, y] indexable bool layer into an int bitboard"""
+    return sum(1 << (x * size + y)
+               for x in range(size) for y in range(size) if plane[x, y])
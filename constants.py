@@ -24,11 +24,20 @@ CELL_TYPES = {
     "AI": 5
 }
 
+# Cell type reported for neighbours beyond the edge of the grid
+OUT_OF_BOUNDS = -1
+
+# Move directions, in the order used for open-neighbour masks
+DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
 # Game element counts
 GEM_COUNT = 15
 TRAP_COUNT = 10
 WALL_COUNT = 20
 
+# Trained AI policy written by training.py and loaded by main.py
+POLICY_FILE = "ai_policy.qtb"
+
 # Colors (RGB)
 COLORS = {
     "BACKGROUND": (30, 30, 30),
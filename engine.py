@@ -0,0 +1,233 @@
+"""
+Engine module with a pure functional step() over compact game states
+"""
+
+import numpy as np
+from constants import GRID_SIZE, CELL_TYPES, DIRECTIONS, ROUNDS, GEM_COUNT, TRAP_COUNT, WALL_COUNT
+from maze import sample_layout
+
+# Action ids; teleport to cell c is TELEPORT + c
+MOVE = 0      # 0-3: move in DIRECTIONS order
+WALL = 4      # 4-7: place a wall in DIRECTIONS order
+REMOVE_TRAP = 8
+STAY = 9
+TELEPORT = 10
+
+# Fields of a state tuple. The side to move always comes first, so one
+# step() serves both sides; TURN says which side that is (0 player, 1 AI).
+(TURN, ROUND, WALLS, GEMS, TRAPS,
+ CELL, VISITED, SCORE, GEMS_COLLECTED, TOKENS,
+ OTHER_CELL, OTHER_VISITED, OTHER_SCORE, OTHER_GEMS_COLLECTED, OTHER_TOKENS) = range(15)
+
+class GameEngine:
+    """
+    The game rules as a pure function over immutable states.
+
+    A state is a flat tuple of ints: the round, wall/gem/trap bitboards
+    (bit x * size + y per cell) and, for each side, its cell, visited
+    bitboard, score, gems collected and tokens. step() never mutates its
+    input, so states can be shared freely between search branches and
+    worker processes.
+
+    The rules match Player, AIAgent, TokenSystem and the main.py turn
+    loop: gems score 10, standing on a trap after moving or teleporting
+    costs 5, walls, trap removal and teleports each use a token, and the
+    game ends after the AI's move in the last round.
+    """
+    def __init__(self, size=GRID_SIZE):
+        """
+        Initialize the per-cell lookup tables for a maze size.
+
+        Args:
+            size (int): The size of the maze
+        """
+        self.size = size
+        # Neighbour cell per direction for every cell, -1 off the grid
+        self.targets = tuple(
+            tuple((x + dx) * size + y + dy if 0 <= x + dx < size and 0 <= y + dy < size else -1
+                  for x in range(size) for y in range(size))
+            for dx, dy in DIRECTIONS)
+
+    def new_game(self, wall_count=WALL_COUNT, gem_count=GEM_COUNT, trap_count=TRAP_COUNT,
+                 tokens=3, rng=None):
+        """
+        Create the initial state of a random game
+
+        Args:
+            wall_count (int): Number of walls to place
+            gem_count (int): Number of gems to place
+            trap_count (int): Number of traps to place
+            tokens (int): Tokens each side starts with
+            rng (numpy.random.Generator, optional): Random generator for layout
+
+        Returns:
+            tuple: Initial state, player to move
+        """
+        walls, gems, traps = sample_layout(self.size, wall_count, gem_count, trap_count, rng)
+        return self.initial_state(*(sum(1 << cell for cell in cells.tolist())
+                                    for cells in (walls, gems, traps)), tokens=tokens)
+
+    def initial_state(self, walls, gems, traps, tokens=3):
+        """
+        Create the state at the start of a game on the given cells
+
+        Args:
+            walls (int): Wall bitboard
+            gems (int): Gem bitboard
+            traps (int): Trap bitboard
+            tokens (int): Tokens each side starts with
+
+        Returns:
+            tuple: Initial state, player to move
+        """
+        last = self.size * self.size - 1
+        return (0, 1, walls, gems, traps,
+                0, 1, 0, 0, tokens,
+                last, 1 << last, 0, 0, tokens)
+
+    def from_game(self, maze, player, ai_agent, token_system, round_number=1, player_turn=True):
+        """
+        Capture the state of a game played with the stateful classes
+
+        Args:
+            maze (Maze): The maze
+            player (Player): The player
+            ai_agent (AIAgent): The AI agent
+            token_system (TokenSystem): Holder of the player's tokens
+            round_number (int): The current round
+            player_turn (bool): True if the player moves next
+
+        Returns:
+            tuple: Equivalent state
+        """
+        size = self.size
+        boards = [_pack(maze.grid == CELL_TYPES[name]) for name in ("WALL", "GEM", "TRAP")]
+        sides = (
+            (player.x * size + player.y, _pack(np.asarray(maze.visited_player)),
+             player.score, player.gems_collected, token_system.player_tokens),
+            (ai_agent.x * size + ai_agent.y, _pack(np.asarray(maze.visited_ai)),
+             ai_agent.score, ai_agent.gems_collected, ai_agent.tokens),
+        )
+        if not player_turn:
+            sides = sides[::-1]
+        return (0 if player_turn else 1, round_number, *boards, *sides[0], *sides[1])
+
+    def step(self, state, action):
+        """
+        Apply the action of the side to move
+
+        Illegal actions leave the state unchanged and keep the turn, like
+        the False returns of Player and TokenSystem.
+
+        Args:
+            state (tuple): Current state
+            action (int): Action id
+
+        Returns:
+            tuple: (next state, reward, done) where reward is the mover's score change
+        """
+        (turn, round_number, walls, gems, traps,
+         cell, visited, score, collected, tokens,
+         other_cell, other_visited, other_score, other_collected, other_tokens) = state
+
+        if action < WALL:
+            target = self.targets[action][cell]
+            if target < 0 or walls >> target & 1:
+                return state, 0, False
+            cell = target
+            visited |= 1 << target
+            landed = True
+        elif action < REMOVE_TRAP:
+            target = self.targets[action - WALL][cell]
+            if not tokens or target < 0 or (walls | gems | traps) >> target & 1:
+                return state, 0, False
+            walls |= 1 << target
+            tokens -= 1
+            landed = False
+        elif action == REMOVE_TRAP:
+            if not tokens or not traps >> cell & 1:
+                return state, 0, False
+            traps ^= 1 << cell
+            tokens -= 1
+            landed = False
+        elif action == STAY:
+            landed = False
+        else:
+            target = action - TELEPORT
+            if not tokens or not visited >> target & 1:
+                return state, 0, False
+            cell = target
+            tokens -= 1
+            landed = True
+
+        reward = 0
+        if landed:
+            if gems >> cell & 1:
+                gems ^= 1 << cell
+                collected += 1
+                reward = 10
+            if traps >> cell & 1:
+                reward -= 5
+            score += reward
+
+        done = False
+        if turn:
+            if round_number >= ROUNDS:
+                done = True
+            else:
+                round_number += 1
+        return ((1 - turn, round_number, walls, gems, traps,
+                 other_cell, other_visited, other_score, other_collected, other_tokens,
+                 cell, visited, score, collected, tokens), reward, done)
+
+    def legal_actions(self, state):
+        """
+        Get the legal actions of the side to move, as AIAgent lists them
+
+        Teleports to the current cell are left out; STAY is always included.
+
+        Args:
+            state (tuple): Current state
+
+        Returns:
+            list: Action ids
+        """
+        walls, gems, traps = state[WALLS], state[GEMS], state[TRAPS]
+        cell, tokens = state[CELL], state[TOKENS]
+        blocked = walls | gems | traps
+        actions = []
+        for direction, targets in enumerate(self.targets):
+            target = targets[cell]
+            if target >= 0 and not walls >> target & 1:
+                actions.append(MOVE + direction)
+        if tokens:
+            for direction, targets in enumerate(self.targets):
+                target = targets[cell]
+                if target >= 0 and not blocked >> target & 1:
+                    actions.append(WALL + direction)
+            if traps >> cell & 1:
+                actions.append(REMOVE_TRAP)
+            visited = state[VISITED] & ~(1 << cell)
+            while visited:
+                low = visited & -visited
+                actions.append(TELEPORT + low.bit_length() - 1)
+                visited ^= low
+        actions.append(STAY)
+        return actions
+
+    def sides(self, state):
+        """
+        Get the player's and AI's fields regardless of whose turn it is
+
+        Args:
+            state (tuple): Current state
+
+        Returns:
+            tuple: ((cell, visited, score, gems, tokens) of the player, same for the AI)
+        """
+        first, second = state[CELL:OTHER_CELL], state[OTHER_CELL:]
+        return (second, first) if state[TURN] else (first, second)
+
+def _pack(cells):
+    """Pack a (size, size) bool array into an int bitboard, bit x * size + y"""
+    return int.from_bytes(np.packbits(cells.reshape(-1), bitorder="little").tobytes(), "little")
@@ -0,0 +1,214 @@
+"""
+Features module with pluggable state encoders for the AI agent
+"""
+
+from constants import GRID_SIZE, DIRECTIONS, OUT_OF_BOUNDS
+
+# Radixes of the state features packed into a state id; cell types are
+# packed shifted up by one so that OUT_OF_BOUNDS packs as 0
+_CELL_TYPE_RADIX = 5
+_GEM_DIRECTIONS = DIRECTIONS + ((0, 0),)
+_GEM_IDS = {move: i for i, move in enumerate(_GEM_DIRECTIONS)}
+_TOKEN_RADIX = 64
+
+def _pack_cells(cells):
+    """Pack a tuple of cell types into an int"""
+    packed = 0
+    for cell in cells:
+        packed = packed * _CELL_TYPE_RADIX + cell - OUT_OF_BOUNDS
+    return packed
+
+def _unpack_cells(packed, count):
+    """Unpack count cell types from an int made by _pack_cells"""
+    cells = []
+    for _ in range(count):
+        packed, cell = divmod(packed, _CELL_TYPE_RADIX)
+        cells.append(cell + OUT_OF_BOUNDS)
+    return tuple(reversed(cells))
+
+class AbsoluteEncoder:
+    """
+    The original AIAgent state: (x, y, surroundings, gem direction, tokens).
+
+    The position makes every cell of the maze a separate set of states,
+    so what is learned at one cell does not carry over to another.
+    """
+    name = "absolute"
+
+    def __init__(self, size=GRID_SIZE):
+        """
+        Initialize the encoder.
+
+        Args:
+            size (int): The size of the maze
+        """
+        self.size = size
+
+    @property
+    def spec(self):
+        """String that make_encoder() turns back into this encoder"""
+        return self.name
+
+    def encode(self, agent):
+        """
+        Get the state of an AI agent
+
+        Args:
+            agent (AIAgent): Agent to describe
+
+        Returns:
+            tuple: (x, y, surroundings, nearest gem direction, tokens)
+        """
+        return (agent.x, agent.y, agent.maze.get_surroundings(agent.x, agent.y),
+                agent.maze.gem_field.next_step(agent.x, agent.y), agent.tokens)
+
+    def gem_direction(self, state):
+        """Get the first move towards the nearest gem recorded in a state"""
+        return state[3]
+
+    def state_id(self, state):
+        """
+        Pack a state into an int
+
+        Args:
+            state (tuple): Value from encode()
+
+        Returns:
+            int: State id
+        """
+        x, y, surroundings, gem_direction, tokens = state
+        state_id = (x * self.size + y) * _CELL_TYPE_RADIX ** 4 + _pack_cells(surroundings)
+        state_id = state_id * len(_GEM_DIRECTIONS) + _GEM_IDS[gem_direction]
+        return state_id * _TOKEN_RADIX + tokens
+
+    def decode_id(self, state_id):
+        """
+        Unpack a state id
+
+        Args:
+            state_id (int): Value from state_id()
+
+        Returns:
+            tuple: The state
+        """
+        state_id, tokens = divmod(state_id, _TOKEN_RADIX)
+        state_id, gem = divmod(state_id, len(_GEM_DIRECTIONS))
+        state_id, surroundings = divmod(state_id, _CELL_TYPE_RADIX ** 4)
+        x, y = divmod(state_id, self.size)
+        return (x, y, _unpack_cells(surroundings, 4), _GEM_DIRECTIONS[gem], tokens)
+
+class RelativeEncoder:
+    """
+    A position-independent state: what the agent sees, not where it is.
+
+    The state is (neighbourhood, gem direction, gem distance, tokens).
+    The neighbourhood holds the cell types within radius moves
+    (Manhattan distance) of the agent, nearest first, with cells off the
+    grid read as OUT_OF_BOUNDS; radius 1 is the four surroundings. The BFS
+    distance to the nearest gem is capped at max_distance, and
+    max_distance + 1 means no gem is reachable. The same local situation
+    therefore shares Q-values wherever in the maze it occurs.
+    """
+    name = "relative"
+
+    def __init__(self, size=GRID_SIZE, radius=1, max_distance=8):
+        """
+        Initialize the encoder.
+
+        Args:
+            size (int): The size of the maze
+            radius (int): Manhattan radius of the neighbourhood
+            max_distance (int): Gem distances above this are merged
+        """
+        self.size = size
+        self.radius = radius
+        self.max_distance = max_distance
+        # Ring 1 is exactly get_surroundings(), in DIRECTIONS order
+        self.offsets = list(DIRECTIONS)
+        for ring in range(2, radius + 1):
+            for dx in range(-ring, ring + 1):
+                rest = ring - abs(dx)
+                self.offsets.extend((dx, dy) for dy in ((rest, -rest) if rest else (0,)))
+
+    @property
+    def spec(self):
+        """String that make_encoder() turns back into this encoder"""
+        return f"{self.name}:{self.radius}:{self.max_distance}"
+
+    def encode(self, agent):
+        """
+        Get the state of an AI agent
+
+        Args:
+            agent (AIAgent): Agent to describe
+
+        Returns:
+            tuple: (neighbourhood, nearest gem direction, capped gem distance, tokens)
+        """
+        maze, x, y = agent.maze, agent.x, agent.y
+        cells = maze.get_surroundings(x, y)
+        if self.radius > 1:
+            grid, size = maze.grid, self.size
+            cells += tuple(int(grid[x + dx, y + dy])
+                           if 0 <= x + dx < size and 0 <= y + dy < size else OUT_OF_BOUNDS
+                           for dx, dy in self.offsets[4:])
+        field = maze.gem_field
+        distance = min(field.distance(x, y), self.max_distance + 1)
+        return (cells, field.next_step(x, y), int(distance), agent.tokens)
+
+    def gem_direction(self, state):
+        """Get the first move towards the nearest gem recorded in a state"""
+        return state[1]
+
+    def state_id(self, state):
+        """
+        Pack a state into an int
+
+        Args:
+            state (tuple): Value from encode()
+
+        Returns:
+            int: State id
+        """
+        cells, gem_direction, distance, tokens = state
+        state_id = _pack_cells(cells) * len(_GEM_DIRECTIONS) + _GEM_IDS[gem_direction]
+        state_id = state_id * (self.max_distance + 2) + distance
+        return state_id * _TOKEN_RADIX + tokens
+
+    def decode_id(self, state_id):
+        """
+        Unpack a state id
+
+        Args:
+            state_id (int): Value from state_id()
+
+        Returns:
+            tuple: The state
+        """
+        state_id, tokens = divmod(state_id, _TOKEN_RADIX)
+        state_id, distance = divmod(state_id, self.max_distance + 2)
+        cells, gem = divmod(state_id, len(_GEM_DIRECTIONS))
+        return (_unpack_cells(cells, len(self.offsets)), _GEM_DIRECTIONS[gem], distance, tokens)
+
+# State encoders by name
+STATE_ENCODERS = {
+    AbsoluteEncoder.name: AbsoluteEncoder,
+    RelativeEncoder.name: RelativeEncoder,
+}
+
+def make_encoder(spec="absolute", size=GRID_SIZE):
+    """
+    Create a state encoder from its spec.
+
+    Args:
+        spec (str): Encoder name, optionally followed by its integer
+            parameters separated by colons, e.g. "relative:2:8"
+        size (int): The size of the maze
+
+    Returns:
+        AbsoluteEncoder or RelativeEncoder: The encoder
+    """
+    name, *parameters = spec.split(":")
+    if name not in STATE_ENCODERS:
+        raise ValueError(f"Unknown state encoder {name!r}")
+    return STATE_ENCODERS[name](size, *(int(parameter) for parameter in parameters))
@@ -0,0 +1,101 @@
+"""
+Journal module for cheap checkpoints and undo of the game state
+"""
+
+class GameJournal:
+    """
+    Records changes to a game so it can be rolled back to a checkpoint.
+
+    Cell edits are logged by the maze as they happen. Positions, scores
+    and token counts are small, so a checkpoint stores their values, and
+    visited lists only ever grow, so it stores their lengths. Restoring
+    therefore costs O(changes since the checkpoint), not a copy of the
+    grid, and goes through the same setters as play so the state hash,
+    gem index, move masks and distance tables stay in sync.
+    """
+    def __init__(self, maze, player, ai_agent, token_system=None):
+        """
+        Attach a journal to a game.
+
+        Args:
+            maze (Maze): Maze whose cell changes are recorded
+            player (Player): The player
+            ai_agent (AIAgent): The AI agent
+            token_system (TokenSystem, optional): Holder of the player's tokens
+        """
+        self.maze = maze
+        self.player = player
+        self.ai_agent = ai_agent
+        self.token_system = token_system
+        if maze.change_log is None:
+            maze.change_log = []
+        self.log = maze.change_log
+
+    def detach(self):
+        """Stop recording cell changes; existing checkpoints become invalid"""
+        self.maze.change_log = None
+
+    def checkpoint(self):
+        """
+        Record the current game state
+
+        Returns:
+            tuple: Checkpoint to pass to restore()
+        """
+        player, ai = self.player, self.ai_agent
+        tokens = self.token_system
+        return (len(self.log), self.maze.round,
+                player.x, player.y, player.score, player.gems_collected,
+                len(player.visited_positions),
+                ai.x, ai.y, ai.score, ai.gems_collected, ai.tokens,
+                len(ai.visited_positions),
+                tokens.player_tokens if tokens is not None else None,
+                tokens.teleport_selection_active if tokens is not None else None)
+
+    def restore(self, checkpoint):
+        """
+        Roll the game back to a checkpoint
+
+        Checkpoints taken after this one are no longer valid; this one and
+        earlier ones can be restored again.
+
+        Args:
+            checkpoint (tuple): Value returned by checkpoint()
+        """
+        (log_length, round_number,
+         player_x, player_y, player_score, player_gems, player_visited,
+         ai_x, ai_y, ai_score, ai_gems, ai_tokens, ai_visited,
+         player_tokens, teleport_active) = checkpoint
+        maze, player, ai = self.maze, self.player, self.ai_agent
+
+        # Undo cell edits newest first, without logging the undo itself
+        log = self.log
+        maze.change_log = None
+        try:
+            while len(log) > log_length:
+                x, y, previous = log.pop()
+                maze._set_cell(x, y, previous)
+        finally:
+            maze.change_log = log
+
+        _truncate_visited(player.visited_positions, maze.visited_player, player_visited)
+        _truncate_visited(ai.visited_positions, maze.visited_ai, ai_visited)
+
+        player._set_position(player_x, player_y)
+        player.score = player_score
+        player.gems_collected = player_gems
+        ai._set_position(ai_x, ai_y)
+        ai.score = ai_score
+        ai.gems_collected = ai_gems
+        ai.tokens = ai_tokens
+        ai.invalidate_actions()
+        maze.set_round(round_number)
+        if self.token_system is not None:
+            self.token_system.player_tokens = player_tokens
+            self.token_system.teleport_selection_active = teleport_active
+
+def _truncate_visited(positions, layer, length):
+    """Forget visited positions added after a checkpoint, clearing them in the maze layer"""
+    for x, y in positions[length:]:
+        layer[x, y] = False
+    del positions[length:]
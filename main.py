@@ -9,10 +9,10 @@ import pygame
 import numpy as np
 from maze import Maze
 from player import Player
-from ai_agent import AIAgent
+from ai_agent import AIAgent, QLearner
 from token_system import TokenSystem
 from ui import UI
-from constants import GRID_SIZE, CELL_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, FPS, ROUNDS
+from constants import GRID_SIZE, CELL_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, FPS, ROUNDS, POLICY_FILE
 
 def main():
     """Main function to start the game"""
@@ -22,11 +22,14 @@ def main():
     pygame.display.set_caption("Maze Game: Player vs AI")
     clock = pygame.time.Clock()
     
+    # Start the AI from a trained policy if training.py has saved one
+    learner = QLearner.load(POLICY_FILE) if os.path.exists(POLICY_FILE) else QLearner()
+    
     # Initialize game components
     maze = Maze(GRID_SIZE)
     player = Player(0, 0, maze)  # Player starts at top-left
-    ai_agent = AIAgent(GRID_SIZE - 1, GRID_SIZE - 1, maze)  # AI starts at bottom-right
-    token_system = TokenSystem(3)  # Start with 3 tokens
+    ai_agent = AIAgent(GRID_SIZE - 1, GRID_SIZE - 1, maze, learner)  # AI starts at bottom-right
+    token_system = TokenSystem(3, maze)  # Start with 3 tokens
     ui = UI(screen, maze, player, ai_agent, token_system)
     
     # Game state variables
@@ -78,8 +81,8 @@ def main():
                     # Reset game
                     maze = Maze(GRID_SIZE)
                     player = Player(0, 0, maze)
-                    ai_agent = AIAgent(GRID_SIZE - 1, GRID_SIZE - 1, maze)
-                    token_system = TokenSystem(3)
+                    ai_agent = AIAgent(GRID_SIZE - 1, GRID_SIZE - 1, maze, learner)
+                    token_system = TokenSystem(3, maze)
                     ui = UI(screen, maze, player, ai_agent, token_system)
                     current_round = 1
                     player_turn = True
@@ -95,6 +98,7 @@ def main():
                 game_over = True
             else:
                 current_round += 1
+                maze.set_round(current_round)
         
         # Render game
         screen.fill((0, 0, 0))
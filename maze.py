@@ -3,30 +3,512 @@ Maze module for creating and managing the maze environment
 """
 
 import random
+import time
+from array import array
+from collections import deque
 import numpy as np
-from constants import GRID_SIZE, CELL_TYPES, GEM_COUNT, TRAP_COUNT, WALL_COUNT
+from constants import (GRID_SIZE, CELL_TYPES, GEM_COUNT, TRAP_COUNT, WALL_COUNT, DIRECTIONS,
+                       OUT_OF_BOUNDS)
+from pathing import GemDistanceField, ShortestPathTable
+from zobrist import keys_for
+
+# Layouts up to this many items are sampled with the stdlib generator
+_SMALL_LAYOUT = 256
+# Layouts up to this many items are written one cell at a time, which
+# beats NumPy fancy indexing at that scale
+_SCALAR_PLACEMENT = 64
+# Valid (dx, dy) moves for every 4-bit open-neighbour mask; bit k refers
+# to DIRECTIONS[k]
+MOVES_BY_MASK = tuple(
+    tuple(move for bit, move in enumerate(DIRECTIONS) if mask >> bit & 1)
+    for mask in range(16)
+)
+
+def sample_layout(size, wall_count=WALL_COUNT, gem_count=GEM_COUNT,
+                  trap_count=TRAP_COUNT, rng=None):
+    """
+    Sample distinct wall, gem and trap cells in a single pass.
+    
+    The two start corners are excluded by drawing from the cells that lie
+    strictly between them in flat order, so no rejection sampling is needed.
+    
+    Args:
+        size (int): The size of the maze
+        wall_count (int): Number of walls to place
+        gem_count (int): Number of gems to place
+        trap_count (int): Number of traps to place
+        rng (numpy.random.Generator, optional): Random generator to draw from
+        
+    Returns:
+        tuple: Flat cell indices (walls, gems, traps) as numpy arrays
+    """
+    free_cells = size * size - 2
+    total = wall_count + gem_count + trap_count
+    if min(wall_count, gem_count, trap_count) < 0 or total > free_cells:
+        raise ValueError(f"Cannot place {total} items in a {size}x{size} maze")
+    
+    if rng is not None:
+        cells = rng.choice(free_cells, size=total, replace=False)
+    elif total <= _SMALL_LAYOUT:
+        # Seeding a NumPy generator costs more than sampling a few dozen
+        # cells, so small layouts draw straight from the stdlib generator
+        if total * 8 <= free_cells:
+            # Few collisions to reject, and no setup cost as in random.sample
+            picked = {}
+            while len(picked) < total:
+                picked.setdefault(random.randrange(free_cells))
+            cells = list(picked)
+        else:
+            cells = random.sample(range(free_cells), total)
+        cells = np.array(cells, dtype=np.int64)
+    else:
+        # Derive from the stdlib generator so random.seed() keeps mazes reproducible
+        rng = np.random.default_rng(random.getrandbits(64))
+        cells = rng.choice(free_cells, size=total, replace=False)
+    
+    # Offset by one to skip the top-left corner; the bottom-right corner is
+    # the last flat index and is never reached
+    cells += 1
+    return (cells[:wall_count],
+            cells[wall_count:wall_count + gem_count],
+            cells[wall_count + gem_count:])
+
+def place_layout(grid, walls, gems, traps):
+    """
+    Write sampled wall, gem and trap cells into a grid.
+    
+    Args:
+        grid (numpy.ndarray): (size, size) cell types to write into
+        walls (numpy.ndarray): Flat indices of the wall cells
+        gems (numpy.ndarray): Flat indices of the gem cells
+        traps (numpy.ndarray): Flat indices of the trap cells
+    """
+    size = grid.shape[1]
+    layout = ((walls, CELL_TYPES["WALL"]), (gems, CELL_TYPES["GEM"]),
+              (traps, CELL_TYPES["TRAP"]))
+    if len(walls) + len(gems) + len(traps) <= _SCALAR_PLACEMENT:
+        for cells, cell_type in layout:
+            for cell in cells.tolist():
+                grid[divmod(cell, size)] = cell_type
+    else:
+        for cells, cell_type in layout:
+            grid[np.divmod(cells, size)] = cell_type
+
+def sample_layout_batch(n, size, wall_count=WALL_COUNT, gem_count=GEM_COUNT,
+                        trap_count=TRAP_COUNT, rng=None):
+    """
+    Sample distinct wall, gem and trap cells for n mazes at once.
+    
+    Each row is an independent uniform sample without replacement, taken
+    from a partial sort of one block of random keys.
+    
+    Args:
+        n (int): Number of mazes
+        size (int): The size of each maze
+        wall_count (int): Number of walls per maze
+        gem_count (int): Number of gems per maze
+        trap_count (int): Number of traps per maze
+        rng (numpy.random.Generator, optional): Random generator to draw from
+        
+    Returns:
+        tuple: Flat cell indices (walls, gems, traps), each of shape (n, count)
+    """
+    free_cells = size * size - 2
+    total = wall_count + gem_count + trap_count
+    if min(wall_count, gem_count, trap_count) < 0 or total > free_cells:
+        raise ValueError(f"Cannot place {total} items in a {size}x{size} maze")
+    
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+    
+    keys = rng.random((n, free_cells), dtype=np.float32)
+    if 0 < total < free_cells:
+        # Keep the total smallest keys per row, then order them by key so
+        # which of them become walls, gems or traps is also uniform
+        cells = np.argpartition(keys, total - 1, axis=1)[:, :total]
+        order = np.argsort(np.take_along_axis(keys, cells, axis=1), axis=1)
+        cells = np.take_along_axis(cells, order, axis=1)
+    else:
+        cells = np.argsort(keys, axis=1)[:, :total]
+    
+    cells += 1
+    return (cells[:, :wall_count],
+            cells[:, wall_count:wall_count + gem_count],
+            cells[:, wall_count + gem_count:])
+
+def label_regions(open_cells):
+    """
+    Label the 4-connected regions of open cells.
+    
+    Uses vectorized union-find: every pair of open neighbours hooks the
+    larger of their two roots onto the smaller one, and pointer jumping
+    then flattens the trees, until no pair straddles two roots.
+    
+    Args:
+        open_cells (numpy.ndarray): (size, size) bool mask of passable cells
+        
+    Returns:
+        numpy.ndarray: (size, size) int labels, -1 for blocked cells. Each
+            region is labelled with the smallest flat index it contains.
+    """
+    rows, cols = open_cells.shape
+    index = np.arange(rows * cols).reshape(rows, cols)
+    
+    # Pairs of neighbouring cells that are both open
+    down = open_cells[:-1, :] & open_cells[1:, :]
+    right = open_cells[:, :-1] & open_cells[:, 1:]
+    first = np.concatenate((index[:-1, :][down], index[:, :-1][right]))
+    second = np.concatenate((index[1:, :][down], index[:, 1:][right]))
+    
+    parent = index.reshape(-1).copy()
+    while True:
+        root_first = parent[first]
+        root_second = parent[second]
+        split = root_first != root_second
+        if not split.any():
+            break
+        
+        # Hook the larger root under the smaller one
+        low = np.minimum(root_first[split], root_second[split])
+        high = np.maximum(root_first[split], root_second[split])
+        np.minimum.at(parent, high, low)
+        
+        # Pointer jumping until every cell points straight at its root
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+        
+        # Only pairs still straddling two roots need another look
+        first = first[split]
+        second = second[split]
+    
+    labels = parent.reshape(rows, cols)
+    labels[~open_cells] = -1
+    return labels
+
+class BitPlane:
+    """
+    A (size, size) boolean layer packed eight cells to a byte.
+    
+    Supports the same [x, y] reads and writes as a bool ndarray, so it can
+    stand in for the visited layers of a Maze.
+    """
+    __slots__ = ("size", "shape", "bits")
+    
+    def __init__(self, size):
+        """
+        Initialize an all-False plane.
+        
+        Args:
+            size (int): The size of the plane
+        """
+        self.size = size
+        self.shape = (size, size)
+        self.bits = bytearray((size * size + 7) // 8)
+    
+    def __getitem__(self, pos):
+        index = pos[0] * self.size + pos[1]
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+    
+    def __setitem__(self, pos, value):
+        index = pos[0] * self.size + pos[1]
+        if value:
+            self.bits[index >> 3] |= 1 << (index & 7)
+        else:
+            self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+    
+    def __array__(self, dtype=None, copy=None):
+        return self.to_array() if dtype is None else self.to_array().astype(dtype)
+    
+    def to_array(self):
+        """
+        Unpack the plane into a new bool array
+        
+        Returns:
+            numpy.ndarray: (size, size) bool array
+        """
+        packed = np.frombuffer(self.bits, dtype=np.uint8)
+        cells = np.unpackbits(packed, count=self.size * self.size, bitorder="little")
+        return cells.reshape(self.shape).astype(bool)
+    
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+class _SparseSlots(dict):
+    """Slot table holding only the cells that have held a gem"""
+    def __missing__(self, cell):
+        return -1
+
+class GemIndex:
+    """
+    Set of gem positions with O(1) add, remove and membership.
+    
+    Positions live in a dense list, and a per-cell slot table maps each
+    cell to its index in that list. Removal moves the last gem into the
+    freed slot. Iterating walks the dense list, so it only touches
+    remaining gems. A sparse index keeps the slot table in a dict, so its
+    memory grows with the gems rather than the cells.
+    """
+    __slots__ = ("size", "_slots", "_gems")
+    
+    def __init__(self, size, locations=(), sparse=False):
+        """
+        Initialize the index.
+        
+        Args:
+            size (int): The size of the maze
+            locations (iterable): Initial (x, y) gem positions
+            sparse (bool): Key the slot table by cell instead of
+                allocating one slot per cell
+        """
+        self.size = size
+        self._slots = _SparseSlots() if sparse else array("i", [-1]) * (size * size)
+        self._gems = []
+        for x, y in locations:
+            self.add((x, y))
+    
+    def __len__(self):
+        return len(self._gems)
+    
+    def __iter__(self):
+        return iter(self._gems)
+    
+    def __getitem__(self, index):
+        return self._gems[index]
+    
+    def __contains__(self, pos):
+        return self._slots[pos[0] * self.size + pos[1]] >= 0
+    
+    def __repr__(self):
+        return f"GemIndex({self._gems!r})"
+    
+    def add(self, pos):
+        """
+        Add a gem position if not already present
+        
+        Args:
+            pos (tuple): (x, y) coordinates
+        """
+        cell = pos[0] * self.size + pos[1]
+        if self._slots[cell] < 0:
+            self._slots[cell] = len(self._gems)
+            self._gems.append((int(pos[0]), int(pos[1])))
+    
+    def discard(self, pos):
+        """
+        Remove a gem position if present
+        
+        Args:
+            pos (tuple): (x, y) coordinates
+            
+        Returns:
+            bool: True if the position was removed, False otherwise
+        """
+        cell = pos[0] * self.size + pos[1]
+        slot = self._slots[cell]
+        if slot < 0:
+            return False
+        
+        # Swap the last gem into the freed slot
+        last = self._gems.pop()
+        if slot < len(self._gems):
+            self._gems[slot] = last
+            self._slots[last[0] * self.size + last[1]] = slot
+        self._slots[cell] = -1
+        return True
+    
+    def remove(self, pos):
+        """
+        Remove a gem position, like list.remove
+        
+        Args:
+            pos (tuple): (x, y) coordinates
+        """
+        if not self.discard(pos):
+            raise ValueError(f"{pos} is not a gem location")
+
+class MazeBatch:
+    """
+    A batch of mazes stored as stacked (n, size, size) tensors.
+    
+    Indexing the batch returns a Maze that views one slice of the tensors,
+    so moves made through it are written straight into the batch. Cells
+    are kept with the same wall border as Maze; grids is the interior view.
+    """
+    def __init__(self, cells, visited_player, visited_ai):
+        """
+        Initialize the batch from existing tensors without copying.
+        
+        Args:
+            cells (numpy.ndarray): (n, size + 2, size + 2) uint8 cell types
+                including the wall border
+            visited_player (numpy.ndarray): (n, size, size) bool visited cells
+            visited_ai (numpy.ndarray): (n, size, size) bool visited cells
+        """
+        self.cells = cells
+        self.grids = cells[:, 1:-1, 1:-1]
+        self.visited_player = visited_player
+        self.visited_ai = visited_ai
+        self.size = self.grids.shape[1]
+    
+    def __len__(self):
+        return self.grids.shape[0]
+    
+    def __getitem__(self, index):
+        """
+        Get a Maze view of one maze in the batch
+        
+        Args:
+            index (int): Index of the maze
+            
+        Returns:
+            Maze: Maze sharing memory with the batch tensors
+        """
+        return Maze.from_arrays(self.cells[index], self.visited_player[index],
+                                self.visited_ai[index], padded=True)
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+def generate_batch(n, size=GRID_SIZE, wall_count=WALL_COUNT, gem_count=GEM_COUNT,
+                   trap_count=TRAP_COUNT, rng=None):
+    """
+    Generate n random mazes in one call.
+    
+    Args:
+        n (int): Number of mazes
+        size (int): The size of each maze
+        wall_count (int): Number of walls per maze
+        gem_count (int): Number of gems per maze
+        trap_count (int): Number of traps per maze
+        rng (numpy.random.Generator, optional): Random generator for layouts
+        
+    Returns:
+        MazeBatch: The generated mazes
+    """
+    walls, gems, traps = sample_layout_batch(n, size, wall_count, gem_count,
+                                             trap_count, rng)
+    grids = np.zeros((n, size * size), dtype=np.uint8)
+    rows = np.arange(n)[:, None]
+    grids[rows, walls] = CELL_TYPES["WALL"]
+    grids[rows, gems] = CELL_TYPES["GEM"]
+    grids[rows, traps] = CELL_TYPES["TRAP"]
+    
+    cells = np.full((n, size + 2, size + 2), CELL_TYPES["WALL"], dtype=np.uint8)
+    cells[:, 1:-1, 1:-1] = grids.reshape(n, size, size)
+    
+    visited_player = np.zeros((n, size, size), dtype=bool)
+    visited_ai = np.zeros((n, size, size), dtype=bool)
+    visited_player[:, 0, 0] = True
+    visited_ai[:, size - 1, size - 1] = True
+    
+    return MazeBatch(cells, visited_player, visited_ai)
 
 class Maze:
     """
     Represents the 10x10 maze environment with gems, traps, and walls.
+    
+    Cells are stored with a one-cell wall border so that neighbour lookups
+    need no bounds checks; grid is a view of the interior. A per-cell mask
+    of open neighbours is kept up to date for get_valid_moves, except in
+    compact mazes, which read the neighbours from the cells instead.
     """
-    def __init__(self, size):
+    def __init__(self, size, wall_count=WALL_COUNT, gem_count=GEM_COUNT,
+                 trap_count=TRAP_COUNT, rng=None, connected=False, compact=False):
         """
         Initialize the maze with a given size.
         
         Args:
             size (int): The size of the maze (10x10 default)
+            wall_count (int): Number of walls to place
+            gem_count (int): Number of gems to place
+            trap_count (int): Number of traps to place
+            rng (numpy.random.Generator, optional): Random generator for layout
+            connected (bool): Remove walls until every gem and both start
+                corners share one region
+            compact (bool): Store the visited layers as bit-packed planes,
+                skip the open-neighbour mask and keep a sparse gem index
         """
         self.size = size
-        self.grid = np.zeros((size, size), dtype=int)
-        self.visited_player = np.zeros((size, size), dtype=bool)
-        self.visited_ai = np.zeros((size, size), dtype=bool)
-        self.gem_locations = []
+        self._cells = np.full((size + 2, size + 2), CELL_TYPES["WALL"], dtype=np.uint8)
+        self._cells[1:-1, 1:-1] = CELL_TYPES["EMPTY"]
+        self.grid = self._cells[1:-1, 1:-1]
+        self._grid_view = self._read_only_view()
+        if compact:
+            self.visited_player = BitPlane(size)
+            self.visited_ai = BitPlane(size)
+        else:
+            self.visited_player = np.zeros((size, size), dtype=bool)
+            self.visited_ai = np.zeros((size, size), dtype=bool)
+        self.compact = compact
+        self.gem_locations = GemIndex(size, sparse=compact)
+        self._gem_field = None
+        self._path_table = None
+        self.change_log = None
+        self.version = 0
+        self.generation_stats = {"repair_passes": 0, "walls_removed": 0, "seconds": 0.0}
         
         # Generate maze elements
-        self._generate_maze()
+        start = time.perf_counter()
+        self._generate_maze(wall_count, gem_count, trap_count, rng)
+        if connected:
+            self._connect_regions()
+        if compact:
+            self._open_mask = None
+        else:
+            self._build_open_mask()
+        self._init_hash()
+        self.generation_stats["seconds"] = time.perf_counter() - start
         
-    def _generate_maze(self):
+    @classmethod
+    def from_arrays(cls, grid, visited_player, visited_ai, padded=False):
+        """
+        Create a maze that wraps existing arrays without copying them.
+        
+        An unpadded grid has to be copied into a bordered array; pass the
+        bordered array with padded=True to share it instead.
+        
+        Args:
+            grid (numpy.ndarray): (size, size) cell types, or
+                (size + 2, size + 2) with a wall border if padded
+            visited_player (numpy.ndarray): (size, size) bool visited cells
+            visited_ai (numpy.ndarray): (size, size) bool visited cells
+            padded (bool): True if grid already has the wall border
+            
+        Returns:
+            Maze: Maze backed by the given arrays
+        """
+        maze = cls.__new__(cls)
+        if padded:
+            maze._cells = grid
+        else:
+            maze._cells = np.full((grid.shape[0] + 2, grid.shape[1] + 2),
+                                  CELL_TYPES["WALL"], dtype=np.uint8)
+            maze._cells[1:-1, 1:-1] = grid
+        maze.grid = maze._cells[1:-1, 1:-1]
+        maze._grid_view = maze._read_only_view()
+        maze.size = maze.grid.shape[0]
+        maze.compact = False
+        maze.visited_player = visited_player
+        maze.visited_ai = visited_ai
+        maze.generation_stats = {"repair_passes": 0, "walls_removed": 0, "seconds": 0.0}
+        
+        gem_x, gem_y = np.nonzero(maze.grid == CELL_TYPES["GEM"])
+        maze.gem_locations = GemIndex(maze.size, zip(gem_x.tolist(), gem_y.tolist()))
+        maze._gem_field = None
+        maze._path_table = None
+        maze.change_log = None
+        maze.version = 0
+        maze._init_hash()
+        maze._build_open_mask()
+        return maze
+        
+    def _generate_maze(self, wall_count=WALL_COUNT, gem_count=GEM_COUNT,
+                       trap_count=TRAP_COUNT, rng=None):
         """Generate a random maze with gems, traps, and walls"""
         # Clear corners for player and AI
         self.grid[0, 0] = CELL_TYPES["EMPTY"]  # Top-left for player
@@ -36,33 +518,188 @@ class Maze:
         self.visited_player[0, 0] = True
         self.visited_ai[self.size-1, self.size-1] = True
         
-        # Generate walls
-        wall_count = 0
-        while wall_count < WALL_COUNT:
-            x, y = random.randint(0, self.size-1), random.randint(0, self.size-1)
-            # Don't place walls in player or AI starting positions
-            if (x, y) != (0, 0) and (x, y) != (self.size-1, self.size-1):
-                self.grid[x, y] = CELL_TYPES["WALL"]
-                wall_count += 1
-        
-        # Generate gems
-        gem_count = 0
-        while gem_count < GEM_COUNT:
-            x, y = random.randint(0, self.size-1), random.randint(0, self.size-1)
-            # Don't place gems on walls or in player/AI starting positions
-            if self.grid[x, y] == CELL_TYPES["EMPTY"] and (x, y) != (0, 0) and (x, y) != (self.size-1, self.size-1):
-                self.grid[x, y] = CELL_TYPES["GEM"]
-                self.gem_locations.append((x, y))
-                gem_count += 1
-        
-        # Generate traps
-        trap_count = 0
-        while trap_count < TRAP_COUNT:
-            x, y = random.randint(0, self.size-1), random.randint(0, self.size-1)
-            # Don't place traps on walls, gems, or in player/AI starting positions
-            if self.grid[x, y] == CELL_TYPES["EMPTY"] and (x, y) != (0, 0) and (x, y) != (self.size-1, self.size-1):
-                self.grid[x, y] = CELL_TYPES["TRAP"]
-                trap_count += 1
+        # Sample every placement at once from the non-corner cells
+        walls, gems, traps = sample_layout(self.size, wall_count, gem_count,
+                                           trap_count, rng)
+        place_layout(self.grid, walls, gems, traps)
+        for cell in gems.tolist():
+            self.gem_locations.add(divmod(cell, self.size))
+    
+    def _connect_regions(self):
+        """
+        Repair the maze so every gem and both start corners are reachable.
+        
+        Each pass labels the open regions and, if any required cell is cut
+        off from the player's corner, runs a 0-1 BFS out of the player's
+        region in which entering a wall costs one. Walking back from each
+        stranded region then removes the fewest walls that join it up.
+        """
+        wall = CELL_TYPES["WALL"]
+        corner = self.size - 1
+        
+        while True:
+            labels = label_regions(self.grid != wall)
+            main = labels[0, 0]
+            
+            # Regions holding a gem or the AI corner but not the player corner
+            required = labels[self.grid == CELL_TYPES["GEM"]]
+            stranded = set(required[required != main].tolist())
+            if labels[corner, corner] != main:
+                stranded.add(int(labels[corner, corner]))
+            if not stranded:
+                return
+            
+            self.generation_stats["repair_passes"] += 1
+            self._carve_to_main(labels.reshape(-1) == main, stranded)
+    
+    def _carve_to_main(self, main_cells, stranded):
+        """
+        Remove the walls on a cheapest path from each stranded region to the main region.
+        
+        Args:
+            main_cells (numpy.ndarray): Flat bool mask of the main region
+            stranded (set): Flat index of one cell in each stranded region
+        """
+        size = self.size
+        is_wall = (self.grid == CELL_TYPES["WALL"]).reshape(-1).tolist()
+        
+        sources = np.flatnonzero(main_cells).tolist()
+        cost = [size * size] * (size * size)
+        parent = [-1] * (size * size)
+        for cell in sources:
+            cost[cell] = 0
+        
+        queue = deque(sources)
+        pending = set(stranded)
+        while queue and pending:
+            cell = queue.popleft()
+            pending.discard(cell)
+            x, y = divmod(cell, size)
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if 0 <= nx < size and 0 <= ny < size:
+                    neighbor = nx * size + ny
+                    step = is_wall[neighbor]
+                    if cost[cell] + step < cost[neighbor]:
+                        cost[neighbor] = cost[cell] + step
+                        parent[neighbor] = cell
+                        if step:
+                            queue.append(neighbor)
+                        else:
+                            queue.appendleft(neighbor)
+        
+        for cell in stranded:
+            # Stop at the main region or at a corridor carved for another region
+            while cost[cell] > 0:
+                if is_wall[cell]:
+                    self.grid[divmod(cell, size)] = CELL_TYPES["EMPTY"]
+                    is_wall[cell] = False
+                    self.generation_stats["walls_removed"] += 1
+                cost[cell] = 0
+                cell = parent[cell]
+    
+    def _build_open_mask(self):
+        """Compute the open-neighbour mask of every cell from scratch"""
+        size = self.size
+        passable = self._cells != CELL_TYPES["WALL"]
+        mask = np.zeros((size, size), dtype=np.uint8)
+        for bit, (dx, dy) in enumerate(DIRECTIONS):
+            mask |= passable[1 + dx:size + 1 + dx, 1 + dy:size + 1 + dy].astype(np.uint8) << bit
+        self._open_mask = bytearray(mask.tobytes())
+    
+    def _init_hash(self):
+        """
+        Start the Zobrist hash of the game state from the current cells.
+        
+        Player and AIAgent fold their position and tokens into state_hash
+        when they are created, and keep it updated as they change.
+        """
+        self.zobrist = keys_for(self.size)
+        self.round = 1
+        self.state_hash = self.zobrist.grid_hash(self.grid) ^ self.zobrist.rounds[self.round]
+    
+    def set_round(self, round_number):
+        """
+        Record the current round in the state hash
+        
+        Args:
+            round_number (int): The round being played
+        """
+        rounds = self.zobrist.rounds
+        self.state_hash ^= rounds[self.round] ^ rounds[round_number]
+        self.round = round_number
+    
+    @property
+    def gem_field(self):
+        """
+        Get the BFS distance field to the nearest gem, building it on first use
+        
+        Returns:
+            GemDistanceField: Field kept in sync with every later cell change
+        """
+        if self._gem_field is None:
+            self._gem_field = GemDistanceField(self)
+        return self._gem_field
+    
+    @property
+    def path_table(self):
+        """
+        Get the all-pairs shortest-path table, building it on first use
+        
+        Only meant for small mazes; see pathing.MAX_TABLE_CELLS. Opening a
+        wall drops the table, to be rebuilt on the next use, so undoing a
+        wall placement does not pay for a rebuild nobody reads.
+        
+        Returns:
+            ShortestPathTable: Table kept in sync with every later wall change
+        """
+        if self._path_table is None:
+            self._path_table = ShortestPathTable(self.grid)
+        return self._path_table
+    
+    def _set_cell(self, x, y, cell_type):
+        """
+        Change the cell at position (x, y) and keep derived state in sync
+        
+        Every change increments version, so callers can cache anything
+        derived from the cells. While a GameJournal is attached,
+        change_log is a list and every change is recorded in it as
+        (x, y, previous type).
+        
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+            cell_type (int): New cell type
+        """
+        wall = CELL_TYPES["WALL"]
+        previous = self.grid[x, y]
+        self.grid[x, y] = cell_type
+        self.version += 1
+        if self.change_log is not None:
+            self.change_log.append((x, y, previous))
+        
+        cell = x * self.size + y
+        keys = self.zobrist
+        self.state_hash ^= keys.cell_key(previous, cell) ^ keys.cell_key(cell_type, cell)
+        
+        if previous == CELL_TYPES["GEM"]:
+            self.gem_locations.discard((x, y))
+        if cell_type == CELL_TYPES["GEM"]:
+            self.gem_locations.add((x, y))
+        
+        if self._open_mask is not None and (previous == wall) != (cell_type == wall):
+            # Flip the bit pointing at this cell in each in-bounds neighbour
+            for bit, (dx, dy) in enumerate(DIRECTIONS):
+                nx, ny = x - dx, y - dy
+                if 0 <= nx < self.size and 0 <= ny < self.size:
+                    self._open_mask[nx * self.size + ny] ^= 1 << bit
+        
+        if self._gem_field is not None:
+            self._gem_field.cell_changed(x, y, previous, cell_type)
+        if self._path_table is not None:
+            if previous == wall and cell_type != wall:
+                self._path_table = None
+            else:
+                self._path_table.cell_changed(x, y, previous, cell_type)
     
     def is_valid_move(self, x, y):
         """
@@ -75,15 +712,8 @@ class Maze:
         Returns:
             bool: True if move is valid, False otherwise
         """
-        # Check if within grid bounds
-        if x < 0 or x >= self.size or y < 0 or y >= self.size:
-            return False
-        
-        # Check if position is a wall
-        if self.grid[x, y] == CELL_TYPES["WALL"]:
-            return False
-            
-        return True
+        size = self.size
+        return 0 <= x < size and 0 <= y < size and self._cells[x + 1, y + 1] != CELL_TYPES["WALL"]
     
     def collect_gem(self, x, y):
         """
@@ -97,9 +727,7 @@ class Maze:
             bool: True if gem was collected, False otherwise
         """
         if self.grid[x, y] == CELL_TYPES["GEM"]:
-            self.grid[x, y] = CELL_TYPES["EMPTY"]
-            if (x, y) in self.gem_locations:
-                self.gem_locations.remove((x, y))
+            self._set_cell(x, y, CELL_TYPES["EMPTY"])
             return True
         return False
     
@@ -128,7 +756,7 @@ class Maze:
             bool: True if trap was removed, False otherwise
         """
         if self.grid[x, y] == CELL_TYPES["TRAP"]:
-            self.grid[x, y] = CELL_TYPES["EMPTY"]
+            self._set_cell(x, y, CELL_TYPES["EMPTY"])
             return True
         return False
     
@@ -136,6 +764,8 @@ class Maze:
         """
         Place a wall at position (x, y) if empty
         
+        Positions outside the grid are rejected.
+        
         Args:
             x (int): X coordinate
             y (int): Y coordinate
@@ -143,17 +773,38 @@ class Maze:
         Returns:
             bool: True if wall was placed, False otherwise
         """
-        if self.grid[x, y] == CELL_TYPES["EMPTY"]:
-            self.grid[x, y] = CELL_TYPES["WALL"]
+        size = self.size
+        if not (0 <= x < size and 0 <= y < size):
+            return False
+        if self._cells[x + 1, y + 1] == CELL_TYPES["EMPTY"]:
+            self._set_cell(x, y, CELL_TYPES["WALL"])
             return True
         return False
     
+    def _read_only_view(self):
+        """Create a non-writeable view of the grid that tracks later changes"""
+        view = self.grid.view()
+        view.flags.writeable = False
+        return view
+    
     def get_state(self):
         """
-        Get the current state of the maze
+        Get the current state of the maze without copying it
+        
+        The returned array is a read-only view, so it always reflects the
+        live grid; use snapshot() to keep a state that will not change.
+        
+        Returns:
+            numpy.ndarray: Read-only view of the grid
+        """
+        return self._grid_view
+    
+    def snapshot(self):
+        """
+        Get a copy of the current state of the maze
         
         Returns:
-            numpy.ndarray: Current grid state
+            numpy.ndarray: Writable copy of the grid
         """
         return self.grid.copy()
     
@@ -166,14 +817,28 @@ class Maze:
             y (int): Y coordinate
             
         Returns:
-            list: List of valid (dx, dy) pairs
+            tuple: Valid (dx, dy) pairs
+        """
+        if self._open_mask is None:
+            cells, wall = self._cells, CELL_TYPES["WALL"]
+            return MOVES_BY_MASK[sum(1 << bit for bit, (dx, dy) in enumerate(DIRECTIONS)
+                                     if cells[x + 1 + dx, y + 1 + dy] != wall)]
+        return MOVES_BY_MASK[self._open_mask[x * self.size + y]]
+    
+    def get_surroundings(self, x, y):
         """
-        valid_moves = []
+        Get the cell types of the four neighbours of position (x, y)
         
-        # Check all four directions
-        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            new_x, new_y = x + dx, y + dy
-            if self.is_valid_move(new_x, new_y):
-                valid_moves.append((dx, dy))
-                
-        return valid_moves
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+            
+        Returns:
+            tuple: Cell types in DIRECTIONS order; cells off the grid read
+                as OUT_OF_BOUNDS
+        """
+        cells, last = self._cells, self.size - 1
+        return (int(cells[x + 1, y + 2]) if y < last else OUT_OF_BOUNDS,
+                int(cells[x + 2, y + 1]) if x < last else OUT_OF_BOUNDS,
+                int(cells[x + 1, y]) if y > 0 else OUT_OF_BOUNDS,
+                int(cells[x, y + 1]) if x > 0 else OUT_OF_BOUNDS)
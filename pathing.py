@@ -0,0 +1,401 @@
+"""
+Pathing module for shortest-path queries over the maze
+"""
+
+import time
+from collections import deque
+import numpy as np
+from constants import CELL_TYPES, DIRECTIONS
+
+# Distance reported when no path exists
+UNREACHABLE = float('inf')
+
+# Largest maze, in cells, that a ShortestPathTable will be built for
+MAX_TABLE_CELLS = 4096
+
+# Stored distance for pairs of cells with no path between them
+_FAR = np.iinfo(np.int16).max
+
+class GemDistanceField:
+    """
+    Multi-source BFS distance from every cell to its nearest gem.
+
+    The field is built once and then repaired incrementally: gaining a gem
+    or an open cell only lowers distances, which spread outward from the
+    changed cell. Losing one raises distances only for cells that
+    depended on it. Those cells are cleared and refilled from their
+    unaffected neighbours.
+    """
+    def __init__(self, maze):
+        """
+        Initialize the field and compute it from scratch.
+
+        Args:
+            maze: Maze (or BitboardMaze) to measure
+        """
+        self.maze = maze
+        self.size = maze.size
+        self.dist = [UNREACHABLE] * (self.size * self.size)
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompute every distance with a multi-source BFS from the gems"""
+        size = self.size
+        dist = self.dist
+        for cell in range(size * size):
+            dist[cell] = UNREACHABLE
+
+        sources = [x * size + y for x, y in self.maze.gem_locations]
+        for cell in sources:
+            dist[cell] = 0
+        self._spread(deque(sources))
+
+    def _neighbors(self, cell):
+        """Get the flat indices of the open neighbours of a cell"""
+        x, y = divmod(cell, self.size)
+        return [cell + dx * self.size + dy for dx, dy in self.maze.get_valid_moves(x, y)]
+
+    def _spread(self, queue):
+        """Lower distances outward from cells whose distance just dropped"""
+        dist = self.dist
+        while queue:
+            cell = queue.popleft()
+            next_dist = dist[cell] + 1
+            for neighbor in self._neighbors(cell):
+                if next_dist < dist[neighbor]:
+                    dist[neighbor] = next_dist
+                    queue.append(neighbor)
+
+    def _lower(self, cell):
+        """Handle a cell that became a gem or became passable"""
+        if self.maze.grid[divmod(cell, self.size)] == CELL_TYPES["GEM"]:
+            self.dist[cell] = 0
+        else:
+            best = min((self.dist[n] for n in self._neighbors(cell)), default=UNREACHABLE)
+            self.dist[cell] = best + 1
+        if self.dist[cell] < UNREACHABLE:
+            self._spread(deque([cell]))
+
+    def _raise(self, cell):
+        """Handle a cell that stopped being a gem or stopped being passable"""
+        dist = self.dist
+        x, y = divmod(cell, self.size)
+        passable = self.maze.is_valid_move(x, y)
+
+        # Collect the cells whose every shortest path ran through this one,
+        # level by level so a cell's parents are classified before it
+        orphans = {cell}
+        level = [cell]
+        while level:
+            next_level = []
+            for parent in level:
+                child_dist = dist[parent] + 1
+                for child in self._neighbors(parent):
+                    if dist[child] != child_dist or child in orphans:
+                        continue
+                    if any(dist[n] == dist[child] - 1 and n not in orphans
+                           for n in self._neighbors(child)):
+                        continue
+                    orphans.add(child)
+                    next_level.append(child)
+            level = next_level
+
+        for orphan in orphans:
+            dist[orphan] = UNREACHABLE
+        if not passable:
+            orphans.discard(cell)
+
+        # Refill the orphans from their surviving neighbours, in distance order
+        seeds = []
+        for orphan in orphans:
+            best = min((dist[n] for n in self._neighbors(orphan)), default=UNREACHABLE)
+            if best < UNREACHABLE:
+                dist[orphan] = best + 1
+                seeds.append(orphan)
+        seeds.sort(key=dist.__getitem__)
+        self._spread_seeded(seeds)
+
+    def _spread_seeded(self, seeds):
+        """Spread from seeds with differing distances, given sorted by distance"""
+        dist = self.dist
+        queue = deque()
+        index = 0
+        while index < len(seeds) or queue:
+            # Take whichever frontier cell is closer, keeping BFS order
+            if queue and (index == len(seeds) or dist[queue[0]] <= dist[seeds[index]]):
+                cell = queue.popleft()
+            else:
+                cell = seeds[index]
+                index += 1
+            next_dist = dist[cell] + 1
+            for neighbor in self._neighbors(cell):
+                if next_dist < dist[neighbor]:
+                    dist[neighbor] = next_dist
+                    queue.append(neighbor)
+
+    def cell_changed(self, x, y, previous, cell_type):
+        """
+        Repair the field after the cell at (x, y) changed type
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+            previous (int): Cell type before the change
+            cell_type (int): Cell type after the change
+        """
+        wall, gem = CELL_TYPES["WALL"], CELL_TYPES["GEM"]
+        cell = x * self.size + y
+        if previous == gem or (cell_type == wall and previous != wall):
+            self._raise(cell)
+        elif cell_type == gem or (previous == wall and cell_type != wall):
+            self._lower(cell)
+
+    def distance(self, x, y):
+        """
+        Get the path distance from (x, y) to the nearest gem
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            float: Number of moves, or UNREACHABLE
+        """
+        return self.dist[x * self.size + y]
+
+    def next_step(self, x, y):
+        """
+        Get the first move of a shortest path from (x, y) to the nearest gem
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+
+        Returns:
+            tuple: (dx, dy) move, or (0, 0) if on a gem or no gem is reachable
+        """
+        here = self.dist[x * self.size + y]
+        if here == 0 or here == UNREACHABLE:
+            return (0, 0)
+        for dx, dy in self.maze.get_valid_moves(x, y):
+            if self.dist[(x + dx) * self.size + y + dy] == here - 1:
+                return (dx, dy)
+        return (0, 0)
+
+class ShortestPathTable:
+    """
+    All-pairs shortest-path distances and next hops for a small maze.
+
+    Distances live in an (n, n) int16 matrix and first moves in an (n, n)
+    int8 matrix of DIRECTIONS indices, where n is the number of cells, so
+    every pathing query is a table lookup. Placing a wall re-runs the BFS
+    only for sources that lose every shortest path to some cell, and
+    refreshes first moves only around those rows and the wall.
+    """
+    def __init__(self, grid):
+        """
+        Initialize the table from a grid of cell types.
+
+        Args:
+            grid (array-like): (size, size) cell types
+        """
+        self.passable = np.asarray(grid) != CELL_TYPES["WALL"]
+        self.size = self.passable.shape[0]
+        cells = self.size * self.size
+        if cells > MAX_TABLE_CELLS:
+            raise ValueError(f"Shortest-path table for {cells} cells exceeds "
+                             f"{MAX_TABLE_CELLS}")
+        self.build_seconds = 0.0
+        self.update_seconds = 0.0
+        self.rows_updated = 0
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompute the whole table"""
+        start = time.perf_counter()
+        cells = self.size * self.size
+        self._update_neighbors()
+        self.dist = self._bfs_rows(np.arange(cells))
+        self.next_hop = np.full((cells, cells), -1, dtype=np.int8)
+        self._fill_next_hops(np.arange(cells))
+        self.build_seconds = time.perf_counter() - start
+
+    def _update_neighbors(self):
+        """Recompute the flat index of each cell's open neighbour per direction"""
+        size = self.size
+        padded = np.zeros((size + 2, size + 2), dtype=bool)
+        padded[1:-1, 1:-1] = self.passable
+        index = np.arange(size * size).reshape(size, size)
+        self.neighbors = []
+        for dx, dy in DIRECTIONS:
+            open_cells = padded[1 + dx:size + 1 + dx, 1 + dy:size + 1 + dy] & self.passable
+            self.neighbors.append(np.where(open_cells, index + dx * size + dy, -1).reshape(-1))
+
+    def _bfs_rows(self, sources):
+        """
+        Run a BFS from each source at once, one wavefront step per loop.
+
+        Args:
+            sources (numpy.ndarray): Flat indices of the source cells
+
+        Returns:
+            numpy.ndarray: (len(sources), n) int16 distances
+        """
+        size = self.size
+        count = len(sources)
+        dist = np.full((count, size, size), _FAR, dtype=np.int16)
+        reached = np.zeros((count, size, size), dtype=bool)
+        source_x, source_y = np.divmod(sources, size)
+        rows = np.arange(count)
+        valid = self.passable[source_x, source_y]
+        reached[rows[valid], source_x[valid], source_y[valid]] = True
+        dist[reached] = 0
+
+        frontier = reached.copy()
+        step = 0
+        while frontier.any():
+            step += 1
+            grown = np.zeros_like(frontier)
+            grown[:, 1:, :] |= frontier[:, :-1, :]
+            grown[:, :-1, :] |= frontier[:, 1:, :]
+            grown[:, :, 1:] |= frontier[:, :, :-1]
+            grown[:, :, :-1] |= frontier[:, :, 1:]
+            grown &= self.passable
+            grown &= ~reached
+            dist[grown] = step
+            reached |= grown
+            frontier = grown
+        return dist.reshape(count, size * size)
+
+    def _fill_next_hops(self, rows):
+        """Recompute the next-hop entries for the given source rows"""
+        dist = self.dist[rows]
+        hops = np.full(dist.shape, -1, dtype=np.int8)
+        reachable = (dist > 0) & (dist < _FAR)
+        for direction, neighbors in enumerate(self.neighbors):
+            neighbor = neighbors[rows]
+            has_neighbor = neighbor >= 0
+            # Distances are symmetric, so a neighbour's row gives its distance to each target
+            ahead = np.where(has_neighbor[:, None], self.dist[np.maximum(neighbor, 0)], _FAR)
+            closer = reachable & (hops < 0) & (ahead == dist - 1)
+            hops[closer] = direction
+        self.next_hop[rows] = hops
+
+    def wall_placed(self, x, y):
+        """
+        Update the table after a wall was placed at (x, y)
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+        """
+        if not self.passable[x, y]:
+            return
+        start = time.perf_counter()
+        wall = x * self.size + y
+
+        # A source's distances change only if some cell just past the wall
+        # had the wall as its sole predecessor on a shortest path
+        dist = self.dist
+        to_wall = dist[:, wall]
+        affected = np.zeros(len(to_wall), dtype=bool)
+        for neighbors in self.neighbors:
+            child = neighbors[wall]
+            if child < 0:
+                continue
+            to_child = dist[:, child]
+            other_parent = np.zeros(len(to_wall), dtype=bool)
+            for parents in self.neighbors:
+                parent = parents[child]
+                if parent >= 0 and parent != wall:
+                    other_parent |= dist[:, parent] == to_child - 1
+            affected |= (to_child == to_wall + 1) & ~other_parent
+        affected &= to_wall < _FAR
+        affected[wall] = False
+        rows = np.flatnonzero(affected)
+
+        beside_wall = [neighbors[wall] for neighbors in self.neighbors]
+        self.passable[x, y] = False
+        self._update_neighbors()
+        dist[wall, :] = _FAR
+        dist[:, wall] = _FAR
+        self.next_hop[wall, :] = -1
+        self.next_hop[:, wall] = -1
+        if len(rows):
+            dist[rows] = self._bfs_rows(rows)
+
+        # First moves can also go stale next to the wall or next to a changed row
+        stale = affected.copy()
+        for neighbors in self.neighbors:
+            beside = neighbors[rows]
+            stale[beside[beside >= 0]] = True
+        stale[[cell for cell in beside_wall if cell >= 0]] = True
+        self._fill_next_hops(np.flatnonzero(stale))
+
+        self.rows_updated = len(rows)
+        self.update_seconds = time.perf_counter() - start
+
+    def cell_changed(self, x, y, previous, cell_type):
+        """
+        Update the table after the cell at (x, y) changed type
+
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+            previous (int): Cell type before the change
+            cell_type (int): Cell type after the change
+        """
+        wall = CELL_TYPES["WALL"]
+        if cell_type == wall and previous != wall:
+            self.wall_placed(x, y)
+        elif previous == wall and cell_type != wall:
+            # Opening a cell can shorten any path, so start over
+            self.passable[x, y] = True
+            self.rebuild()
+
+    def distance(self, start, target):
+        """
+        Get the path distance between two cells
+
+        Args:
+            start (tuple): (x, y) start cell
+            target (tuple): (x, y) target cell
+
+        Returns:
+            float: Number of moves, or UNREACHABLE
+        """
+        value = self.dist[start[0] * self.size + start[1], target[0] * self.size + target[1]]
+        return UNREACHABLE if value == _FAR else int(value)
+
+    def next_step(self, start, target):
+        """
+        Get the first move of a shortest path between two cells
+
+        Args:
+            start (tuple): (x, y) start cell
+            target (tuple): (x, y) target cell
+
+        Returns:
+            tuple: (dx, dy) move, or (0, 0) if already there or unreachable
+        """
+        hop = self.next_hop[start[0] * self.size + start[1], target[0] * self.size + target[1]]
+        return DIRECTIONS[hop] if hop >= 0 else (0, 0)
+
+    def nearest(self, start, targets):
+        """
+        Find the closest of several target cells
+
+        Args:
+            start (tuple): (x, y) start cell
+            targets (iterable): (x, y) candidate cells
+
+        Returns:
+            tuple: Closest reachable (x, y) target, or None if none is reachable
+        """
+        targets = list(targets)
+        if not targets:
+            return None
+        flat = [tx * self.size + ty for tx, ty in targets]
+        dist = self.dist[start[0] * self.size + start[1], flat]
+        best = int(np.argmin(dist))
+        return tuple(targets[best]) if dist[best] < _FAR else None
@@ -0,0 +1,513 @@
+"""
+Planner module with time-budgeted tree search for the AI agent
+"""
+
+import math
+import random
+import time
+from collections import OrderedDict
+from engine import GameEngine, MOVE, STAY, TURN, WALLS, GEMS, TRAPS, CELL, SCORE, GEMS_COLLECTED, OTHER_CELL
+from ai_agent import AIAgent
+from qtable import action_tuple
+
+class PositionEvaluator:
+    """
+    Static evaluation of GameEngine states for the planners.
+
+    Games are won on gems, so a state is worth the AI's gem lead at 10
+    points a gem, plus score_weight times its lead in score to count trap
+    penalties, less gem_weight points per move between the AI and its
+    nearest gem. Positions near gems thus beat ones that wander off or
+    wall the AI in.
+    """
+    def __init__(self, engine, gem_weight=1.0, score_weight=0.1):
+        """
+        Initialize the evaluator.
+
+        Args:
+            engine (GameEngine): Rules the states follow
+            gem_weight (float): Points lost per move between the AI and its nearest gem
+            score_weight (float): Weight of the score lead next to the gem lead
+        """
+        size = self.size = engine.size
+        self.gem_weight = gem_weight
+        self.score_weight = score_weight
+
+        # Bitboards of the whole maze and of all but its first or last column
+        self._board = (1 << size * size) - 1
+        column = sum(1 << x * size for x in range(size))
+        self._not_first = self._board & ~column
+        self._not_last = self._board & ~(column << size - 1)
+
+    def evaluate(self, state):
+        """
+        Score a state from the AI's point of view
+
+        Args:
+            state (tuple): GameEngine state
+
+        Returns:
+            float: Value in points; higher is better for the AI
+        """
+        if state[TURN]:
+            ai, other = state[CELL:OTHER_CELL], state[OTHER_CELL:]
+        else:
+            ai, other = state[OTHER_CELL:], state[CELL:OTHER_CELL]
+        value = (10 * (ai[GEMS_COLLECTED - CELL] - other[GEMS_COLLECTED - CELL])
+                 + self.score_weight * (ai[SCORE - CELL] - other[SCORE - CELL]))
+        if state[GEMS]:
+            value -= self.gem_weight * self.gem_distance(state[WALLS], state[GEMS], ai[0])
+        return value
+
+    def gem_distance(self, walls, gems, cell):
+        """
+        Get the path length from a cell to the nearest gem by bitboard flood fill
+
+        Args:
+            walls (int): Wall bitboard
+            gems (int): Gem bitboard
+            cell (int): Starting cell
+
+        Returns:
+            int: Number of moves, capped at twice the maze size when no gem is reachable
+        """
+        size = self.size
+        open_cells = self._board & ~walls
+        reached = 1 << cell
+        for distance in range(2 * size):
+            if reached & gems:
+                return distance
+            grown = (reached | reached << size | reached >> size
+                     | (reached & self._not_last) << 1 | (reached & self._not_first) >> 1) & open_cells
+            if grown == reached:
+                break
+            reached = grown
+        return 2 * size
+
+class MCTSPlanner:
+    """
+    Monte Carlo tree search over GameEngine states within a time budget.
+
+    Node statistics live in a transposition table keyed by the hash of
+    the state, computed once when the state is reached, so positions
+    reached by different move orders share their statistics, and the
+    table carries over from one move to the next. Each node also keeps
+    its state, so states whose hashes collide never share statistics;
+    the state reached later replaces the node. Once the table holds more
+    than max_nodes, each iteration evicts the oldest nodes not visited by
+    the current plan() call, a couple at a time, so the cost of
+    forgetting old positions is spread over the search instead of
+    landing on one move. At the AI's nodes children are picked by UCT;
+    the opponent is modelled as a chance node that moves at random, like
+    the training RandomPlayer. Simulations end after horizon plies or at
+    the end of the game and are scored by a PositionEvaluator.
+    """
+    def __init__(self, engine, budget=0.005, horizon=12, exploration=10.0, gem_weight=1.0,
+                 score_weight=0.1, max_nodes=200000, rng=None):
+        """
+        Initialize the planner.
+
+        Args:
+            engine (GameEngine): Rules to search with
+            budget (float): Wall-clock seconds per plan() call
+            horizon (int): Plies simulated beyond the root
+            exploration (float): UCT exploration constant, in points
+            gem_weight (float): PositionEvaluator weight of the gem distance
+            score_weight (float): PositionEvaluator weight of the score lead
+            max_nodes (int): Start evicting old nodes beyond this many
+            rng (random.Random, optional): Random generator for simulations
+        """
+        self.engine = engine
+        self.budget = budget
+        self.horizon = horizon
+        self.exploration = exploration
+        self.evaluator = PositionEvaluator(engine, gem_weight, score_weight)
+        self.max_nodes = max_nodes
+        self.rng = rng if rng is not None else random.Random()
+        # hash(state) -> [visits, total value, children or None, generation, state],
+        # oldest first; children are (action, child state, child hash, done)
+        self.table = OrderedDict()
+        self.generation = 0  # Number of plan() calls, stamped on visited nodes
+
+        # Statistics of the last plan() call
+        self.iterations = 0
+        self.nodes = 0  # GameEngine steps taken in the tree and simulations
+        self.elapsed = 0.0
+
+    def plan(self, state):
+        """
+        Search from a state with the AI to move until the budget runs out
+
+        Args:
+            state (tuple): GameEngine state with TURN 1
+
+        Returns:
+            int: Action id of the most visited root action, or a
+                simulation move if no iteration finished
+        """
+        started = time.perf_counter()
+        deadline = started + self.budget
+        self.generation += 1
+        self.iterations = self.nodes = 0
+        table = self.table
+        while True:
+            self._iterate(state)
+            self.iterations += 1
+            if len(table) > self.max_nodes:
+                self._evict(2)
+            if time.perf_counter() >= deadline:
+                break
+        self.elapsed = time.perf_counter() - started
+
+        root = self._node(hash(state), state)
+        children = root[2] if root is not None else None
+        if not children:
+            return self._simulation_action(state)
+        return max(children, key=self._visits)[0]
+
+    def _node(self, key, state):
+        """Get the node of a state, or None if the table holds no node for it"""
+        node = self.table.get(key)
+        if node is None or (node[4] is not state and node[4] != state):
+            return None
+        return node
+
+    def _visits(self, child):
+        """Get the visit count of a (action, child state, child hash, done) child"""
+        node = self._node(child[2], child[1])
+        return node[0] if node is not None else 0
+
+    def _evict(self, count):
+        """
+        Drop up to count of the oldest nodes not visited in this plan() call
+
+        Nodes the current search has visited are moved to the back instead,
+        so they are kept until every older node has gone.
+        """
+        table, generation = self.table, self.generation
+        for _ in range(count):
+            key, node = table.popitem(last=False)
+            if node[3] == generation:
+                table[key] = node
+
+    def _iterate(self, root):
+        """Run one selection, expansion, simulation and backup pass"""
+        engine, table, generation = self.engine, self.table, self.generation
+        state, key = root, hash(root)
+        path = []
+        depth = 0
+        done = False
+
+        # Selection: descend through known states until reaching a new one
+        while not done and depth < self.horizon:
+            node = table.get(key)
+            if node is None or (node[4] is not state and node[4] != state):
+                # A new state, or one whose hash collides with a stored node
+                table[key] = node = [0, 0.0, None, generation, state]
+                path.append(node)
+                break
+            node[3] = generation
+            path.append(node)
+            if state[TURN]:
+                _, state, key, done = self._select(node, state)
+            else:
+                state, _, done = engine.step(state, self._simulation_action(state))
+                key = hash(state)
+            depth += 1
+
+        # Simulation: random moves to the horizon or the end of the game
+        while not done and depth < self.horizon:
+            state, _, done = engine.step(state, self._simulation_action(state))
+            depth += 1
+        self.nodes += depth
+
+        value = self.evaluator.evaluate(state)
+        for node in path:
+            node[0] += 1
+            node[1] += value
+
+    def _select(self, node, state):
+        """
+        Pick the AI's action at a known state by UCT, trying unvisited children first
+
+        Returns:
+            tuple: The chosen (action, child state, child hash, done) child
+        """
+        children = node[2]
+        if children is None:
+            step = self.engine.step
+            children = node[2] = []
+            for action in _ai_actions(self.engine, state):
+                child, _, done = step(state, action)
+                children.append((action, child, hash(child), done))
+        table = self.table
+        scale = self.exploration * math.sqrt(math.log(node[0] + 1))
+        best, best_value = children[-1], -math.inf
+        for child in children:
+            stats = table.get(child[2])
+            if stats is not None and stats[4] is not child[1] and stats[4] != child[1]:
+                stats = None  # Another state's node under a colliding hash
+            if stats is None or not stats[0]:
+                return child
+            value = stats[1] / stats[0] + scale / math.sqrt(stats[0])
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def _simulation_action(self, state):
+        """
+        Pick a move for the side to move in a simulation
+
+        The AI takes an adjacent gem when there is one and otherwise moves
+        at random, stepping onto a trap only when nothing else is open;
+        random walks over traps would otherwise make staying put look
+        safer than exploring. The opponent moves at random. Either side
+        stays put when boxed in.
+        """
+        walls, cell = state[WALLS], state[CELL]
+        ai_turn = state[TURN]
+        moves = []
+        risky = []
+        for direction, targets in enumerate(self.engine.targets):
+            target = targets[cell]
+            if target >= 0 and not walls >> target & 1:
+                if ai_turn and state[GEMS] >> target & 1:
+                    return MOVE + direction
+                if ai_turn and state[TRAPS] >> target & 1:
+                    risky.append(MOVE + direction)
+                else:
+                    moves.append(MOVE + direction)
+        moves = moves or risky
+        return self.rng.choice(moves) if moves else STAY
+
+class IterativeDeepeningPlanner:
+    """
+    Anytime expectimax search that deepens one ply at a time.
+
+    The AI maximises and the opponent is a chance node over its open
+    moves, as in MCTSPlanner. Each completed depth yields a move, so the
+    search can be stopped between depths, and a deadline or stop() also
+    interrupts it mid-depth, falling back to the deepest completed move.
+
+    Without pruning every searched value is exact for its depth, so the
+    principal-variation cache maps each state to (depth, value, best
+    action) and is kept between turns. A position already searched deeply
+    enough last turn is answered from the cache, and the cached best
+    action is tried first otherwise.
+    """
+    def __init__(self, engine, budget=0.005, max_depth=40, gem_weight=1.0, score_weight=0.1,
+                 max_entries=500000):
+        """
+        Initialize the planner.
+
+        Args:
+            engine (GameEngine): Rules to search with
+            budget (float): Wall-clock seconds per plan() call
+            max_depth (int): Deepest search in plies
+            gem_weight (float): PositionEvaluator weight of the gem distance
+            score_weight (float): PositionEvaluator weight of the score lead
+            max_entries (int): Clear the cache beyond this size
+        """
+        self.engine = engine
+        self.budget = budget
+        self.max_depth = max_depth
+        self.evaluator = PositionEvaluator(engine, gem_weight, score_weight)
+        self.max_entries = max_entries
+        self.cache = {}  # state -> (depth searched, value, best action or None)
+        self.deadline = None
+        self.stopped = False
+        self.root = None
+        self.partial = None  # (best action, value) so far at the root of an interrupted depth
+
+        # Statistics of the last search
+        self.depth = 0
+        self.nodes = 0
+        self.cache_hits = 0
+        self.elapsed = 0.0
+
+    def stop(self):
+        """
+        Interrupt the running search, e.g. from another thread
+
+        If no search is running, the next one stops before its first
+        depth. The request is cleared when the interrupted search returns.
+        """
+        self.stopped = True
+
+    def stats(self):
+        """
+        Get the statistics of the last search
+
+        Returns:
+            dict: Depth reached, nodes searched, cache hits, seconds used and cache size
+        """
+        return {
+            "depth": self.depth,
+            "nodes": self.nodes,
+            "cache_hits": self.cache_hits,
+            "elapsed": self.elapsed,
+            "cache_entries": len(self.cache),
+        }
+
+    def plan(self, state):
+        """
+        Search from a state with the AI to move until the budget runs out
+
+        Args:
+            state (tuple): GameEngine state with TURN 1
+
+        Returns:
+            int: Best action id of the deepest search, counting an
+                interrupted depth once it has improved on the last one
+        """
+        action = None
+        for action, _, _ in self.deepen(state, time.perf_counter() + self.budget):
+            pass
+        if self.partial is not None:
+            # The interrupted depth searched the last best move first, so a
+            # better move it found is worth more than the completed depth's
+            action = self.partial[0]
+        if action is None:
+            # Not even one ply finished; fall back to a cached or first move
+            cached = self.cache.get(state)
+            action = cached[2] if cached and cached[2] is not None else _ai_actions(self.engine, state)[0]
+        return action
+
+    def deepen(self, state, deadline=None):
+        """
+        Search one ply deeper at a time
+
+        Statistics are updated after every depth, so they are current
+        whenever the caller stops iterating. A pending stop() request is
+        honoured, and cleared once the search returns.
+
+        Args:
+            state (tuple): GameEngine state with TURN 1
+            deadline (float, optional): time.perf_counter() value at which
+                to abandon the depth being searched
+
+        Yields:
+            tuple: (best action id, value, depth) after each completed depth
+        """
+        started = time.perf_counter()
+        if len(self.cache) > self.max_entries:
+            self.cache.clear()
+        self.deadline = deadline
+        self.depth = self.nodes = self.cache_hits = 0
+        self.elapsed = 0.0
+        self.root = state
+        try:
+            for depth in range(1, self.max_depth + 1):
+                self.partial = None
+                try:
+                    value, action = self._search(state, depth)
+                except _SearchInterrupted:
+                    break
+                finally:
+                    self.elapsed = time.perf_counter() - started
+                self.depth = depth
+                yield action, value, depth
+        finally:
+            self.stopped = False
+
+    def _search(self, state, depth):
+        """
+        Get the expectimax value of a state searched to a depth
+
+        Returns:
+            tuple: (value, best action), the action None at chance nodes and leaves
+        """
+        self.nodes += 1
+        if self.stopped or (self.deadline is not None and time.perf_counter() >= self.deadline):
+            raise _SearchInterrupted()
+        if depth == 0:
+            return self.evaluator.evaluate(state), None
+        cached = self.cache.get(state)
+        if cached is not None and cached[0] >= depth:
+            self.cache_hits += 1
+            return cached[1], cached[2]
+
+        engine, evaluate = self.engine, self.evaluator.evaluate
+        best_action = None
+        if state[TURN]:
+            actions = _ai_actions(engine, state)
+            if cached is not None and cached[2] in actions:
+                # Try last best move first so it is searched before an interruption
+                actions.remove(cached[2])
+                actions.insert(0, cached[2])
+            value = -math.inf
+            for action in actions:
+                child, _, done = engine.step(state, action)
+                child_value = evaluate(child) if done else self._search(child, depth - 1)[0]
+                if child_value > value:
+                    value, best_action = child_value, action
+                if state is self.root:
+                    self.partial = (best_action, value)
+        else:
+            moves = _opponent_moves(engine, state)
+            value = 0.0
+            for action in moves:
+                child, _, done = engine.step(state, action)
+                value += evaluate(child) if done else self._search(child, depth - 1)[0]
+            value /= len(moves)
+        self.cache[state] = (depth, value, best_action)
+        return value, best_action
+
+class _SearchInterrupted(Exception):
+    """Raised inside IterativeDeepeningPlanner to abandon a search"""
+
+def _ai_actions(engine, state):
+    """The AI's search actions: like AIAgent, only stay put when nothing else is legal"""
+    return engine.legal_actions(state)[:-1] or [STAY]
+
+def _opponent_moves(engine, state):
+    """The open moves of the side to move, or STAY when boxed in"""
+    walls, cell = state[WALLS], state[CELL]
+    moves = [MOVE + direction for direction, targets in enumerate(engine.targets)
+             if targets[cell] >= 0 and not walls >> targets[cell] & 1]
+    return moves or [STAY]
+
+class PlanningAgent(AIAgent):
+    """
+    An AI agent that picks each move by searching instead of from Q-values.
+
+    The agent needs the player and token system to capture the whole
+    game for the planner. It does not learn, so its learner is only used
+    for the state encoding shared with AIAgent.
+    """
+    def __init__(self, x, y, maze, player, token_system, planner=None, learner=None):
+        """
+        Initialize the agent at position (x, y).
+
+        Args:
+            x (int): Initial X coordinate
+            y (int): Initial Y coordinate
+            maze (Maze): Reference to the maze object
+            player (Player): The opponent
+            token_system (TokenSystem): Holder of the player's tokens
+            planner (optional): MCTSPlanner or IterativeDeepeningPlanner to
+                search with; defaults to an MCTSPlanner
+            learner (QLearner, optional): Learner for the AIAgent base
+        """
+        super().__init__(x, y, maze, learner)
+        self.player = player
+        self.token_system = token_system
+        self.planner = planner if planner is not None else MCTSPlanner(GameEngine(maze.size))
+
+    def make_move(self):
+        """
+        Make the move found by the planner within its budget
+
+        Returns:
+            bool: True if move was successful, False otherwise
+        """
+        state = self.planner.engine.from_game(self.maze, self.player, self, self.token_system,
+                                              self.maze.round, player_turn=False)
+        self._execute_action(action_tuple(self.planner.plan(state), self.maze.size))
+        self.maze.visited_ai[self.x, self.y] = True
+        if (self.x, self.y) not in self.visited_positions:
+            self.visited_positions.append((self.x, self.y))
+        return True
+
+    def end_game(self):
+        """Nothing to learn from a finished game"""
@@ -20,6 +20,7 @@ class Player:
         self.x = x
         self.y = y
         self.maze = maze
+        self.maze.state_hash ^= maze.zobrist.player_position[x * maze.size + y]
         self.gems_collected = 0
         self.score = 0
         self.visited_positions = [(x, y)]  # Track visited positions for teleportation
@@ -42,7 +43,7 @@ class Player:
             return False
         
         # Execute the move
-        self.x, self.y = new_x, new_y
+        self._set_position(new_x, new_y)
         
         # Track visited positions for teleportation
         if (self.x, self.y) not in self.visited_positions:
@@ -78,7 +79,7 @@ class Player:
             return False
             
         # Execute teleportation
-        self.x, self.y = x, y
+        self._set_position(x, y)
         
         # Check for gem collection (in case a gem spawned on a visited tile)
         if self.maze.collect_gem(self.x, self.y):
@@ -91,6 +92,19 @@ class Player:
             
         return True
     
+    def _set_position(self, x, y):
+        """
+        Move to (x, y) and update the maze's state hash
+        
+        Args:
+            x (int): New X coordinate
+            y (int): New Y coordinate
+        """
+        keys = self.maze.zobrist.player_position
+        size = self.maze.size
+        self.maze.state_hash ^= keys[self.x * size + self.y] ^ keys[x * size + y]
+        self.x, self.y = x, y
+    
     def place_wall(self, dx, dy):
         """
         Place a wall adjacent to the player's position
@@ -102,14 +116,8 @@ class Player:
         Returns:
             bool: True if wall was placed successfully, False otherwise
         """
-        target_x, target_y = self.x + dx, self.y + dy
-        
-        # Check if position is within bounds
-        if target_x < 0 or target_x >= self.maze.size or target_y < 0 or target_y >= self.maze.size:
-            return False
-            
-        # Check if position is empty
-        return self.maze.place_wall(target_x, target_y)
+        # The maze rejects cells outside the grid, so no bounds check is needed
+        return self.maze.place_wall(self.x + dx, self.y + dy)
     
     def remove_trap(self):
         """
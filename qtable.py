@@ -0,0 +1,536 @@
+"""
+Q-table module with alternative storage backends for AIAgent Q-values
+"""
+
+import os
+import sys
+import heapq
+import struct
+from collections import OrderedDict
+import numpy as np
+from constants import GRID_SIZE, DIRECTIONS
+from engine import MOVE, WALL, REMOVE_TRAP, STAY, TELEPORT
+from features import AbsoluteEncoder, make_encoder
+
+# Ids of the actions that do not depend on the maze size
+_FIXED_ACTION_IDS = {
+    **{("move", dx, dy): MOVE + k for k, (dx, dy) in enumerate(DIRECTIONS)},
+    **{("wall", dx, dy): WALL + k for k, (dx, dy) in enumerate(DIRECTIONS)},
+    ("remove_trap", 0, 0): REMOVE_TRAP,
+    ("stay", 0, 0): STAY,
+}
+
+def action_id(action, size=GRID_SIZE):
+    """
+    Get the GameEngine action id of an AIAgent action tuple
+
+    Args:
+        action (tuple): (type, dx or x, dy or y)
+        size (int): The size of the maze
+
+    Returns:
+        int: Action id
+    """
+    fixed = _FIXED_ACTION_IDS.get(action)
+    if fixed is not None:
+        return fixed
+    action_type, first, second = action
+    if action_type == "move":
+        return MOVE + DIRECTIONS.index((first, second))
+    if action_type == "wall":
+        return WALL + DIRECTIONS.index((first, second))
+    if action_type == "remove_trap":
+        return REMOVE_TRAP
+    if action_type == "teleport":
+        return TELEPORT + first * size + second
+    return STAY
+
+def action_tuple(action, size=GRID_SIZE):
+    """
+    Get the AIAgent action tuple of a GameEngine action id
+
+    Args:
+        action (int): Action id
+        size (int): The size of the maze
+
+    Returns:
+        tuple: (type, dx or x, dy or y)
+    """
+    if action < WALL:
+        return ("move", *DIRECTIONS[action - MOVE])
+    if action < REMOVE_TRAP:
+        return ("wall", *DIRECTIONS[action - WALL])
+    if action == REMOVE_TRAP:
+        return ("remove_trap", 0, 0)
+    if action == STAY:
+        return ("stay", 0, 0)
+    return ("teleport", *divmod(action - TELEPORT, size))
+
+class ArrayQTable:
+    """
+    Q-values in a float32 matrix with one row per seen state.
+
+    AIAgent states and actions are encoded as small ints: an action id
+    uses the GameEngine numbering, and the state encoder packs a state's
+    features into its id. Reachable states are a sparse
+    subset of all ids, so a dict maps state ids to rows; each row holds
+    every action's value, NaN until set.
+
+    Also supports the dict interface with (state, action) keys, so code
+    written against a plain dict Q-table keeps working.
+
+    entries counts the set values, so len() needs no scan. Code that
+    writes into values directly must add the NaN entries it fills.
+    """
+    def __init__(self, size=GRID_SIZE, capacity=1024, encoder=None):
+        """
+        Initialize an empty table.
+
+        Args:
+            size (int): The size of the maze
+            capacity (int): Number of state rows to allocate up front
+            encoder (optional): State encoder from the features module;
+                defaults to AbsoluteEncoder
+        """
+        self.size = size
+        self.encoder = encoder if encoder is not None else AbsoluteEncoder(size)
+        self.num_actions = TELEPORT + size * size
+        self.rows = {}
+        self.values = np.full((capacity, self.num_actions), np.nan, dtype=np.float32)
+        self.entries = 0
+        self._actions = ([("move", *move) for move in DIRECTIONS]
+                         + [("wall", *move) for move in DIRECTIONS]
+                         + [("remove_trap", 0, 0), ("stay", 0, 0)]
+                         + [("teleport", *divmod(cell, size)) for cell in range(size * size)])
+        self._action_ids = {action: action_id for action_id, action in enumerate(self._actions)}
+
+    def encode_state(self, state):
+        """
+        Pack an AIAgent state tuple into an int
+
+        Args:
+            state (tuple): State made by the table's encoder
+
+        Returns:
+            int: State id
+        """
+        return self.encoder.state_id(state)
+
+    def decode_state(self, state_id):
+        """
+        Unpack a state id into an AIAgent state tuple
+
+        Args:
+            state_id (int): Value from encode_state
+
+        Returns:
+            tuple: State in the table's encoding
+        """
+        return self.encoder.decode_id(state_id)
+
+    def encode_action(self, action):
+        """
+        Get the id of an AIAgent action tuple
+
+        Args:
+            action (tuple): (type, dx or x, dy or y)
+
+        Returns:
+            int: Action id
+        """
+        return self._action_ids[action]
+
+    def decode_action(self, action_id):
+        """
+        Get the AIAgent action tuple of an action id
+
+        Args:
+            action_id (int): Value from encode_action
+
+        Returns:
+            tuple: (type, dx or x, dy or y)
+        """
+        return self._actions[action_id]
+
+    def row(self, state, create=True):
+        """
+        Get the row holding a state's values
+
+        Args:
+            state (tuple): AIAgent state tuple
+            create (bool): Allocate a row for an unseen state
+
+        Returns:
+            int: Row index, or -1 for an unseen state when create is False
+        """
+        state_id = self.encode_state(state)
+        row = self.rows.get(state_id, -1)
+        if row < 0 and create:
+            row = self._add_row(state_id)
+        return row
+
+    def _add_row(self, state_id):
+        """Allocate an unset row for a state, growing the matrix if full"""
+        row = len(self.rows)
+        if row == self.values.shape[0]:
+            grown = np.full((2 * row, self.num_actions), np.nan, dtype=np.float32)
+            grown[:row] = self.values
+            self.values = grown
+        self.rows[state_id] = row
+        return row
+
+    def rows_for(self, state_ids):
+        """
+        Get the rows of many state ids, allocating rows for unseen ones
+
+        Args:
+            state_ids (numpy.ndarray): Encoded states
+
+        Returns:
+            numpy.ndarray: Row index of each state
+        """
+        rows = self.rows
+        return np.array([rows[state_id] if state_id in rows else self._add_row(state_id)
+                         for state_id in state_ids.tolist()], dtype=np.int64)
+
+    def to_arrays(self):
+        """
+        Get the stored states in the on-disk layout of save_q_table
+
+        Returns:
+            tuple: (sorted int64 state ids, float32 matrix with one row per id)
+        """
+        state_ids = np.fromiter(self.rows.keys(), dtype=np.int64, count=len(self.rows))
+        rows = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+        order = np.argsort(state_ids)
+        return state_ids[order], self.values[rows[order]]
+
+    @property
+    def nbytes(self):
+        """Bytes held by the value matrix"""
+        return self.values.nbytes
+
+    def __len__(self):
+        return self.entries
+
+    def __contains__(self, key):
+        row = self.row(key[0], create=False)
+        return row >= 0 and not np.isnan(self.values[row, self.encode_action(key[1])])
+
+    def __getitem__(self, key):
+        row = self.row(key[0], create=False)
+        value = self.values[row, self.encode_action(key[1])] if row >= 0 else np.nan
+        if np.isnan(value):
+            raise KeyError(key)
+        return float(value)
+
+    def __setitem__(self, key, value):
+        row = self.row(key[0])
+        column = self.encode_action(key[1])
+        if np.isnan(self.values[row, column]):
+            self.entries += 1
+        self.values[row, column] = value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return (key for key, _ in self.items())
+
+    def items(self):
+        """Iterate over ((state, action), value) pairs that have been set"""
+        for state_id, row in self.rows.items():
+            state = self.decode_state(state_id)
+            for action_id in np.flatnonzero(~np.isnan(self.values[row])).tolist():
+                yield (state, self.decode_action(action_id)), float(self.values[row, action_id])
+
+# Layout of a saved Q-table: header, sorted int64 state ids, float32 values.
+# The header holds the size, state count, action count and number of set
+# values, and ends with the state encoder's spec; an empty spec means the
+# absolute encoder.
+_FILE_MAGIC = b"MAZEQTB2"
+_HEADER = struct.Struct("<8sqqqq32s")
+_HEADER_BYTES = 128
+
+def save_q_table(q_table, path, size=GRID_SIZE, encoder=None):
+    """
+    Write a Q-table in the binary format read by MappedQTable.
+
+    The file is written next to path and renamed over it, so processes
+    that have the old file mapped keep a consistent view.
+
+    Args:
+        q_table: A dict, ArrayQTable, BoundedQTable or MappedQTable
+        path (str): File to write
+        size (int): The size of the maze the table was trained on
+        encoder (optional): State encoder of a table that is not an
+            ArrayQTable; defaults to AbsoluteEncoder
+    """
+    if isinstance(q_table, ArrayQTable):
+        table = q_table
+    else:
+        table = ArrayQTable(size, encoder=encoder)
+        for key, value in q_table.items():
+            table[key] = value
+    state_ids, values = table.to_arrays()
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        header = _HEADER.pack(_FILE_MAGIC, table.size, len(state_ids), table.num_actions,
+                              int(np.count_nonzero(~np.isnan(values))),
+                              table.encoder.spec.encode())
+        file.write(header.ljust(_HEADER_BYTES, b"\0"))
+        file.write(state_ids.astype("<i8").tobytes())
+        file.write(np.ascontiguousarray(values, dtype="<f4").tobytes())
+    os.replace(temporary, path)
+
+class MappedQTable(ArrayQTable):
+    """
+    A saved Q-table memory-mapped read-only, with writes kept in memory.
+
+    Opening reads only the header; state ids and values are paged in by
+    the OS as they are looked up, and processes mapping the same file
+    share those pages. The first time a state is used its row is copied
+    into the in-memory matrix inherited from ArrayQTable, so updates never
+    touch the file.
+    """
+    def __init__(self, path, capacity=64):
+        """
+        Map a file written by save_q_table.
+
+        Args:
+            path (str): File to map
+            capacity (int): Number of in-memory rows to allocate up front
+        """
+        with open(path, "rb") as file:
+            magic, size, count, num_actions, entries, spec = _HEADER.unpack(
+                file.read(_HEADER.size))
+        if magic != _FILE_MAGIC:
+            raise ValueError(f"{path} is not a Q-table saved in the current format")
+        spec = spec.rstrip(b"\0").decode() or "absolute"
+        super().__init__(size, capacity, make_encoder(spec, size))
+        if num_actions != self.num_actions:
+            raise ValueError(f"{path} has {num_actions} actions, expected {self.num_actions}")
+        self.path = path
+        self.base_entries = entries
+        self._shadowed = 0  # Set values of file rows since copied into memory
+        if count:
+            self.base_ids = np.memmap(path, dtype="<i8", mode="r",
+                                      offset=_HEADER_BYTES, shape=(count,))
+            self.base_values = np.memmap(path, dtype="<f4", mode="r",
+                                         offset=_HEADER_BYTES + 8 * count,
+                                         shape=(count, num_actions))
+        else:
+            self.base_ids = np.zeros(0, dtype=np.int64)
+            self.base_values = np.zeros((0, num_actions), dtype=np.float32)
+
+    def _base_row(self, state_id):
+        """Index of a state in the mapped file, or -1"""
+        index = int(np.searchsorted(self.base_ids, state_id))
+        if index < len(self.base_ids) and self.base_ids[index] == state_id:
+            return index
+        return -1
+
+    def row(self, state, create=True):
+        """
+        Get the in-memory row holding a state's values
+
+        States saved in the file are copied in on first use, whether or
+        not create is set.
+
+        Args:
+            state (tuple): AIAgent state tuple
+            create (bool): Allocate a row for a state not in memory or the file
+
+        Returns:
+            int: Row index, or -1 for an unknown state when create is False
+        """
+        state_id = self.encode_state(state)
+        row = self.rows.get(state_id, -1)
+        if row < 0 and (create or self._base_row(state_id) >= 0):
+            row = self._add_row(state_id)
+        return row
+
+    def _add_row(self, state_id):
+        """Allocate a row for a state, copying in its values if the file has them"""
+        row = super()._add_row(state_id)
+        base = self._base_row(state_id)
+        if base >= 0:
+            values = self.values[row] = self.base_values[base]
+            copied = int(np.count_nonzero(~np.isnan(values)))
+            self.entries += copied
+            self._shadowed += copied
+        return row
+
+    def __len__(self):
+        return self.entries + self.base_entries - self._shadowed
+
+    def items(self):
+        """Iterate over set ((state, action), value) pairs, in memory or in the file"""
+        yield from super().items()
+        for index, state_id in enumerate(self.base_ids.tolist()):
+            if state_id in self.rows:
+                continue
+            state = self.decode_state(state_id)
+            row = self.base_values[index]
+            for action_id in np.flatnonzero(~np.isnan(row)).tolist():
+                yield (state, self.decode_action(action_id)), float(row[action_id])
+
+    def to_arrays(self):
+        """
+        Get the file's states merged with the in-memory ones
+
+        Returns:
+            tuple: (sorted int64 state ids, float32 matrix with one row per id)
+        """
+        ids, values = super().to_arrays()
+        keep = ~np.isin(self.base_ids, ids)
+        ids = np.concatenate([ids, self.base_ids[keep]])
+        values = np.concatenate([values, self.base_values[keep]])
+        order = np.argsort(ids)
+        return ids[order], values[order]
+
+# Eviction policies of BoundedQTable
+EVICTION_POLICIES = ("lru", "visits", "magnitude")
+
+class BoundedQTable:
+    """
+    A dict-like Q-table that holds at most capacity entries.
+
+    When full, inserting a new (state, action) pair first evicts one entry
+    chosen by the policy: "lru" drops the least recently used, "visits"
+    the least often read or written, and "magnitude" the one with the
+    smallest |Q|. LRU uses an ordered dict; the other two keep a heap with
+    lazily discarded stale entries, so every operation stays O(log n).
+    """
+    def __init__(self, capacity, policy="lru"):
+        """
+        Initialize an empty table.
+
+        Args:
+            capacity (int): Maximum number of entries
+            policy (str): One of EVICTION_POLICIES
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r}")
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self.policy = policy
+        self._values = OrderedDict() if policy == "lru" else {}
+        self._visits = {}
+        self._heap = []
+        self._pushes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __contains__(self, key):
+        if key in self._values:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def __getitem__(self, key):
+        value = self._values[key]
+        self._touch(key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self._values and len(self._values) >= self.capacity:
+            self._evict()
+        self._values[key] = value
+        self._touch(key, value)
+
+    def __delitem__(self, key):
+        del self._values[key]
+        self._visits.pop(key, None)
+
+    def get(self, key, default=None):
+        return self[key] if key in self._values else default
+
+    def keys(self):
+        return self._values.keys()
+
+    def items(self):
+        return self._values.items()
+
+    def _touch(self, key, value):
+        """Record a use of an entry for the eviction policy"""
+        if self.policy == "lru":
+            self._values.move_to_end(key)
+            return
+        if self.policy == "visits":
+            priority = self._visits[key] = self._visits.get(key, 0) + 1
+        else:
+            priority = abs(value)
+        self._pushes += 1
+        heapq.heappush(self._heap, (priority, self._pushes, key))
+        if len(self._heap) > 4 * len(self._values) + 64:
+            self._compact()
+
+    def _priority(self, key):
+        """Current eviction priority of an entry; lowest is evicted first"""
+        if self.policy == "visits":
+            return self._visits[key]
+        return abs(self._values[key])
+
+    def _compact(self):
+        """Rebuild the heap from live entries only"""
+        self._heap = [(self._priority(key), i, key) for i, key in enumerate(self._values)]
+        heapq.heapify(self._heap)
+        self._pushes = len(self._heap)
+
+    def _evict(self):
+        """Remove the entry the policy ranks lowest"""
+        if self.policy == "lru":
+            key, _ = self._values.popitem(last=False)
+        else:
+            while True:
+                priority, _, key = heapq.heappop(self._heap)
+                # Skip heap entries left behind by later touches or evictions
+                if key in self._values and self._priority(key) == priority:
+                    break
+            del self[key]
+        self.evictions += 1
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held by the entries, their keys and the policy bookkeeping"""
+        total = sys.getsizeof(self._values) + sys.getsizeof(self._visits) + sys.getsizeof(self._heap)
+        total += 24 * len(self._heap)
+        for key, value in self._values.items():
+            total += _deep_size(key) + sys.getsizeof(value)
+        return total
+
+    def stats(self):
+        """
+        Get usage statistics
+
+        Returns:
+            dict: Entries, capacity, hits, misses, hit rate, evictions and bytes
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._values),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self.nbytes,
+        }
+
+def _deep_size(value):
+    """Size in bytes of a value and the tuples nested in it"""
+    size = sys.getsizeof(value)
+    if isinstance(value, tuple):
+        size += sum(_deep_size(item) for item in value)
+    return size
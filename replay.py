@@ -0,0 +1,219 @@
+"""
+Replay module for experience replay over integer-encoded transitions
+"""
+
+import numpy as np
+
+# Bytes per stored transition: state, action, reward, next state, done
+_TRANSITION_BYTES = 8 + 2 + 4 + 8 + 1
+
+class ReplayBuffer:
+    """
+    A fixed-size ring of (state_id, action_id, reward, next_state_id, done).
+
+    Every field lives in its own preallocated array, so the buffer never
+    allocates after construction and the oldest transition is overwritten
+    once it is full. With prioritized=True, transitions are sampled in
+    proportion to priority ** alpha through a sum tree held in one array,
+    and sample() also returns importance-sampling weights.
+    """
+    def __init__(self, capacity, prioritized=False, alpha=0.6, beta=0.4, rng=None):
+        """
+        Initialize an empty buffer.
+
+        Args:
+            capacity (int): Maximum number of transitions
+            prioritized (bool): Sample by priority instead of uniformly
+            alpha (float): How strongly priorities skew sampling
+            beta (float): Strength of the importance-sampling correction
+            rng (numpy.random.Generator, optional): Random generator for sampling
+        """
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int16)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.size = 0
+        self.position = 0
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.rng = rng if rng is not None else np.random.default_rng()
+        if prioritized:
+            # Leaves start at index leaves; node i has children 2i and 2i + 1
+            self.leaves = 1 << max(capacity - 1, 1).bit_length()
+            self.tree = np.zeros(2 * self.leaves)
+            self.max_priority = 1.0
+
+    @classmethod
+    def for_memory(cls, budget_bytes, prioritized=False, **options):
+        """
+        Create the largest buffer that fits a memory budget.
+
+        Args:
+            budget_bytes (int): Bytes the buffer may use
+            prioritized (bool): Sample by priority instead of uniformly
+            **options: Other ReplayBuffer arguments
+
+        Returns:
+            ReplayBuffer: Buffer whose nbytes is at most budget_bytes
+        """
+        per_transition = _TRANSITION_BYTES
+        if prioritized:
+            # The sum tree has at most 4 float64 nodes per transition
+            per_transition += 32
+        return cls(max(budget_bytes // per_transition, 1), prioritized, **options)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the buffer arrays"""
+        total = self.capacity * _TRANSITION_BYTES
+        if self.prioritized:
+            total += self.tree.nbytes
+        return total
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state_id, action_id, reward, next_state_id, done=False):
+        """
+        Store a transition, overwriting the oldest one if full
+
+        New transitions get the highest priority seen so far, so each is
+        likely to be replayed at least once.
+
+        Args:
+            state_id (int): Encoded state
+            action_id (int): Encoded action
+            reward (float): Reward received
+            next_state_id (int): Encoded next state
+            done (bool): True if the episode ended with this transition
+
+        Returns:
+            int: Slot the transition was stored in
+        """
+        slot = self.position
+        self.states[slot] = state_id
+        self.actions[slot] = action_id
+        self.rewards[slot] = reward
+        self.next_states[slot] = next_state_id
+        self.dones[slot] = done
+        self.position = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        if self.prioritized:
+            # Walk one leaf up to the root with scalar updates
+            tree = self.tree
+            node = self.leaves + slot
+            tree[node] = self.max_priority ** self.alpha
+            while node > 1:
+                node //= 2
+                tree[node] = tree[2 * node] + tree[2 * node + 1]
+        return slot
+
+    def sample(self, batch_size):
+        """
+        Draw a minibatch of stored transitions with replacement
+
+        Args:
+            batch_size (int): Number of transitions
+
+        Returns:
+            tuple: (slots, states, actions, rewards, next_states, dones, weights)
+                where weights are importance-sampling weights, all ones when
+                sampling uniformly
+        """
+        if not self.size:
+            raise ValueError("Cannot sample from an empty replay buffer")
+        if self.prioritized:
+            slots = self._sample_tree(batch_size)
+            probabilities = self.tree[self.leaves + slots] / self.tree[1]
+            weights = (self.size * probabilities) ** -self.beta
+            weights /= weights.max()
+        else:
+            slots = self.rng.integers(0, self.size, batch_size)
+            weights = np.ones(batch_size)
+        return (slots, self.states[slots], self.actions[slots], self.rewards[slots],
+                self.next_states[slots], self.dones[slots], weights)
+
+    def update_priorities(self, slots, errors, epsilon=1e-3):
+        """
+        Set the priorities of sampled transitions from their TD errors
+
+        Args:
+            slots (numpy.ndarray): Slots returned by sample()
+            errors (numpy.ndarray): TD error of each transition
+            epsilon (float): Floor so no transition becomes unreachable
+        """
+        if not self.prioritized:
+            return
+        priorities = np.abs(errors) + epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self._set_priorities(slots, priorities)
+
+    def mark_done(self):
+        """Mark the most recently added transition as the end of an episode"""
+        if self.size:
+            self.dones[(self.position - 1) % self.capacity] = True
+
+    def _set_priorities(self, slots, priorities):
+        """Write leaf priorities and refresh their ancestors level by level"""
+        nodes = self.leaves + slots
+        self.tree[nodes] = priorities ** self.alpha
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def _sample_tree(self, batch_size):
+        """Descend the sum tree for a batch of uniform draws over the total priority"""
+        targets = self.rng.random(batch_size) * self.tree[1]
+        nodes = np.ones(batch_size, dtype=np.int64)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            left_sums = self.tree[left]
+            go_right = targets >= left_sums
+            targets = np.where(go_right, targets - left_sums, targets)
+            nodes = left + go_right
+        # Rounding can step onto an empty leaf; clamp to stored slots
+        return np.minimum(nodes - self.leaves, self.size - 1)
+
+def replay_update(q_table, batch, learning_rate, discount_factor):
+    """
+    Apply one Q-learning update per transition of a sampled minibatch.
+
+    Unset values count as 0, and a next state with no values contributes
+    nothing. Duplicate transitions in a batch each apply their update.
+
+    Args:
+        q_table (ArrayQTable): Table whose rows the state ids index
+        batch (tuple): Value returned by ReplayBuffer.sample()
+        learning_rate (float): Step size of the updates
+        discount_factor (float): Weight of future rewards
+
+    Returns:
+        numpy.ndarray: TD error of each transition
+    """
+    _, states, actions, rewards, next_states, dones, weights = batch
+    rows = q_table.rows_for(states)
+    next_rows = q_table.rows_for(next_states)
+    values = q_table.values
+
+    current = values[rows, actions]
+    unset = np.isnan(current)
+    if unset.any():
+        # Count each newly set entry once, however often the batch repeats it
+        cells = rows[unset] * values.shape[1] + actions[unset]
+        q_table.entries += len(np.unique(cells))
+        current = np.nan_to_num(current)
+    next_values = values[next_rows]
+    seen = ~np.isnan(next_values).all(axis=1)
+    best_next = np.zeros(len(rows), dtype=np.float32)
+    best_next[seen] = np.nanmax(next_values[seen], axis=1)
+    targets = rewards + discount_factor * best_next * ~dones
+    errors = targets - current
+
+    values[rows, actions] = current
+    np.add.at(values, (rows, actions), (learning_rate * weights * errors).astype(np.float32))
+    return errors
@@ -0,0 +1,89 @@
+"""
+Parity tests of BitboardMaze against Maze
+"""
+
+import random
+from collections import deque
+import numpy as np
+import pytest
+from constants import CELL_TYPES, DIRECTIONS, ROUNDS
+from bitboard import BitboardMaze
+from maze import Maze
+from player import Player
+from ai_agent import AIAgent
+
+SIZE = 10
+
+def assert_same(maze, board):
+    """Check every query of the two mazes agrees"""
+    assert board.state_hash == maze.state_hash
+    assert sorted(board.gem_locations) == sorted(maze.gem_locations)
+    for x in range(-1, SIZE + 1):
+        for y in range(-1, SIZE + 1):
+            assert board.is_valid_move(x, y) == maze.is_valid_move(x, y)
+    for x in range(SIZE):
+        for y in range(SIZE):
+            assert board.cell_type(x, y) == maze.grid[x, y]
+            assert board.check_trap(x, y) == maze.check_trap(x, y)
+            assert board.get_valid_moves(x, y) == maze.get_valid_moves(x, y)
+            assert board.get_surroundings(x, y) == maze.get_surroundings(x, y)
+            assert board.visited_player[x, y] == maze.visited_player[x, y]
+            assert board.visited_ai[x, y] == maze.visited_ai[x, y]
+            assert board.gem_field.distance(x, y) == maze.gem_field.distance(x, y)
+
+def reachable(maze, x, y):
+    """Bitboard of the cells reachable from (x, y), by BFS over get_valid_moves"""
+    seen = {(x, y)}
+    queue = deque(seen)
+    while queue:
+        cx, cy = queue.popleft()
+        for dx, dy in maze.get_valid_moves(cx, cy):
+            if (cx + dx, cy + dy) not in seen:
+                seen.add((cx + dx, cy + dy))
+                queue.append((cx + dx, cy + dy))
+    return sum(1 << (cx * SIZE + cy) for cx, cy in seen)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_same_layout_and_hash(seed):
+    """The same seed deals the same cells, and from_maze() copies a Maze exactly"""
+    maze = Maze(SIZE, rng=np.random.default_rng(seed))
+    maze.visited_player[0, 0] = maze.visited_ai[SIZE - 1, SIZE - 1] = True
+    assert_same(maze, BitboardMaze.from_maze(maze))
+
+    board = BitboardMaze(SIZE, rng=np.random.default_rng(seed))
+    assert board.get_state() == BitboardMaze.from_maze(maze).get_state()
+    assert board.state_hash == maze.state_hash
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_play_stays_in_sync(seed):
+    """Moves, walls, trap removals and rounds change both mazes the same way"""
+    rng = random.Random(seed)
+    maze = Maze(SIZE, rng=np.random.default_rng(seed))
+    board = BitboardMaze.from_maze(maze)
+    sides = [(Player(0, 0, maze), Player(0, 0, board)),
+             (AIAgent(SIZE - 1, SIZE - 1, maze), AIAgent(SIZE - 1, SIZE - 1, board))]
+    for turn in range(60):
+        on_maze, on_board = sides[turn % 2]
+        choice = rng.random()
+        if choice < 0.6:
+            dx, dy = rng.choice(DIRECTIONS)
+            if isinstance(on_maze, Player):
+                assert on_board.move(dx, dy) == on_maze.move(dx, dy)
+            elif maze.is_valid_move(on_maze.x + dx, on_maze.y + dy):
+                on_maze._execute_action(("move", dx, dy))
+                on_board._execute_action(("move", dx, dy))
+        elif choice < 0.8:
+            dx, dy = rng.choice(DIRECTIONS)
+            assert on_board.place_wall(dx, dy) == on_maze.place_wall(dx, dy)
+        elif choice < 0.9:
+            assert on_board.remove_trap() == on_maze.remove_trap()
+        else:
+            round_number = turn // 2 % ROUNDS + 1
+            maze.set_round(round_number)
+            board.set_round(round_number)
+        assert (on_board.x, on_board.y) == (on_maze.x, on_maze.y)
+        assert on_board.score == on_maze.score
+        assert_same(maze, board)
+    for x, y in ((0, 0), (SIZE - 1, SIZE - 1), (rng.randrange(SIZE), rng.randrange(SIZE))):
+        if maze.grid[x, y] != CELL_TYPES["WALL"]:
+            assert board.reachable(x, y) == reachable(maze, x, y)
@@ -0,0 +1,77 @@
+"""
+Parity tests of GameEngine.step against Player, AIAgent and TokenSystem
+"""
+
+import random
+import numpy as np
+import pytest
+from constants import DIRECTIONS, ROUNDS
+from engine import GameEngine, MOVE, WALL, REMOVE_TRAP, STAY, TELEPORT, TURN
+from maze import Maze
+from player import Player
+from ai_agent import AIAgent
+from token_system import TokenSystem
+from qtable import action_tuple
+
+SIZE = 10
+
+def apply_player_action(player, token_system, action):
+    """Play an action id through Player and TokenSystem, as main.py would"""
+    if action < WALL:
+        player.move(*DIRECTIONS[action - MOVE])
+    elif action == STAY:
+        pass
+    elif token_system.player_tokens > 0:
+        if action < REMOVE_TRAP:
+            success = player.place_wall(*DIRECTIONS[action - WALL])
+        elif action == REMOVE_TRAP:
+            success = player.remove_trap()
+        else:
+            success = player.teleport(*divmod(action - TELEPORT, SIZE))
+        if success:
+            token_system.player_tokens -= 1
+
+def apply_ai_action(agent, action):
+    """Play an action id through AIAgent, as make_move does after choosing it"""
+    agent._execute_action(action_tuple(action, SIZE))
+    agent.maze.visited_ai[agent.x, agent.y] = True
+    if (agent.x, agent.y) not in agent.visited_positions:
+        agent.visited_positions.append((agent.x, agent.y))
+
+@pytest.mark.parametrize("seed", range(20))
+def test_step_matches_stateful_game(seed):
+    """Random legal games stay identical when played both ways"""
+    rng = random.Random(seed)
+    maze = Maze(SIZE, rng=np.random.default_rng(seed))
+    player = Player(0, 0, maze)
+    agent = AIAgent(SIZE - 1, SIZE - 1, maze)
+    token_system = TokenSystem(3, maze)
+    engine = GameEngine(SIZE)
+    state = engine.from_game(maze, player, agent, token_system)
+    assert state == engine.initial_state(*state[2:5])
+
+    round_number = 1
+    done = False
+    while not done:
+        ai_turn = state[TURN] == 1
+        action = rng.choice(engine.legal_actions(state))
+        score = agent.score if ai_turn else player.score
+        state, reward, done = engine.step(state, action)
+        if ai_turn:
+            apply_ai_action(agent, action)
+            if round_number < ROUNDS:
+                round_number += 1
+        else:
+            apply_player_action(player, token_system, action)
+        assert reward == (agent.score if ai_turn else player.score) - score
+        assert state == engine.from_game(maze, player, agent, token_system, round_number,
+                                         player_turn=ai_turn)
+    assert round_number == ROUNDS
+
+def test_illegal_action_keeps_state():
+    """Illegal actions change nothing and keep the turn"""
+    engine = GameEngine(SIZE)
+    walls = 1 << 1  # Wall at (0, 1), next to the player's corner
+    state = engine.initial_state(walls, 0, 0, tokens=0)
+    for action in (MOVE, WALL + 1, REMOVE_TRAP, TELEPORT + 5):
+        assert engine.step(state, action) == (state, 0, False)
@@ -0,0 +1,117 @@
+"""
+Tests of incrementally maintained structures against from-scratch rebuilds
+"""
+
+import random
+import numpy as np
+import pytest
+from constants import CELL_TYPES, DIRECTIONS, ROUNDS
+from maze import Maze
+from player import Player
+from ai_agent import AIAgent
+from token_system import TokenSystem
+from journal import GameJournal
+from pathing import GemDistanceField, ShortestPathTable
+
+SIZE = 10
+
+def scratch_hash(maze, player, agent, token_system):
+    """Zobrist hash of the whole game state, computed without the running value"""
+    keys = maze.zobrist
+    return (keys.grid_hash(maze.grid) ^ keys.rounds[maze.round]
+            ^ keys.player_position[player.x * SIZE + player.y]
+            ^ keys.ai_position[agent.x * SIZE + agent.y]
+            ^ keys.tokens(keys.player_tokens, token_system.player_tokens)
+            ^ keys.tokens(keys.ai_tokens, agent.tokens))
+
+def assert_matches_rebuild(maze, player, agent, token_system):
+    """Check every incremental structure against one built from the current cells"""
+    gems = maze.grid == CELL_TYPES["GEM"]
+    assert sorted(maze.gem_locations) == sorted(zip(*np.nonzero(gems)))
+    assert len(maze.gem_locations) == int(gems.sum())
+    for x in range(SIZE):
+        for y in range(SIZE):
+            assert ((x, y) in maze.gem_locations) == gems[x, y]
+
+    assert maze.gem_field.dist == GemDistanceField(maze).dist
+
+    fresh = ShortestPathTable(maze.grid)
+    table = maze.path_table
+    assert np.array_equal(table.dist, fresh.dist)
+    assert np.array_equal(table.next_hop, fresh.next_hop)
+
+    assert maze.state_hash == scratch_hash(maze, player, agent, token_system)
+
+def capture(maze, player, agent, token_system):
+    """Copy everything a journal restore has to bring back"""
+    return (maze.grid.copy(), np.array(maze.visited_player), np.array(maze.visited_ai),
+            sorted(maze.gem_locations), maze.round, maze.state_hash,
+            player.x, player.y, player.score, player.gems_collected,
+            list(player.visited_positions),
+            agent.x, agent.y, agent.score, agent.gems_collected, agent.tokens,
+            list(agent.visited_positions), token_system.player_tokens)
+
+def assert_same_capture(first, second):
+    """Compare two captures, arrays by value"""
+    assert len(first) == len(second)
+    for a, b in zip(first, second):
+        if isinstance(a, np.ndarray):
+            assert np.array_equal(a, b)
+        else:
+            assert a == b
+
+def play_turn(rng, maze, player, agent, token_system):
+    """Make one random move, wall, trap removal or teleport for either side"""
+    side = player if rng.random() < 0.5 else agent
+    choice = rng.random()
+    dx, dy = rng.choice(DIRECTIONS)
+    if choice < 0.5:
+        if side is player:
+            player.move(dx, dy)
+        elif maze.is_valid_move(agent.x + dx, agent.y + dy):
+            agent._execute_action(("move", dx, dy))
+    elif choice < 0.75:
+        if side is player:
+            if token_system.player_tokens > 0 and player.place_wall(dx, dy):
+                token_system.player_tokens -= 1
+        elif agent.tokens > 0:
+            agent._execute_action(("wall", dx, dy))
+    elif choice < 0.9:
+        if side is player:
+            if token_system.player_tokens > 0 and player.remove_trap():
+                token_system.player_tokens -= 1
+        elif agent.tokens > 0:
+            agent._execute_action(("remove_trap", 0, 0))
+    elif side is player:
+        if token_system.player_tokens > 0 and len(player.visited_positions) > 1:
+            if player.teleport(*rng.choice(player.visited_positions)):
+                token_system.player_tokens -= 1
+    else:
+        maze.set_round(rng.randint(1, ROUNDS))
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("seed", range(8))
+def test_incremental_structures_match_rebuilds(seed, compact):
+    """Random play and journal restores keep every derived structure exact"""
+    rng = random.Random(seed)
+    maze = Maze(SIZE, rng=np.random.default_rng(seed), compact=compact)
+    player = Player(0, 0, maze)
+    agent = AIAgent(SIZE - 1, SIZE - 1, maze)
+    token_system = TokenSystem(6, maze)
+    agent.tokens = 6
+    journal = GameJournal(maze, player, agent, token_system)
+    assert_matches_rebuild(maze, player, agent, token_system)
+
+    checkpoints = []
+    for _ in range(120):
+        if rng.random() < 0.15:
+            checkpoints.append((journal.checkpoint(), capture(maze, player, agent, token_system)))
+        if checkpoints and rng.random() < 0.1:
+            # Restores may go back any number of checkpoints
+            del checkpoints[rng.randrange(len(checkpoints)) + 1:]
+            checkpoint, captured = checkpoints[-1]
+            journal.restore(checkpoint)
+            assert_same_capture(capture(maze, player, agent, token_system), captured)
+        else:
+            play_turn(rng, maze, player, agent, token_system)
+        assert_matches_rebuild(maze, player, agent, token_system)
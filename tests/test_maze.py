@@ -0,0 +1,55 @@
+"""
+Tests of Maze storage layouts
+"""
+
+import tracemalloc
+import numpy as np
+from constants import CELL_TYPES
+from maze import Maze
+from zobrist import keys_for
+
+SIZE = 10
+
+class LegacyMaze:
+    """The original layout: an int64 grid and two bool visited layers"""
+    def __init__(self, size):
+        self.size = size
+        self.grid = np.zeros((size, size), dtype=int)
+        self.visited_player = np.zeros((size, size), dtype=bool)
+        self.visited_ai = np.zeros((size, size), dtype=bool)
+        self.gem_locations = []
+
+def held_bytes(factory):
+    """Bytes still held by the result of factory(), excluding the shared key tables"""
+    keys_for(SIZE)
+    tracemalloc.start()
+    try:
+        result = factory()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current
+
+def test_construction_builds_no_derived_tables():
+    """Distance fields and path tables are built on first use only"""
+    for compact in (False, True):
+        maze = Maze(SIZE, compact=compact)
+        assert maze._gem_field is None
+        assert maze._path_table is None
+    assert Maze(SIZE, compact=True)._open_mask is None
+
+def test_compact_is_smaller_than_legacy_layout():
+    """A compact maze is smaller than the original int64 grid and bool layers"""
+    compact = held_bytes(lambda: Maze(SIZE, 0, 0, 0, compact=True))
+    assert compact < held_bytes(lambda: Maze(SIZE, 0, 0, 0))
+    assert compact < held_bytes(lambda: LegacyMaze(SIZE))
+
+def test_place_wall_rejects_cells_outside_the_grid():
+    """Out-of-range cells are rejected rather than wrapped or raised on"""
+    maze = Maze(SIZE, 0, 0, 0)
+    for x, y in ((-1, 0), (0, -1), (SIZE, 0), (0, SIZE), (-3, 2), (2, -3),
+                 (SIZE + 1, 2), (2, SIZE + 1)):
+        assert not maze.place_wall(x, y)
+    assert not (maze.grid == CELL_TYPES["WALL"]).any()
+    assert maze.place_wall(2, 2)
@@ -0,0 +1,30 @@
+"""
+Tests of the MCTSPlanner transposition table
+"""
+
+import random
+import numpy as np
+from engine import GameEngine, STAY, TURN
+from planner import MCTSPlanner
+
+SIZE = 10
+
+def ai_state(engine, seed):
+    """A random opening with the AI to move"""
+    state = engine.new_game(rng=np.random.default_rng(seed))
+    state, _, _ = engine.step(state, STAY)
+    assert state[TURN] == 1
+    return state
+
+def test_colliding_node_is_not_shared():
+    """A node stored under a state's hash for another state is replaced, not reused"""
+    engine = GameEngine(SIZE)
+    state, other = ai_state(engine, 0), ai_state(engine, 1)
+    planner = MCTSPlanner(engine, budget=0.01, rng=random.Random(0))
+    planner.table[hash(state)] = [1000, 1e9, [], 0, other]
+
+    action = planner.plan(state)
+    assert action in engine.legal_actions(state)
+    node = planner.table[hash(state)]
+    assert node[4] == state
+    assert node[0] == planner.iterations
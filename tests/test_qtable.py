@@ -0,0 +1,39 @@
+"""
+Tests of the ArrayQTable and MappedQTable entry counts
+"""
+
+import contextlib
+import io
+import numpy as np
+import pytest
+from training import TrainingEnvironment
+from qtable import MappedQTable, save_q_table
+
+def set_values(table):
+    """Count the set values by scanning the in-memory matrix"""
+    return int(np.count_nonzero(~np.isnan(table.values[:len(table.rows)])))
+
+@pytest.mark.parametrize("options", [{"q_table": "array"}, {"replay_memory": 1 << 16}])
+def test_len_counts_set_values(options):
+    """Every writer of an ArrayQTable keeps len() equal to a full scan"""
+    env = TrainingEnvironment(3, seed=0, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        env.train()
+    table = env.learner.q_table
+    assert len(table) == set_values(table) > 0
+
+def test_mapped_len_counts_file_and_memory(tmp_path):
+    """A mapped table's len() covers the file, copied rows and new values"""
+    env = TrainingEnvironment(3, seed=0, q_table="array")
+    with contextlib.redirect_stdout(io.StringIO()):
+        env.train()
+    path = str(tmp_path / "policy.qtb")
+    save_q_table(env.learner.q_table, path)
+
+    table = MappedQTable(path)
+    assert len(table) == len(env.learner.q_table)
+    (state, action), _ = next(iter(env.learner.q_table.items()))
+    table[(state, action)] = 1.0
+    unset = next(other for other in table._actions if (state, other) not in table)
+    table[(state, unset)] = 2.0
+    assert len(table) == len(env.learner.q_table) + 1 == sum(1 for _ in table.items())
@@ -0,0 +1,22 @@
+"""
+Reproducibility tests of TrainingEnvironment
+"""
+
+import pytest
+from training import TrainingEnvironment
+
+EPISODES = 3
+
+def trained_table(**options):
+    """Train serially for a few episodes and return the Q-table contents"""
+    env = TrainingEnvironment(EPISODES, **options)
+    env.train()
+    return dict(env.learner.q_table.items())
+
+@pytest.mark.parametrize("options", [{}, {"replay_memory": 1 << 16}])
+def test_serial_runs_with_equal_seeds_match(options):
+    """Two serial runs with the same seed train the same table"""
+    table = trained_table(seed=7, **options)
+    assert table
+    assert trained_table(seed=7, **options) == table
+    assert trained_table(seed=8, **options) != table
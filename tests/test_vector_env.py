@@ -0,0 +1,62 @@
+"""
+Parity tests of VectorEnvironment against GameEngine
+"""
+
+import random
+import numpy as np
+import pytest
+from constants import CELL_TYPES, ROUNDS
+from engine import GameEngine, TURN, ROUND
+from vector_env import VectorEnvironment
+
+SIZE = 10
+GAMES = 16
+
+def bitboard(mask):
+    """Pack a flat bool array into an int, bit i per cell i"""
+    return sum(1 << cell for cell in np.flatnonzero(mask).tolist())
+
+def engine_state(env, game):
+    """Capture one game of a VectorEnvironment as a GameEngine state"""
+    cells = env.cells[game][env.to_padded]
+    boards = [bitboard(cells == CELL_TYPES[name]) for name in ("WALL", "GEM", "TRAP")]
+    sides = [(int(env.to_interior[env.positions[side, game]]),
+              bitboard(env.visited[side][game]),
+              int(env.scores[side, game]), int(env.gems_collected[side, game]),
+              int(env.tokens[side, game]))
+             for side in (0, 1)]
+    if env.turn:
+        sides.reverse()
+    return (env.turn, min(env.round, ROUNDS), *boards, *sides[0], *sides[1])
+
+@pytest.mark.parametrize("seed", range(5))
+def test_step_matches_engine(seed):
+    """Every game of a batch follows GameEngine.step under random legal actions"""
+    rng = random.Random(seed)
+    env = VectorEnvironment(GAMES, SIZE, rng=np.random.default_rng(seed))
+    engine = GameEngine(SIZE)
+    states = [engine_state(env, game) for game in range(GAMES)]
+    assert states == [engine.initial_state(*state[2:5]) for state in states]
+
+    done = False
+    while not done:
+        actions = np.array([rng.choice(engine.legal_actions(state)) for state in states])
+        rewards, done = env.step(actions)
+        results = [engine.step(state, int(action)) for state, action in zip(states, actions)]
+        states = [result[0] for result in results]
+        assert rewards.tolist() == [result[1] for result in results]
+        assert all(result[2] == done for result in results)
+        assert [engine_state(env, game) for game in range(GAMES)] == states
+
+    # The games end after the AI's move in the last round
+    assert all(state[TURN] == 0 and state[ROUND] == ROUNDS for state in states)
+
+def test_move_mask_matches_engine():
+    """move_mask() lists the same open moves as GameEngine.legal_actions"""
+    env = VectorEnvironment(GAMES, SIZE, rng=np.random.default_rng(0))
+    engine = GameEngine(SIZE)
+    mask = env.move_mask()
+    for game in range(GAMES):
+        moves = [action for action in engine.legal_actions(engine_state(env, game))
+                 if action < 4]
+        assert np.flatnonzero(mask[game]).tolist() == moves
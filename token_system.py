@@ -10,18 +10,36 @@ class TokenSystem:
     Manages strategic tokens that can be used by players and AI
     for special actions like placing walls, removing traps, or teleporting.
     """
-    def __init__(self, initial_tokens=3):
+    def __init__(self, initial_tokens=3, maze=None):
         """
         Initialize the token system with a set number of tokens.
         
         Args:
             initial_tokens (int): Number of tokens to start with
+            maze (Maze, optional): Maze whose state hash tracks the player's tokens
         """
-        self.player_tokens = initial_tokens
+        self.maze = maze
+        self._player_tokens = initial_tokens
+        if maze is not None:
+            keys = maze.zobrist
+            maze.state_hash ^= keys.tokens(keys.player_tokens, initial_tokens)
         self.ai_tokens = initial_tokens
         self.teleport_selection_active = False
         self.selected_teleport_pos = None
     
+    @property
+    def player_tokens(self):
+        """Number of tokens the player has"""
+        return self._player_tokens
+    
+    @player_tokens.setter
+    def player_tokens(self, value):
+        if self.maze is not None:
+            keys = self.maze.zobrist
+            self.maze.state_hash ^= (keys.tokens(keys.player_tokens, self._player_tokens)
+                                     ^ keys.tokens(keys.player_tokens, value))
+        self._player_tokens = value
+    
     def use_token(self, entity, action_type, target_pos=None):
         """
         Use a token for a specific action.
@@ -6,75 +6,108 @@ import pygame
 import numpy as np
 import random
 import time
-from maze import Maze
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from maze import Maze, generate_batch
 from player import Player
-from ai_agent import AIAgent
+from ai_agent import AIAgent, QLearner, UPDATE_MODES
+from qtable import ArrayQTable, BoundedQTable, EVICTION_POLICIES
+from replay import ReplayBuffer
+from features import STATE_ENCODERS, make_encoder
 from token_system import TokenSystem
-from constants import GRID_SIZE, ROUNDS
+from constants import GRID_SIZE, ROUNDS, POLICY_FILE
+
+# Ways of merging worker Q-tables in parallel training
+MERGE_MODES = ("visits", "average")
 
 class TrainingEnvironment:
     """
     Environment for training the AI agent through simulated games.
     """
-    def __init__(self, num_episodes=100):
+    def __init__(self, num_episodes=100, workers=1, sync_interval=50, merge="visits", seed=None,
+                 q_table="dict", q_capacity=None, eviction="lru", replay_memory=None,
+                 prioritized=False, update_mode="one_step", n_steps=3, trace_decay=0.8,
+                 state_encoder="absolute"):
         """
         Initialize the training environment.
         
         Args:
             num_episodes (int): Number of episodes to train for
+            workers (int): Number of worker processes; 1 trains in this process
+            sync_interval (int): Episodes each worker plays between Q-table merges
+            merge (str): How worker Q-values are merged, "visits" to weight
+                by update counts or "average" for a plain mean
+            seed (int, optional): Base seed for the per-worker random streams
+            q_table (str): Q-table backend, "dict" or "array" for an ArrayQTable
+            q_capacity (int, optional): Bound the dict backend to this many
+                entries with a BoundedQTable
+            eviction (str): BoundedQTable eviction policy
+            replay_memory (int, optional): Bytes for an experience replay
+                buffer; implies the array backend
+            prioritized (bool): Replay by TD-error priority instead of uniformly
+            update_mode (str): QLearner update mode, one of UPDATE_MODES
+            n_steps (int): Rewards per update in "n_step" mode
+            trace_decay (float): Lambda of "lambda" mode
+            state_encoder (str): Spec of the state encoder, e.g. "absolute"
+                or "relative"
         """
+        if merge not in MERGE_MODES:
+            raise ValueError(f"Unknown merge mode {merge!r}")
         self.num_episodes = num_episodes
+        self.workers = workers
+        self.sync_interval = sync_interval
+        self.merge = merge
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        options = {"update_mode": update_mode, "n_steps": n_steps, "trace_decay": trace_decay,
+                   "state_encoder": state_encoder}
+        encoder = make_encoder(state_encoder, GRID_SIZE)
+        if replay_memory is not None:
+            self.learner = QLearner(q_table=ArrayQTable(GRID_SIZE, encoder=encoder),
+                                    replay=ReplayBuffer.for_memory(
+                                        replay_memory, prioritized,
+                                        rng=np.random.default_rng(self.seed)),
+                                    **options)
+        elif q_table == "array":
+            self.learner = QLearner(q_table=ArrayQTable(GRID_SIZE, encoder=encoder), **options)
+        elif q_capacity is not None:
+            self.learner = QLearner(q_table=BoundedQTable(q_capacity, eviction), **options)
+        else:
+            self.learner = QLearner(**options)
         self.maze = None
         self.player = None
         self.ai_agent = None
         self.token_system = None
+        self.results = None
         
     def train(self):
         """
         Train the AI agent through multiple episodes.
+        
+        One QLearner is carried through every episode, so each game starts
+        from what the previous ones learned.
+        
+        Returns:
+            AIAgent: Agent from the last episode, sharing the trained learner
         """
+        if self.workers > 1:
+            return self._train_parallel()
+        
         # Training statistics
-        wins = 0
-        losses = 0
-        ties = 0
+        results = {"Win": 0, "Loss": 0, "Tie": 0}
         
         print("Starting AI agent training...")
         
+        # Seed both random streams, as the workers do, so equal seeds
+        # train equal tables
+        random.seed(self.seed)
+        
+        # Generate every episode's maze up front in one batch
+        mazes = generate_batch(self.num_episodes, GRID_SIZE,
+                               rng=np.random.default_rng(self.seed))
+        
         for episode in range(self.num_episodes):
-            # Initialize new game components for each episode
-            self.maze = Maze(GRID_SIZE)
-            self.player = RandomPlayer(0, 0, self.maze)  # Use a random player for training
-            self.ai_agent = AIAgent(GRID_SIZE - 1, GRID_SIZE - 1, self.maze)
-            self.token_system = TokenSystem(3)
-            
-            # Play a complete game
-            player_turn = True
-            current_round = 1
-            
-            while current_round <= ROUNDS:
-                if player_turn:
-                    # Random player's turn
-                    self.player.make_random_move()
-                    player_turn = False
-                else:
-                    # AI agent's turn
-                    self.ai_agent.make_move()
-                    player_turn = True
-                    current_round += 1
-            
-            # Determine winner
-            player_gems = self.player.get_gems_collected()
-            ai_gems = self.ai_agent.get_gems_collected()
-            
-            if player_gems > ai_gems:
-                result = "Loss"
-                losses += 1
-            elif ai_gems > player_gems:
-                result = "Win"
-                wins += 1
-            else:
-                result = "Tie"
-                ties += 1
+            result = self._play_episode(mazes[episode], self.learner)
+            results[result] += 1
                 
             # Print progress
             if (episode + 1) % 10 == 0 or episode == 0:
@@ -82,15 +115,182 @@ class TrainingEnvironment:
                       f"AI Score: {self.ai_agent.get_score()}, "
                       f"Player Score: {self.player.get_score()}")
                 
-        # Print final training statistics
-        print("\nTraining Complete!")
-        print(f"Episodes: {self.num_episodes}")
-        print(f"Wins: {wins} ({wins/self.num_episodes*100:.1f}%)")
-        print(f"Losses: {losses} ({losses/self.num_episodes*100:.1f}%)")
-        print(f"Ties: {ties} ({ties/self.num_episodes*100:.1f}%)")
+        self._print_summary(results)
         
         # Return the trained AI agent
         return self.ai_agent
+    
+    def _play_episode(self, maze, learner):
+        """
+        Play one complete game against a random player.
+        
+        Args:
+            maze (Maze): Maze to play on
+            learner (QLearner): Learner for the AI to play and learn with
+            
+        Returns:
+            str: "Win", "Loss" or "Tie" from the AI's point of view
+        """
+        # Initialize new game components for the episode
+        self.maze = maze
+        self.player = RandomPlayer(0, 0, self.maze)  # Use a random player for training
+        self.ai_agent = AIAgent(GRID_SIZE - 1, GRID_SIZE - 1, self.maze, learner)
+        self.token_system = TokenSystem(3, self.maze)
+        
+        # Play a complete game
+        player_turn = True
+        current_round = 1
+        
+        while current_round <= ROUNDS:
+            if player_turn:
+                # Random player's turn
+                self.player.make_random_move()
+                player_turn = False
+            else:
+                # AI agent's turn
+                self.ai_agent.make_move()
+                player_turn = True
+                current_round += 1
+                self.maze.set_round(current_round)
+        
+        self.ai_agent.end_game()
+        
+        # Determine winner
+        player_gems = self.player.get_gems_collected()
+        ai_gems = self.ai_agent.get_gems_collected()
+        
+        if player_gems > ai_gems:
+            return "Loss"
+        if ai_gems > player_gems:
+            return "Win"
+        return "Tie"
+    
+    def _train_parallel(self):
+        """
+        Train with a pool of worker processes.
+        
+        Each sync round sends the central Q-table to every worker, lets
+        each play sync_interval episodes from its own seed, and merges the
+        entries they changed back in.
+        
+        Returns:
+            AIAgent: Agent holding the merged Q-table
+        """
+        results = {"Win": 0, "Loss": 0, "Tie": 0}
+        q_table = self.learner.q_table
+        
+        print(f"Starting AI agent training on {self.workers} workers...")
+        
+        played = 0
+        sync_round = 0
+        with ProcessPoolExecutor(self.workers) as pool:
+            while played < self.num_episodes:
+                futures = []
+                for worker in range(self.workers):
+                    episodes = min(self.sync_interval, self.num_episodes - played)
+                    if episodes <= 0:
+                        break
+                    played += episodes
+                    seed = worker_seed(self.seed, worker, sync_round)
+                    futures.append(pool.submit(_run_worker, self.learner, episodes, seed))
+                
+                updates = []
+                for future in futures:
+                    changes, worker_results = future.result()
+                    updates.append(changes)
+                    for result in worker_results:
+                        results[result] += 1
+                merge_q_tables(q_table, updates, self.merge)
+                sync_round += 1
+                
+                print(f"Episode {played}/{self.num_episodes}, Q-table entries: {len(q_table)}, "
+                      f"Wins so far: {results['Win']}")
+        
+        self._print_summary(results)
+        
+        # Hand the merged learner to an agent on a fresh maze
+        self.maze = Maze(GRID_SIZE)
+        self.ai_agent = AIAgent(GRID_SIZE - 1, GRID_SIZE - 1, self.maze, self.learner)
+        return self.ai_agent
+    
+    def _print_summary(self, results):
+        """Print final training statistics and keep them in self.results"""
+        self.results = results
+        print("\nTraining Complete!")
+        print(f"Episodes: {self.num_episodes}")
+        for label, result in (("Wins", "Win"), ("Losses", "Loss"), ("Ties", "Tie")):
+            print(f"{label}: {results[result]} ({results[result]/self.num_episodes*100:.1f}%)")
+
+def worker_seed(seed, worker, sync_round):
+    """
+    Derive the deterministic seed of one worker's sync round
+    
+    Args:
+        seed (int): Base training seed
+        worker (int): Worker index
+        sync_round (int): Sync round number
+        
+    Returns:
+        int: 32-bit seed
+    """
+    return int(np.random.SeedSequence([seed, worker, sync_round]).generate_state(1)[0])
+
+def _run_worker(learner, episodes, seed):
+    """
+    Play episodes in a worker process with a copy of the central learner.
+    
+    Args:
+        learner (QLearner): Central learner at the start of the sync round
+        episodes (int): Number of episodes to play
+        seed (int): Seed for this worker's random streams
+        
+    Returns:
+        tuple: (changes, results) where changes maps each state-action pair
+            whose value changed to (value, update count)
+    """
+    random.seed(seed)
+    mazes = generate_batch(episodes, GRID_SIZE, rng=np.random.default_rng(seed))
+    if learner.replay is not None:
+        # The pickled buffer carries the parent's rng state; give each
+        # worker its own stream, separate from the maze stream
+        learner.replay.rng = np.random.default_rng([seed, 1])
+    env = TrainingEnvironment(episodes)
+    base = dict(learner.q_table.items())
+    learner.visit_counts = visits = {}
+    results = [env._play_episode(maze, learner) for maze in mazes]
+    changes = {key: (value, visits.get(key, 0))
+               for key, value in learner.q_table.items() if base.get(key) != value}
+    return changes, results
+
+def merge_q_tables(q_table, updates, merge="visits"):
+    """
+    Merge worker Q-table changes into the central table in place.
+    
+    With "visits", each worker's value is weighted by how many updates it
+    made to that entry; entries no worker updated (heuristic values only)
+    fall back to a plain mean.
+    
+    Args:
+        q_table (dict): Central Q-table
+        updates (list): Per-worker dicts of state-action pair -> (value, update count)
+        merge (str): "visits" or "average"
+    """
+    totals = {}
+    for changes in updates:
+        for key, (value, count) in changes.items():
+            total = totals.get(key)
+            if total is None:
+                total = totals[key] = [0.0, 0, 0.0, 0]
+            total[0] += value * count
+            total[1] += count
+            total[2] += value
+            total[3] += 1
+    
+    for key, (weighted, count, plain, workers) in totals.items():
+        if merge == "visits" and count:
+            q_table[key] = weighted / count
+        else:
+            q_table[key] = plain / workers
 
 class RandomPlayer(Player):
     """
@@ -105,11 +305,7 @@ class RandomPlayer(Player):
             bool: True if move was made, False otherwise
         """
         # Get valid moves
-        valid_moves = []
-        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-            new_x, new_y = self.x + dx, self.y + dy
-            if self.maze.is_valid_move(new_x, new_y):
-                valid_moves.append((dx, dy))
+        valid_moves = self.maze.get_valid_moves(self.x, self.y)
         
         # If no valid moves, try to use a token
         if not valid_moves and random.random() < 0.5:
@@ -141,7 +337,45 @@ class RandomPlayer(Player):
 
 if __name__ == "__main__":
     # Run training if this script is executed directly
-    env = TrainingEnvironment(num_episodes=100)
+    parser = argparse.ArgumentParser(description="Train the maze AI agent")
+    parser.add_argument("--episodes", type=int, default=100, help="Number of episodes")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--sync-interval", type=int, default=50,
+                        help="Episodes per worker between Q-table merges")
+    parser.add_argument("--merge", choices=MERGE_MODES, default="visits",
+                        help="How worker Q-tables are merged")
+    parser.add_argument("--seed", type=int, default=None, help="Base random seed")
+    parser.add_argument("--q-table", choices=("dict", "array"), default="dict",
+                        help="Q-table storage backend")
+    parser.add_argument("--q-capacity", type=int, default=None,
+                        help="Maximum Q-table entries; evicts beyond this")
+    parser.add_argument("--eviction", choices=EVICTION_POLICIES, default="lru",
+                        help="Which entry a full Q-table evicts")
+    parser.add_argument("--replay-mb", type=float, default=None,
+                        help="Memory for an experience replay buffer in MB")
+    parser.add_argument("--prioritized", action="store_true",
+                        help="Replay transitions by TD-error priority")
+    parser.add_argument("--update-mode", choices=UPDATE_MODES, default="one_step",
+                        help="Q-learning update rule")
+    parser.add_argument("--n-steps", type=int, default=3,
+                        help="Rewards summed per update with --update-mode n_step")
+    parser.add_argument("--trace-decay", type=float, default=0.8,
+                        help="Eligibility trace decay with --update-mode lambda")
+    parser.add_argument("--state-encoder", default="absolute",
+                        help="State encoder spec: one of " + ", ".join(STATE_ENCODERS)
+                        + ", optionally with parameters, e.g. relative:2:8")
+    parser.add_argument("--save", default=POLICY_FILE,
+                        help="File to save the trained policy to; empty to skip")
+    args = parser.parse_args()
+    
+    env = TrainingEnvironment(args.episodes, args.workers, args.sync_interval, args.merge,
+                              args.seed, args.q_table, args.q_capacity, args.eviction,
+                              args.replay_mb and int(args.replay_mb * 2 ** 20), args.prioritized,
+                              args.update_mode, args.n_steps, args.trace_decay,
+                              args.state_encoder)
     trained_agent = env.train()
     
+    if args.save:
+        trained_agent.learner.save(args.save)
+        print(f"Saved the trained policy to {args.save}.")
     print("Training complete. Run main.py to play against the trained AI.")
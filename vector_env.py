@@ -0,0 +1,147 @@
+"""
+Vector environment module for stepping many games in lockstep with NumPy
+"""
+
+import numpy as np
+from constants import GRID_SIZE, CELL_TYPES, DIRECTIONS, ROUNDS, GEM_COUNT, TRAP_COUNT, WALL_COUNT
+from maze import generate_batch
+from engine import WALL, REMOVE_TRAP, TELEPORT
+
+class VectorEnvironment:
+    """
+    N independent games stepped together, one array operation per rule.
+
+    Cells live in the bordered (n, size + 2, size + 2) tensor of a
+    MazeBatch, so moves off the grid land on a wall with no bounds checks.
+    Positions, scores, gems and tokens are (2, n) arrays indexed by side
+    (0 player, 1 AI). Actions use the GameEngine ids, one per game.
+
+    Every game moves on every step, so unlike GameEngine an illegal
+    action is a no-op that still passes the turn, as in AIAgent.
+    """
+    def __init__(self, n, size=GRID_SIZE, wall_count=WALL_COUNT, gem_count=GEM_COUNT,
+                 trap_count=TRAP_COUNT, tokens=3, rng=None):
+        """
+        Initialize n games; call reset() to deal new mazes.
+
+        Args:
+            n (int): Number of games
+            size (int): The size of each maze
+            wall_count (int): Number of walls per maze
+            gem_count (int): Number of gems per maze
+            trap_count (int): Number of traps per maze
+            tokens (int): Tokens each side starts with
+            rng (numpy.random.Generator, optional): Random generator for layouts
+        """
+        self.n = n
+        self.size = size
+        self.counts = (wall_count, gem_count, trap_count)
+        self.initial_tokens = tokens
+        self.rng = rng
+        self.games = np.arange(n)
+
+        # Flat offsets of the four directions in the bordered layout, and
+        # conversions between bordered and interior flat cell indices
+        width = size + 2
+        self.offsets = np.array([dx * width + dy for dx, dy in DIRECTIONS])
+        cells = np.arange(size * size)
+        self.to_padded = (cells // size + 1) * width + cells % size + 1
+        self.to_interior = np.full(width * width, -1)
+        self.to_interior[self.to_padded] = cells
+        self.episodes = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Deal fresh mazes to every game and return the player to move
+        """
+        wall_count, gem_count, trap_count = self.counts
+        self.batch = generate_batch(self.n, self.size, wall_count, gem_count,
+                                    trap_count, self.rng)
+        self.cells = self.batch.cells.reshape(self.n, -1)
+        self.visited = (self.batch.visited_player.reshape(self.n, -1),
+                        self.batch.visited_ai.reshape(self.n, -1))
+        last = self.size * self.size - 1
+        self.positions = np.empty((2, self.n), dtype=np.int64)
+        self.positions[0] = self.to_padded[0]
+        self.positions[1] = self.to_padded[last]
+        self.scores = np.zeros((2, self.n), dtype=np.int32)
+        self.gems_collected = np.zeros((2, self.n), dtype=np.int32)
+        self.tokens = np.full((2, self.n), self.initial_tokens, dtype=np.int32)
+        self.turn = 0
+        self.round = 1
+
+    def step(self, actions):
+        """
+        Apply one action per game for the side to move
+
+        After the AI's move in the last round every game is over; the
+        scores are left in place and the next step() starts new games.
+
+        Args:
+            actions (numpy.ndarray): (n,) action ids
+
+        Returns:
+            tuple: (rewards, done) where rewards is the (n,) score change of
+                the mover and done is True when this step ended the games
+        """
+        if self.turn == 0 and self.round > ROUNDS:
+            self.episodes += self.n
+            self.reset()
+
+        games, cells = self.games, self.cells
+        side = self.turn
+        position = self.positions[side]
+        tokens = self.tokens[side]
+        has_token = tokens > 0
+        wall, empty = CELL_TYPES["WALL"], CELL_TYPES["EMPTY"]
+
+        # Moves: the target is open
+        target = position + self.offsets[actions % 4]
+        moving = (actions < WALL) & (cells[games, target] != wall)
+
+        # Walls: the target is empty and a token is left
+        walling = ((actions >= WALL) & (actions < REMOVE_TRAP) & has_token
+                   & (cells[games, target] == empty))
+        cells[games[walling], target[walling]] = wall
+
+        # Trap removal: standing on a trap with a token left
+        removing = ((actions == REMOVE_TRAP) & has_token
+                    & (cells[games, position] == CELL_TYPES["TRAP"]))
+        cells[games[removing], position[removing]] = empty
+
+        # Teleports: to a visited cell with a token left
+        teleport_cell = np.clip(actions - TELEPORT, 0, self.size * self.size - 1)
+        teleporting = ((actions >= TELEPORT) & has_token
+                       & self.visited[side][games, teleport_cell])
+
+        landing = moving | teleporting
+        position = np.where(moving, target, position)
+        position = np.where(teleporting, self.to_padded[teleport_cell], position)
+        self.positions[side] = position
+        tokens -= walling | removing | teleporting
+        self.visited[side][games[moving], self.to_interior[position[moving]]] = True
+
+        landed_on = cells[games, position]
+        collecting = landing & (landed_on == CELL_TYPES["GEM"])
+        cells[games[collecting], position[collecting]] = empty
+        rewards = collecting * 10 - (landing & (landed_on == CELL_TYPES["TRAP"])) * 5
+        self.scores[side] += rewards
+        self.gems_collected[side] += collecting
+
+        done = False
+        if side == 1:
+            done = self.round >= ROUNDS
+            self.round += 1
+        self.turn = 1 - side
+        return rewards, done
+
+    def move_mask(self):
+        """
+        Get the open moves of the side to move
+
+        Returns:
+            numpy.ndarray: (n, 4) bool, True where the move in DIRECTIONS order is open
+        """
+        targets = self.positions[self.turn][:, None] + self.offsets
+        return self.cells[self.games[:, None], targets] != CELL_TYPES["WALL"]
@@ -9,6 +9,7 @@ import random
 import numpy as np
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
+from pathing import ShortestPathTable
 
 # Constants (matching the original game)
 GRID_SIZE = 10
@@ -45,12 +46,17 @@ game_state = {
     "gem_locations": []
 }
 
+# All-pairs shortest paths for the current maze (kept out of the JSON state)
+path_table = None
+
 class MazeGame:
     """Web-based maze game logic"""
     
     @staticmethod
     def initialize_game():
         """Initialize a new game"""
+        global path_table
+        
         # Create empty maze
         maze = np.zeros((GRID_SIZE, GRID_SIZE), dtype=int)
         
@@ -107,6 +113,8 @@ class MazeGame:
         game_state["visited_ai"] = visited_ai.tolist()
         game_state["gem_locations"] = gem_locations
         
+        path_table = ShortestPathTable(maze)
+        
         return game_state
     
     @staticmethod
@@ -170,6 +178,7 @@ class MazeGame:
         """Place a wall at position (x, y) if empty"""
         if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE and game_state["maze"][x][y] == CELL_EMPTY:
             game_state["maze"][x][y] = CELL_WALL
+            path_table.wall_placed(x, y)
             
             # Use a token
             if is_player:
@@ -305,17 +314,10 @@ class MazeGame:
             MazeGame.remove_trap(x, y, False)
             return
         
-        # Find nearest gem
-        nearest_gem = None
-        min_distance = float('inf')
-        
-        for gem_x, gem_y in game_state["gem_locations"]:
-            distance = abs(gem_x - x) + abs(gem_y - y)  # Manhattan distance
-            if distance < min_distance:
-                min_distance = distance
-                nearest_gem = (gem_x, gem_y)
+        # Find nearest gem by path distance
+        nearest_gem = path_table.nearest((x, y), game_state["gem_locations"])
         
-        # If no gems left, just make a random valid move
+        # If no gems are reachable, just make a random valid move
         if nearest_gem is None:
             valid_moves = []
             for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
@@ -334,38 +336,10 @@ class MazeGame:
                     game_state["ai_score"] -= 5
             return
         
-        # Try to move towards the nearest gem
-        gem_x, gem_y = nearest_gem
-        
-        # Determine best direction
-        best_dx, best_dy = 0, 0
-        if gem_x > x:
-            best_dx = 1
-        elif gem_x < x:
-            best_dx = -1
-            
-        if gem_y > y:
-            best_dy = 1
-        elif gem_y < y:
-            best_dy = -1
-        
-        # Try primary direction first
-        if abs(gem_x - x) > abs(gem_y - y):
-            # Try x direction first
-            if MazeGame.is_valid_move(x + best_dx, y):
-                game_state["ai_x"] = x + best_dx
-                game_state["ai_y"] = y
-            elif MazeGame.is_valid_move(x, y + best_dy):
-                game_state["ai_x"] = x
-                game_state["ai_y"] = y + best_dy
-        else:
-            # Try y direction first
-            if MazeGame.is_valid_move(x, y + best_dy):
-                game_state["ai_x"] = x
-                game_state["ai_y"] = y + best_dy
-            elif MazeGame.is_valid_move(x + best_dx, y):
-                game_state["ai_x"] = x + best_dx
-                game_state["ai_y"] = y
+        # Take the first step of a shortest path to the nearest gem
+        best_dx, best_dy = path_table.next_step((x, y), nearest_gem)
+        game_state["ai_x"] = x + best_dx
+        game_state["ai_y"] = y + best_dy
         
         # If no good moves, try any valid move
         if game_state["ai_x"] == x and game_state["ai_y"] == y:
@@ -0,0 +1,169 @@
+"""
+Zobrist module for incremental 64-bit hashing of the game state
+"""
+
+from functools import lru_cache
+import numpy as np
+from constants import CELL_TYPES, ROUNDS
+
+# Token counts above this share the key of the maximum
+MAX_TOKENS = 63
+
+# Cell types that contribute to the hash; empty cells contribute nothing
+HASHED_CELL_TYPES = (CELL_TYPES["WALL"], CELL_TYPES["GEM"], CELL_TYPES["TRAP"])
+
+# Grids up to this many cells are hashed through the cached per-cell key
+# lists rather than by drawing their keys
+_SMALL_GRID = 1024
+
+# Key streams of the non-cell features, numbered after the cell types
+_PLAYER_POSITION, _AI_POSITION, _PLAYER_TOKENS, _AI_TOKENS, _ROUNDS = range(8, 13)
+
+def _mix(counters):
+    """SplitMix64 finalizer: a well-mixed uint64 key for each uint64 counter"""
+    with np.errstate(over="ignore"):
+        z = counters + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+class ZobristKeys:
+    """
+    Random 64-bit keys for every feature of the game state.
+
+    A state's hash is the XOR of the keys of its features, so changing one
+    feature is two XORs: remove the old key and add the new one. A key is
+    a hash of (maze size, feature, index) rather than a draw from a
+    stored stream, so equal states hash equally across games and
+    processes, and hashing a whole grid needs no key table. Per-cell key
+    lists for incremental updates are built on first use, one per cell
+    type or position, so mazes that never change a cell never pay for
+    them.
+    """
+    def __init__(self, size):
+        """
+        Initialize the keys for a maze of the given size.
+
+        Args:
+            size (int): The size of the maze
+        """
+        self.size = size
+        self.cell_count = size * size
+        self._cell_keys = {}
+        self._player_position = None
+        self._ai_position = None
+
+        # Small tables are built up front
+        self.player_tokens = self._draw(_PLAYER_TOKENS, MAX_TOKENS + 1).tolist()
+        self.ai_tokens = self._draw(_AI_TOKENS, MAX_TOKENS + 1).tolist()
+        self.rounds = self._draw(_ROUNDS, ROUNDS + 2).tolist()
+
+    def _draw(self, stream, indices):
+        """
+        Get the keys of a feature stream
+
+        Args:
+            stream (int): Cell type or one of the feature stream numbers
+            indices: Count of leading indices, or an array of indices
+
+        Returns:
+            numpy.ndarray: uint64 keys
+        """
+        if np.isscalar(indices):
+            indices = np.arange(indices, dtype=np.uint64)
+        base = (self.size << 48) | (int(stream) << 40)
+        return _mix(np.asarray(indices, dtype=np.uint64) | np.uint64(base))
+
+    def cell_key(self, cell_type, cell):
+        """
+        Get the key of a cell holding a cell type
+
+        Args:
+            cell_type (int): One of the CELL_TYPES values
+            cell (int): Flat cell index, x * size + y
+
+        Returns:
+            int: Key, 0 for types that do not contribute to the hash
+        """
+        keys = self._cell_keys.get(cell_type)
+        if keys is None:
+            if cell_type not in HASHED_CELL_TYPES:
+                return 0
+            keys = self._cell_key_list(cell_type)
+        return keys[cell]
+
+    def _cell_key_list(self, cell_type):
+        """Get the keys of one hashed cell type by flat cell index, building them on first use"""
+        keys = self._cell_keys.get(cell_type)
+        if keys is None:
+            keys = self._cell_keys[int(cell_type)] = self._draw(cell_type, self.cell_count).tolist()
+        return keys
+
+    def hash_cells(self, cell_type, cells):
+        """
+        Hash a set of cells all holding one cell type
+
+        Args:
+            cell_type (int): One of HASHED_CELL_TYPES
+            cells: Sequence or array of flat cell indices
+
+        Returns:
+            int: XOR of their keys
+        """
+        if not len(cells):
+            return 0
+        return int(np.bitwise_xor.reduce(self._draw(cell_type, cells)))
+
+    def grid_hash(self, grid):
+        """
+        Hash the contents of a whole grid
+
+        Args:
+            grid (numpy.ndarray): (size, size) cell types
+
+        Returns:
+            int: XOR of the cell keys
+        """
+        flat = grid.reshape(-1)
+        state_hash = 0
+        if self.cell_count <= _SMALL_GRID:
+            # Drawing keys costs more than looking them up on small grids
+            keys = {cell_type: self._cell_key_list(cell_type) for cell_type in HASHED_CELL_TYPES}
+            for cell, cell_type in enumerate(flat.tolist()):
+                if cell_type in keys:
+                    state_hash ^= keys[cell_type][cell]
+            return state_hash
+        for cell_type in HASHED_CELL_TYPES:
+            state_hash ^= self.hash_cells(cell_type, np.flatnonzero(flat == cell_type))
+        return state_hash
+
+    @property
+    def player_position(self):
+        """Keys of the player's position by flat cell index"""
+        if self._player_position is None:
+            self._player_position = self._draw(_PLAYER_POSITION, self.cell_count).tolist()
+        return self._player_position
+
+    @property
+    def ai_position(self):
+        """Keys of the AI's position by flat cell index"""
+        if self._ai_position is None:
+            self._ai_position = self._draw(_AI_POSITION, self.cell_count).tolist()
+        return self._ai_position
+
+    def tokens(self, table, count):
+        """Get the key for a token count, clamping large counts"""
+        return table[min(count, MAX_TOKENS)]
+
+@lru_cache(maxsize=None)
+def keys_for(size):
+    """
+    Get the shared Zobrist keys for a maze size
+
+    Args:
+        size (int): The size of the maze
+
+    Returns:
+        ZobristKeys: Keys for that size
+    """
+    return ZobristKeys(size)